@@ -24,6 +24,10 @@ onmessage = (event) => {
       });
       break;
 
+    case "searchTable":
+      searchTable(event.data);
+      break;
+
     default:
       console.log("[ProcessingWorker] Received unsupported event: ", eventType);
   }
@@ -32,14 +36,21 @@ onmessage = (event) => {
 function runCycle(payload) {
   console.log("[ProcessingWorker] runCycle " + JSON.stringify(payload));
   try {
-    scriptEvent = pyScript.send(payload);
-    self.postMessage({
-      eventType: "runCycleDone",
-      scriptEvent: scriptEvent.toJs({
-        create_proxies: false,
-        dict_converter: Object.fromEntries,
-      }),
-    });
+    // A single JSON string crosses the Python boundary instead of a proxy per value
+    const scriptEvent = JSON.parse(pyScript.send_json(payload));
+    const transfer = [];
+    if (typeof scriptEvent.data === "string" && scriptEvent.__type__ === "CommandSystemDonate") {
+      // Binary donations arrive as base64, the bytes are moved to the main thread without a copy
+      scriptEvent.data = decodeBase64(scriptEvent.data);
+      transfer.push(scriptEvent.data.buffer);
+    }
+    self.postMessage(
+      {
+        eventType: "runCycleDone",
+        scriptEvent,
+      },
+      transfer
+    );
   } catch (error) {
     console.error("[ProcessingWorker] Error in runCycle:", error);
     self.postMessage({
@@ -50,6 +61,35 @@ function runCycle(payload) {
   }
 }
 
+function decodeBase64(text) {
+  if (Uint8Array.fromBase64) {
+    return Uint8Array.fromBase64(text);
+  }
+  const binary = atob(text);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes;
+}
+
+function searchTable({ requestId, tableId, query }) {
+  let rowIds = null;
+  try {
+    const search = self.pyodide.pyimport("port.api.search").search;
+    const result = search(tableId, query);
+    if (result !== undefined) {
+      rowIds = result.toJs();
+      result.destroy();
+    }
+    search.destroy();
+  } catch (error) {
+    console.error("[ProcessingWorker] Error in searchTable:", error);
+  }
+  // Without row ids the table searches itself
+  self.postMessage({ eventType: "searchTableDone", requestId, rowIds });
+}
+
 function unwrap(response) {
   console.log(
     "[ProcessingWorker] unwrap response: " + JSON.stringify(response.payload)
@@ -76,6 +116,15 @@ function createAsyncFileReader(file) {
       const blob = file.slice(start, end);
       return fileReaderSync.readAsArrayBuffer(blob);
     },
+    readSlices: (ranges) => {
+      // Flat list of start and end offsets, read into one buffer with a single read
+      const offsets = ranges.toJs ? ranges.toJs() : ranges;
+      const parts = [];
+      for (let i = 0; i < offsets.length; i += 2) {
+        parts.push(file.slice(offsets[i], offsets[i + 1]));
+      }
+      return fileReaderSync.readAsArrayBuffer(new Blob(parts));
+    },
     size: file.size,
     name: file.name,
   };
@@ -100,6 +149,44 @@ function initialise() {
     })
     .then(() => {
       return installPortPackage();
+    })
+    .then(() => {
+      return openSpillStorage();
+    });
+}
+
+function openSpillStorage() {
+  // Data spilled by port.api.spill lives in a file in the Origin Private File System,
+  // written with a synchronous access handle so Python can use it without awaiting
+  if (!self.navigator?.storage?.getDirectory) {
+    console.log("[ProcessingWorker] No Origin Private File System, spilling disabled");
+    return Promise.resolve();
+  }
+  return navigator.storage
+    .getDirectory()
+    .then((root) => root.getFileHandle("port-spill.bin", { create: true }))
+    .then((handle) => handle.createSyncAccessHandle())
+    .then((access) => {
+      access.truncate(0);
+      self.spillStorage = {
+        append(bytes) {
+          const offset = access.getSize();
+          access.write(bytes, { at: offset });
+          return offset;
+        },
+        read(offset, length) {
+          const bytes = new Uint8Array(length);
+          access.read(bytes, { at: offset });
+          return bytes;
+        },
+        // Called when the data at the end of the file is no longer used
+        truncate(size) {
+          access.truncate(size);
+        },
+      };
+    })
+    .catch((error) => {
+      console.log("[ProcessingWorker] Spill storage unavailable:", error);
     });
 }
 
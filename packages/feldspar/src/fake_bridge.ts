@@ -16,16 +16,28 @@ export default class FakeBridge implements Bridge {
   }
 
   async handleDataSubmission (command: CommandSystemDonate): Promise<void> {
-    console.log(`[FakeBridge] received dataSubmission: ${command.key}=${command.json_string}`);
+    if (command.data !== undefined) {
+      console.log(`[FakeBridge] received dataSubmission: ${command.key}=<${command.format ?? 'binary'}, ${command.data.byteLength} bytes>`);
+    } else {
+      console.log(`[FakeBridge] received dataSubmission: ${command.key}=${command.json_string}`);
+    }
     // Post the data, this allows testing the data submission
     try {
-      const response = await fetch('/data-submission', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({key: command.key, data: command.json_string}),
-      });
+      const response = command.data !== undefined
+        ? await fetch(`/data-submission?key=${encodeURIComponent(command.key)}`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/vnd.apache.arrow.stream',
+          },
+          body: command.data,
+        })
+        : await fetch('/data-submission', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({key: command.key, data: command.json_string}),
+        });
 
       if (!response.ok) {
         console.error(`[FakeBridge] Data submission failed with status: ${response.status}`);
@@ -21,5 +21,6 @@ export default class Assembly {
     this.logForwarder = new LogForwarder((entries) => bridge.sendLogs(entries), logLevel)
     this.windowLogSource = new WindowLogSource(this.logForwarder)
     this.processingEngine = new WorkerProcessingEngine(sessionId, worker, this.router, this.logForwarder)
+    this.visualizationEngine.search = async (tableId, query) => await this.processingEngine.search(tableId, query)
   }
 }
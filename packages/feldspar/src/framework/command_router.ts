@@ -1,4 +1,4 @@
-import { Command, Response, isCommandSystem, isCommandSystemExit, isCommandUI, CommandUI, CommandSystem } from './types/commands'
+import { Command, Response, isCommandSystem, isCommandSystemExit, isCommandUI, isCommandUIAppend, CommandUI, CommandSystem } from './types/commands'
 import { CommandHandler, Bridge } from './types/modules'
 import ReactEngine from './visualization/react/engine'
 
@@ -34,7 +34,10 @@ export default class CommandRouter implements CommandHandler {
   }
 
   onCommandUI (command: CommandUI, resolve: (response: Response) => void): void {
-    this.visualizationEngine.render(command)
+    const response = isCommandUIAppend(command)
+      ? this.visualizationEngine.append(command)
+      : this.visualizationEngine.render(command)
+    response
       .then((response) => {
         if (!response || !response.__type__) {
           console.error('[CommandRouter] Invalid response:', response);
@@ -10,6 +10,8 @@ export default class WorkerProcessingEngine {
 
   resolveInitialized!: () => void
   resolveContinue!: () => void
+  pendingSearches = new Map<number, (rowIds: string[] | undefined) => void>()
+  searchCount = 0
 
   constructor (
     sessionId: string,
@@ -59,6 +61,10 @@ export default class WorkerProcessingEngine {
         this.handleRunCycle(event.data.scriptEvent)
         break
 
+      case 'searchTableDone':
+        this.handleSearchTableDone(event.data.requestId, event.data.rowIds)
+        break
+
       case 'error':
         this.logger?.log('error', `Python error: ${event.data.error}`, { stack: event.data.stack })
         break
@@ -98,6 +104,24 @@ export default class WorkerProcessingEngine {
     this.worker.postMessage({ eventType: 'nextRunCycle', response })
   }
 
+  /**
+   * Searches a consent table with the index the worker built for it.
+   * Resolves with the ids of the matching rows, or undefined when the worker has no index of the table.
+   */
+  async search (tableId: string, query: string[]): Promise<string[] | undefined> {
+    return await new Promise<string[] | undefined>((resolve) => {
+      const requestId = ++this.searchCount
+      this.pendingSearches.set(requestId, resolve)
+      this.worker.postMessage({ eventType: 'searchTable', requestId, tableId, query })
+    })
+  }
+
+  handleSearchTableDone (requestId: number, rowIds: string[] | null): void {
+    const resolve = this.pendingSearches.get(requestId)
+    this.pendingSearches.delete(requestId)
+    resolve?.(rowIds ?? undefined)
+  }
+
   terminate (): void {
     this.worker.terminate()
   }
@@ -109,10 +109,11 @@ export function isCommandSystemExit (arg: any): arg is CommandSystemExit {
 }
 
 export type CommandUI =
-  CommandUIRender
+  CommandUIRender |
+  CommandUIAppend
 
 export function isCommandUI (arg: any): arg is CommandUI {
-  return isCommandUIRender(arg)
+  return isCommandUIRender(arg) || isCommandUIAppend(arg)
 }
 
 export interface CommandSystemLog {
@@ -129,10 +130,15 @@ export function isCommandSystemLog (arg: any): arg is CommandSystemLog {
 export interface CommandSystemDonate {
   __type__: 'CommandSystemDonate'
   key: string
-  json_string: string
+  /** Donated data as JSON text, absent for binary donations */
+  json_string?: string
+  /** Format of data, 'arrow' for an Arrow IPC stream */
+  format?: 'arrow'
+  data?: Uint8Array
 }
 export function isCommandSystemDonate (arg: any): arg is CommandSystemDonate {
-  return isInstanceOf<CommandSystemDonate>(arg, 'CommandSystemDonate', ['key', 'json_string'])
+  return isInstanceOf<CommandSystemDonate>(arg, 'CommandSystemDonate', ['key']) &&
+    (typeof arg.json_string === 'string' || arg.data instanceof Uint8Array)
 }
 
 export interface CommandUIRender {
@@ -142,3 +148,13 @@ export interface CommandUIRender {
 export function isCommandUIRender (arg: any): arg is CommandUIRender {
   return isInstanceOf<CommandUIRender>(arg, 'CommandUIRender', ['page']) && isPropsUIPage(arg.page)
 }
+
+export interface CommandUIAppend {
+  __type__: 'CommandUIAppend'
+  table_id: string
+  data_frame: any
+  done: boolean
+}
+export function isCommandUIAppend (arg: any): arg is CommandUIAppend {
+  return isInstanceOf<CommandUIAppend>(arg, 'CommandUIAppend', ['table_id', 'data_frame', 'done'])
+}
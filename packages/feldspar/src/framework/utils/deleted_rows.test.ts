@@ -0,0 +1,28 @@
+import { encodeDeletedRows } from './deleted_rows';
+import { PropsUITableRow } from '../types/elements';
+
+function makeRows(ids: string[]): PropsUITableRow[] {
+  return ids.map((id) => ({
+    __type__: 'PropsUITableRow' as const,
+    id,
+    cells: [{ __type__: 'PropsUITableCell' as const, text: `value-${id}` }],
+  }));
+}
+
+describe('encodeDeletedRows', () => {
+  it('should encode nothing when no rows are deleted', () => {
+    const rows = makeRows(['0', '1', '2']);
+    expect(encodeDeletedRows(rows, rows)).toEqual([]);
+  });
+
+  it('should merge consecutive integer ids into ranges', () => {
+    const rows = makeRows(['0', '1', '2', '3', '4', '5', '6']);
+    const kept = rows.filter((row) => ['0', '4'].includes(row.id));
+    expect(encodeDeletedRows(rows, kept)).toEqual([[1, 4], [5, 7]]);
+  });
+
+  it('should send other ids as they are', () => {
+    const rows = makeRows(['a', '1', '2', 'b', '01']);
+    expect(encodeDeletedRows(rows, [])).toEqual(['a', [1, 3], 'b', '01']);
+  });
+});
@@ -0,0 +1,37 @@
+import { PropsUITableRow } from '../types/elements';
+
+/**
+ * A range [start, end) of integer row ids, or the id of a single row when
+ * the ids of a table are not integers.
+ */
+export type DeletedRows = Array<[number, number] | string>;
+
+function integerId(id: string): number | undefined {
+  const number = Number(id);
+  return Number.isSafeInteger(number) && String(number) === id ? number : undefined;
+}
+
+/**
+ * Encode the rows of allRows that are missing from keptRows as ranges of row ids,
+ * so the consent page sends the deletions to the worker instead of the table data.
+ */
+export function encodeDeletedRows(allRows: PropsUITableRow[], keptRows: PropsUITableRow[]): DeletedRows {
+  const kept = new Set(keptRows.map((row) => row.id));
+  const deleted: DeletedRows = [];
+  for (const row of allRows) {
+    if (kept.has(row.id)) continue;
+
+    const id = integerId(row.id);
+    if (id === undefined) {
+      deleted.push(row.id);
+      continue;
+    }
+    const last = deleted[deleted.length - 1];
+    if (Array.isArray(last) && last[1] === id) {
+      last[1] = id + 1;
+    } else {
+      deleted.push([id, id + 1]);
+    }
+  }
+  return deleted;
+}
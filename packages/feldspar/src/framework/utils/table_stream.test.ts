@@ -0,0 +1,49 @@
+import { TableStream } from './table_stream';
+
+describe('TableStream', () => {
+  it('should pass rows to the subscribed table', () => {
+    const stream = new TableStream();
+    stream.open(['files']);
+    const received: any[] = [];
+    stream.subscribe('files', (dataFrame) => received.push(dataFrame));
+
+    expect(stream.push('files', { name: { 0: 'a' } }, false)).toBe(false);
+    expect(received).toEqual([{ name: { 0: 'a' } }]);
+  });
+
+  it('should keep rows until the table subscribes', () => {
+    const stream = new TableStream();
+    stream.open(['files']);
+    stream.push('files', '{"name":{"0":"a"}}', false);
+    stream.push('files', '{"name":{"1":"b"}}', false);
+
+    const received: any[] = [];
+    stream.subscribe('files', (dataFrame) => received.push(dataFrame));
+    expect(received).toEqual(['{"name":{"0":"a"}}', '{"name":{"1":"b"}}']);
+  });
+
+  it('should close when the last table is done', () => {
+    const stream = new TableStream();
+    stream.open(['a', 'b']);
+    const close = jest.fn();
+    stream.onClose(close);
+
+    expect(stream.push('a', {}, true)).toBe(false);
+    expect(stream.isOpen()).toBe(true);
+    expect(stream.isOpen('a')).toBe(false);
+    expect(stream.push('b', {}, true)).toBe(true);
+    expect(stream.isOpen()).toBe(false);
+    expect(close).toHaveBeenCalledTimes(1);
+  });
+
+  it('should ignore tables that are not streaming', () => {
+    const stream = new TableStream();
+    stream.open(['files']);
+    stream.open([]);
+    const listener = jest.fn();
+    stream.subscribe('files', listener);
+
+    expect(stream.push('files', {}, true)).toBe(false);
+    expect(listener).not.toHaveBeenCalled();
+  });
+});
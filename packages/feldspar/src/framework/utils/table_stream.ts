@@ -0,0 +1,71 @@
+/**
+ * Rows of a streaming consent table, sent as a DataFrame.to_json object or its JSON text.
+ */
+export type TableAppendListener = (dataFrame: any) => void
+
+/**
+ * Routes the rows the worker appends to the streaming consent tables of the page.
+ *
+ * Rows that arrive before a table subscribes are kept until it does, so no
+ * append is lost while the page is being mounted.
+ */
+export class TableStream {
+  private readonly openTables = new Set<string>()
+  private readonly listeners = new Map<string, TableAppendListener>()
+  private readonly buffered = new Map<string, any[]>()
+  private readonly closeListeners = new Set<() => void>()
+
+  /** Start streaming into the given tables, forgetting the tables of an earlier page */
+  open (tableIds: string[]): void {
+    this.openTables.clear()
+    this.listeners.clear()
+    this.buffered.clear()
+    this.closeListeners.clear()
+    tableIds.forEach((id) => this.openTables.add(id))
+  }
+
+  isOpen (tableId?: string): boolean {
+    return tableId === undefined ? this.openTables.size > 0 : this.openTables.has(tableId)
+  }
+
+  subscribe (tableId: string, listener: TableAppendListener): () => void {
+    this.listeners.set(tableId, listener)
+    const buffered = this.buffered.get(tableId) ?? []
+    this.buffered.delete(tableId)
+    buffered.forEach((dataFrame) => listener(dataFrame))
+    return () => {
+      if (this.listeners.get(tableId) === listener) this.listeners.delete(tableId)
+    }
+  }
+
+  /** Called once all tables are complete */
+  onClose (listener: () => void): () => void {
+    this.closeListeners.add(listener)
+    return () => { this.closeListeners.delete(listener) }
+  }
+
+  /**
+   * Append rows to a table, done marks its last rows.
+   *
+   * @returns whether this completed the last open table
+   */
+  push (tableId: string, dataFrame: any, done: boolean): boolean {
+    if (!this.openTables.has(tableId)) {
+      console.warn(`[TableStream] Rows for table "${tableId}" that is not streaming`)
+      return false
+    }
+
+    const listener = this.listeners.get(tableId)
+    if (listener !== undefined) {
+      listener(dataFrame)
+    } else {
+      this.buffered.set(tableId, [...(this.buffered.get(tableId) ?? []), dataFrame])
+    }
+
+    if (!done) return false
+    this.openTables.delete(tableId)
+    if (this.openTables.size > 0) return false
+    this.closeListeners.forEach((close) => close())
+    return true
+  }
+}
@@ -1,4 +1,5 @@
-import { truncateRows } from './truncation';
+import { truncateRows, appendRows, MAX_ROWS } from './truncation';
+import { encodeDeletedRows } from './deleted_rows';
 import { PropsUITableRow } from '../types/elements';
 
 function makeRows(count: number): PropsUITableRow[] {
@@ -58,3 +59,40 @@ describe('truncateRows', () => {
     expect(result.truncatedRowCount).toBe(0);
   });
 });
+
+describe('appendRows', () => {
+  function numberedRows(start: number, count: number): PropsUITableRow[] {
+    return Array.from({ length: count }, (_, i) => ({
+      __type__: 'PropsUITableRow' as const,
+      id: String(start + i),
+      cells: [{ __type__: 'PropsUITableCell' as const, text: `value-${start + i}` }],
+    }));
+  }
+
+  it('should add the rows that fit', () => {
+    const result = appendRows(makeRows(3), makeRows(4), 5);
+
+    expect(result.addedRows.map((row) => row.id)).toEqual(['row-0', 'row-1']);
+    expect(result.truncatedRowCount).toBe(2);
+  });
+
+  it('should not add rows to a full table', () => {
+    const result = appendRows(makeRows(5), makeRows(2), 5);
+
+    expect(result.addedRows).toEqual([]);
+    expect(result.truncatedRowCount).toBe(2);
+  });
+
+  it('should encode the rows appended past MAX_ROWS as deleted', () => {
+    let allRows = numberedRows(0, MAX_ROWS - 10);
+    let shownRows = allRows;
+    for (const appended of [numberedRows(MAX_ROWS - 10, 5), numberedRows(MAX_ROWS - 5, 20)]) {
+      const { addedRows } = appendRows(shownRows, appended);
+      allRows = [...allRows, ...appended];
+      shownRows = [...shownRows, ...addedRows];
+    }
+
+    expect(shownRows.length).toBe(MAX_ROWS);
+    expect(encodeDeletedRows(allRows, shownRows)).toEqual([[MAX_ROWS, MAX_ROWS + 15]]);
+  });
+});
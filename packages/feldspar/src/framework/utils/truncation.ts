@@ -7,3 +7,14 @@ export function truncateRows(rows: PropsUITableRow[], maxRows: number = MAX_ROWS
   const truncatedRows = rows.slice(0, maxRows);
   return { truncatedRows, truncatedRowCount };
 }
+
+/**
+ * Add the rows appended to a streaming table after the rows that are shown, up to maxRows.
+ * The appended rows that do not fit are not shown, like the rows cut by truncateRows.
+ */
+export function appendRows(shownRows: PropsUITableRow[], appendedRows: PropsUITableRow[], maxRows: number = MAX_ROWS) {
+  const room = Math.max(0, maxRows - shownRows.length);
+  const addedRows = appendedRows.slice(0, room);
+  const truncatedRowCount = appendedRows.length - addedRows.length;
+  return { addedRows, truncatedRowCount };
+}
@@ -1,12 +1,18 @@
-import { Response, CommandUIRender } from "../../types/commands";
-import { PropsUIPage } from "../../types/pages";
-import VisualizationFactory from "./factory";
+import { Response, CommandUIRender, CommandUIAppend } from "../../types/commands";
+import { PropsUIPage, isPropsUIPageDataSubmission } from "../../types/pages";
+import { PropsUIPromptConsentFormTable, isPropsUIPromptConsentFormTable } from "../../types/prompts";
+import { TableStream } from "../../utils/table_stream";
+import VisualizationFactory, { TableSearch } from "./factory";
 import { JSX } from "react";
 import React from "react";
 
 export default class ReactEngine {
   factory: VisualizationFactory;
   locale!: string;
+  search?: TableSearch;
+  private stream = new TableStream();
+  // Payload of a page with streaming tables, returned when the last rows are appended
+  private streamingPayload?: Promise<any>;
   private setState?: (state: { elements: JSX.Element[] }) => void;
 
   constructor(factory: VisualizationFactory) {
@@ -25,14 +31,35 @@ export default class ReactEngine {
 
   async render(command: CommandUIRender): Promise<Response> {
     console.debug("[ReactEngine] render", command);
-    const payload = await this.renderPage(command.page);
-    console.log("[ReactEngine] render done", command, payload);
-    return { __type__: "Response", command, payload };
+    const tableIds = streamingTableIds(command.page);
+    this.stream.open(tableIds);
+    this.streamingPayload = undefined;
+    const payload = this.renderPage(command.page);
+    if (tableIds.length > 0) {
+      // The script appends the rest of the rows while the participant reviews the page
+      this.streamingPayload = payload;
+      return { __type__: "Response", command, payload: { __type__: "PayloadVoid", value: undefined } };
+    }
+    const result = await payload;
+    console.log("[ReactEngine] render done", command, result);
+    return { __type__: "Response", command, payload: result };
+  }
+
+  async append(command: CommandUIAppend): Promise<Response> {
+    const closed = this.stream.push(command.table_id, command.data_frame, command.done);
+    const streamingPayload = this.streamingPayload;
+    if (closed && streamingPayload !== undefined) {
+      this.streamingPayload = undefined;
+      const payload = await streamingPayload;
+      console.log("[ReactEngine] streaming page done", command, payload);
+      return { __type__: "Response", command, payload };
+    }
+    return { __type__: "Response", command, payload: { __type__: "PayloadVoid", value: undefined } };
   }
 
   renderPage(props: PropsUIPage): Promise<any> {
     return new Promise<any>((resolve) => {
-      const context = { locale: this.locale, resolve };
+      const context = { locale: this.locale, resolve, search: this.search, stream: this.stream };
       const page = this.factory.createPage(props, context);
       this.updateElements([page]);
     });
@@ -50,3 +77,11 @@ export default class ReactEngine {
     this.setState = undefined;
   }
 }
+
+function streamingTableIds(page: PropsUIPage): string[] {
+  if (!isPropsUIPageDataSubmission(page)) return [];
+  const body: unknown[] = Array.isArray(page.body) ? page.body : [page.body];
+  return body
+    .filter((item): item is PropsUIPromptConsentFormTable => isPropsUIPromptConsentFormTable(item) && item.streaming === true)
+    .map((item) => item.id);
+}
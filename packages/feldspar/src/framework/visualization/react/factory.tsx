@@ -3,12 +3,17 @@ import { Payload } from "../../types/commands";
 import { PageFactory } from "./factories/base";
 import { EndPageFactory } from "./factories/end_page";
 import { DataSubmissionPageFactory } from "./factories/data_submission_page";
+import { TableStream } from "../../utils/table_stream";
 import { JSX } from "react";
 import React from "react";
 
+export type TableSearch = (tableId: string, query: string[]) => Promise<string[] | undefined>;
+
 export interface ReactFactoryContext {
   locale: string;
   resolve?: (payload: Payload) => void;
+  search?: TableSearch;
+  stream?: TableStream;
 }
 
 export default class ReactFactory {
@@ -43,8 +43,11 @@ interface State {
   visibility: Visibility
 }
 
-export const Table = ({ id, head, body, readOnly = false, locale, onChange }: Props): JSX.Element => {
+export const Table = ({ id, head, body, readOnly = false, locale, search, onChange }: Props): JSX.Element => {
   const query = React.useRef<string[]>([])
+  // Ids of the rows matching the query, as found by the worker
+  const matchingRowIds = React.useRef<Set<string> | undefined>(undefined)
+  const searchCount = React.useRef<number>(0)
   const alteredRows = React.useRef<PropsUITableRow[]>(body.rows)
   const filteredRows = React.useRef<PropsUITableRow[]>(alteredRows.current)
   const desktopPageSize = 7
@@ -72,6 +75,23 @@ export const Table = ({ id, head, body, readOnly = false, locale, onChange }: Pr
 
   const [state, setState] = React.useState<State>(initialState)
 
+  // Rows appended to a streaming table are added after the rows the participant kept
+  const rowCount = React.useRef<number>(body.rows.length)
+  React.useEffect(() => {
+    if (body.rows.length <= rowCount.current) {
+      rowCount.current = body.rows.length
+      return
+    }
+    alteredRows.current = [...alteredRows.current, ...body.rows.slice(rowCount.current)]
+    rowCount.current = body.rows.length
+    if (search !== undefined && query.current.length > 0) {
+      // The worker indexed the new rows as well
+      handleSearch(query.current)
+    } else {
+      updateFilteredRows()
+    }
+  }, [body.rows])
+
   const copy = prepareCopy(locale)
 
   function display (element: keyof Visibility): string {
@@ -102,6 +122,10 @@ export const Table = ({ id, head, body, readOnly = false, locale, onChange }: Pr
     if (query.current.length === 0) {
       return alteredRows.current
     }
+    const rowIds = matchingRowIds.current
+    if (rowIds !== undefined) {
+      return alteredRows.current.filter((row) => rowIds.has(row.id))
+    }
     return alteredRows.current.filter((row) => matchRow(row, query.current))
   }
 
@@ -189,6 +213,27 @@ export const Table = ({ id, head, body, readOnly = false, locale, onChange }: Pr
 
   function handleSearch (newQuery: string[]): void {
     query.current = newQuery
+    const requestId = ++searchCount.current
+    const words = newQuery.filter((word) => word !== '')
+    if (search === undefined || words.length === 0) {
+      matchingRowIds.current = undefined
+      updateFilteredRows()
+      return
+    }
+
+    // The worker indexed the table, without an index the rows are matched here
+    const handleRowIds = (rowIds: string[] | undefined): void => {
+      if (requestId !== searchCount.current) {
+        // A newer query was entered in the meantime
+        return
+      }
+      matchingRowIds.current = rowIds !== undefined ? new Set(rowIds) : undefined
+      updateFilteredRows()
+    }
+    search(id, words).then(handleRowIds, () => handleRowIds(undefined))
+  }
+
+  function updateFilteredRows (): void {
     filteredRows.current = filterRows()
     setState((state) => {
       const desktopPageCount = getPageCount(desktopPageSize)
@@ -25,6 +25,10 @@ export const DataSubmissionPage = (props: Props): JSX.Element => {
   }, [DataSubmissionData]);
 
   function onDonate(): void {
+    if (props.stream?.isOpen() === true) {
+      // Rows that are still being appended have not been reviewed
+      return;
+    }
     const DataSubmissionDataObject = Object.fromEntries(DataSubmissionData.current);
     console.log("onDonate", JSON.stringify(DataSubmissionDataObject));
     props.resolve?.({ __type__: "PayloadJSON", value: JSON.stringify(DataSubmissionDataObject) });
@@ -49,7 +53,7 @@ export const DataSubmissionPage = (props: Props): JSX.Element => {
   }
 
   function renderBody(props: Props): JSX.Element[] {
-    const context = { locale: locale, resolve: props.resolve, onDataSubmissionDataChanged, onDonate, onCancel};
+    const context = { locale: locale, resolve: props.resolve, search: props.search, stream: props.stream, onDataSubmissionDataChanged, onDonate, onCancel};
     const bodyItems = Array.isArray(props.body) ? props.body : [props.body];
 
     return bodyItems.map((item, index) => {
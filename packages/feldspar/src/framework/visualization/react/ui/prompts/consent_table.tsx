@@ -1,6 +1,5 @@
 import {
   PropsUITable,
-  PropsUITableHead,
   PropsUITableRow,
 } from "../../../../types/elements";
 import { Table } from "../elements/table";
@@ -15,10 +14,10 @@ import {
   DataSubmissionData,
   DataSubmissionProvider,
 } from "../../../../types/data_submission";
-import _ from "lodash";
-import { PromptContext } from "./factory";
+import { PromptContext, dataFrameRows, parseDataFrame } from "./factory";
 import { NumberIcon } from '../elements/number_icon'
-import { truncateRows, MAX_ROWS } from '../../../../utils/truncation'
+import { truncateRows, appendRows, MAX_ROWS } from '../../../../utils/truncation'
+import { encodeDeletedRows } from '../../../../utils/deleted_rows'
 
 interface Props {
   table: PropsUITable & {
@@ -28,6 +27,8 @@ interface Props {
     deletedRowCount: number;
   };
   readOnly?: boolean;
+  // The worker appends rows to the table while it is shown
+  streaming?: boolean;
   context: PromptContext;
   onChange: (id: string, rows: PropsUITableRow[]) => void;
 }
@@ -35,7 +36,7 @@ interface Props {
 export interface ConsentTableHandle extends DataSubmissionProvider {}
 
 export const ConsentTable = forwardRef<ConsentTableHandle | null, Props>(
-  ({ table, readOnly = false, context, onChange }, ref): JSX.Element => {
+  ({ table, readOnly = false, streaming = false, context, onChange }, ref): JSX.Element => {
     const [currentTable, setCurrentTable] = React.useState<
       PropsUITable & {
         number: number;
@@ -44,14 +45,24 @@ export const ConsentTable = forwardRef<ConsentTableHandle | null, Props>(
         deletedRowCount: number;
       }
     >(truncatedTable(table));
+    // The rows of the table including the appended rows, the deletions are relative to these
+    const allRows = React.useRef<PropsUITableRow[]>(table.body.rows ?? []);
+    // The rows that are shown and the rows of those the participant did not delete
+    const shownRows = React.useRef<PropsUITableRow[]>(truncateRows(table.body.rows ?? []).truncatedRows);
+    const keptRows = React.useRef<PropsUITableRow[]>(shownRows.current);
 
-    const handleChange = (rows: PropsUITableRow[], deletedCount: number) => {
+    const submitRows = () => {
       context.onDataSubmissionDataChanged(
         table.id,
-        getDataSubmissionData(table.head, rows, deletedCount)
+        getDataSubmissionData(allRows.current, keptRows.current, allRows.current.length - keptRows.current.length)
       );
     };
 
+    const handleChange = (rows: PropsUITableRow[]) => {
+      keptRows.current = rows;
+      submitRows();
+    };
+
     React.useEffect(() => {
       console.log("ConsentTable useEffect", currentTable);
       const { truncatedRows, truncatedRowCount } = truncateRows(table.body.rows ?? []);
@@ -59,14 +70,33 @@ export const ConsentTable = forwardRef<ConsentTableHandle | null, Props>(
         console.warn(`ConsentTable "${table.id}" initial data exceeds ${MAX_ROWS} rows. Truncating.`);
       }
 
+      allRows.current = table.body.rows ?? [];
+      shownRows.current = truncatedRows;
+      keptRows.current = truncatedRows;
       setCurrentTable(truncatedTable(table));
-
-      context.onDataSubmissionDataChanged(
-        table.id,
-        getDataSubmissionData(table.head, truncatedRows, truncatedRowCount)
-      );
+      submitRows();
     }, [table]);
 
+    // Subscribed after the effect above, which resets the rows to those of the table
+    React.useEffect(() => {
+      if (!streaming || context.stream === undefined) return;
+      return context.stream.subscribe(table.id, (dataFrame) => {
+        const rows = dataFrameRows(parseDataFrame(dataFrame));
+        if (rows.length === 0) return;
+        const { addedRows, truncatedRowCount } = appendRows(shownRows.current, rows);
+        allRows.current = [...allRows.current, ...rows];
+        shownRows.current = [...shownRows.current, ...addedRows];
+        keptRows.current = [...keptRows.current, ...addedRows];
+        setCurrentTable((current) => ({
+          ...current,
+          body: { ...current.body, rows: shownRows.current },
+          deletedRowCount: current.deletedRowCount + truncatedRowCount,
+        }));
+        // The rows that are not shown are not donated
+        submitRows();
+      });
+    }, [streaming, context.stream, table.id]);
+
     return (
       <div key={table.id} className='flex flex-col gap-4 mb-20'>
         <div className='flex flex-row gap-4 items-center'>
@@ -79,6 +109,7 @@ export const ConsentTable = forwardRef<ConsentTableHandle | null, Props>(
           {...currentTable}
           readOnly={readOnly}
           locale={context.locale}
+          search={context.search}
           onChange={handleChange}
           id={currentTable.id}
           key={currentTable.id}
@@ -105,31 +136,18 @@ function truncatedTable(
   };
 }
 
+// The worker holds the table data, so only the deleted (and truncated) rows are sent back
 function getDataSubmissionData(
-  head: PropsUITableHead,
+  allRows: PropsUITableRow[],
   rows: PropsUITableRow[],
   deletedRowCount: number
 ): DataSubmissionData {
   return {
-    data: serializeTableData(head, rows),
+    deleted: encodeDeletedRows(allRows, rows),
     metadata: {
       deletedRowCount,
     },
   };
 }
 
-function serializeTableData(
-  head: PropsUITableHead,
-  rows: PropsUITableRow[]
-): any[] {
-  const limited = rows.slice(0, MAX_ROWS);
-  return limited.map((row) => serializeRow(row, head));
-}
-
-function serializeRow(row: PropsUITableRow, head: PropsUITableHead): any {
-  const keys = head.cells.map((cell) => cell.text);
-  const values = row.cells.map((cell) => cell.text);
-  return _.fromPairs(_.zip(keys, values));
-}
-
 ConsentTable.displayName = "ConsentTable";
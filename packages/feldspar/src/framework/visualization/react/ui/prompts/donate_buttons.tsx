@@ -1,9 +1,10 @@
-import React, { JSX, useCallback, useState } from "react";
+import React, { JSX, useCallback, useEffect, useState } from "react";
 import { LabelButton, PrimaryButton } from "../elements/button";
 import { BodyLarge } from "../elements/text";
 import TextBundle from "../../../../text_bundle";
 import { Translator } from "../../../../translator";
 import { Text } from "../../../../types/elements";
+import { TableStream } from "../../../../utils/table_stream";
 
 interface Props {
   onDonate: () => void;
@@ -11,24 +12,41 @@ interface Props {
   locale: string;
   donateQuestion?: Text;
   donateButton?: Text;
+  stream?: TableStream;
 }
 
-export const DonateButtons = ({ onDonate, onCancel, locale, donateQuestion, donateButton }: Props): JSX.Element => {
+export const DonateButtons = ({ onDonate, onCancel, locale, donateQuestion, donateButton, stream }: Props): JSX.Element => {
     const [waiting, setWaiting] = useState(false);
-    
+    // Rows are still being added to the tables, the data cannot be donated yet
+    const [streaming, setStreaming] = useState(stream?.isOpen() ?? false);
+
+    useEffect(() => {
+        if (stream === undefined) return;
+        if (!stream.isOpen()) {
+            // The last rows arrived before the buttons were mounted
+            setStreaming(false);
+            return;
+        }
+        return stream.onClose(() => setStreaming(false));
+    }, [stream]);
+
     const handleDonate = useCallback(() => {
+        if (streaming) return;
         setWaiting(true);
         onDonate();
-    }, [onDonate, setWaiting]);
+    }, [onDonate, setWaiting, streaming]);
+
+  function question(): Text {
+    if (waiting) return submittingLabel;
+    if (streaming) return streamingLabel;
+    return donateQuestion ?? donateQuestionLabel;
+  }
 
   return (
     <div>
       <BodyLarge
         margin=""
-        text={Translator.translate(
-          waiting ? submittingLabel : (donateQuestion ?? donateQuestionLabel),
-          locale
-        )}
+        text={Translator.translate(question(), locale)}
       />
       <div className="flex flex-row gap-4 mt-4 mb-4">
         <PrimaryButton
@@ -37,7 +55,8 @@ export const DonateButtons = ({ onDonate, onCancel, locale, donateQuestion, dona
             locale
           )}
           onClick={handleDonate}
-          color="bg-success text-white"
+          color={streaming ? "bg-grey3 text-white" : "bg-success text-white"}
+          enabled={!streaming}
           spinning={waiting}
         />
         <LabelButton
@@ -85,3 +104,12 @@ const submittingLabel = new TextBundle()
   .add("nl", "Gegevens worden overgedragen… Houd dit venster open.")
   .add("ro", "Se transferă datele… Vă rugăm să păstrați această fereastră deschisă.")
   .add("lt", "Duomenys perduodami… Prašome neuždarinėti šio lango.");
+
+const streamingLabel = new TextBundle()
+  .add("en", "Your data is still being loaded. You can review the rows shown so far.")
+  .add("de", "Ihre Daten werden noch geladen. Sie können die bereits angezeigten Zeilen überprüfen.")
+  .add("it", "I tuoi dati sono ancora in caricamento. Puoi controllare le righe già mostrate.")
+  .add("es", "Sus datos todavía se están cargando. Puede revisar las filas que ya se muestran.")
+  .add("nl", "Uw gegevens worden nog geladen. U kunt de rijen die al worden getoond bekijken.")
+  .add("ro", "Datele dvs. se încarcă încă. Puteți verifica rândurile afișate până acum.")
+  .add("lt", "Jūsų duomenys dar įkeliami. Galite peržiūrėti jau rodomas eilutes.");
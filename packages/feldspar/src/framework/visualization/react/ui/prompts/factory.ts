@@ -18,7 +18,7 @@ import {
   PropsUIPromptText,
   isPropsUIPromptText
 } from '../../../../types/prompts'
-import { Translatable, PropsUITable } from '../../../../types/elements'
+import { Translatable, PropsUITable, PropsUITableRow } from '../../../../types/elements'
 import TextBundle from '../../../../text_bundle'
 import { Translator } from '../../../../translator'
 import { FileInput } from './file_input'
@@ -87,8 +87,8 @@ export class RadioInputFactory implements PromptFactory {
 export class TableFactory implements PromptFactory {
   create(body: unknown, context: PromptContext): JSX.Element | null {
     if (isPropsUIPromptConsentFormTable(body)) {
-      const { id, number, title, description, data_frame } = body;
-      const dataFrame = JSON.parse(data_frame);
+      const { id, number, title, description, data_frame, streaming } = body;
+      const dataFrame = parseDataFrame(data_frame);
 
       // Translate the column headers when overrides are provided
       const headers = body.headers || {};
@@ -104,16 +104,7 @@ export class TableFactory implements PromptFactory {
       });
       const head = { __type__: "PropsUITableHead" as const, cells: headCells };
       
-      const rows = Object.keys(dataFrame[Object.keys(dataFrame)[0]] || {}).map(rowIndex => ({
-        __type__: "PropsUITableRow" as const,
-        id: rowIndex,
-        cells: Object.keys(dataFrame).map(column => ({
-          __type__: "PropsUITableCell" as const,
-          text: String(dataFrame[column][rowIndex])
-        }))
-      }));
-
-      const tableBody = { __type__: "PropsUITableBody" as const, rows };
+      const tableBody = { __type__: "PropsUITableBody" as const, rows: dataFrameRows(dataFrame) };
 
       const parsedTable: PropsUITable = {
         __type__: 'PropsUITable',
@@ -130,6 +121,7 @@ export class TableFactory implements PromptFactory {
           description: description && Translator.translate(description, context.locale),
           deletedRowCount: 0
         },
+        streaming: streaming === true,
         context,
         onChange: () => {}  // Tables in data submission page are read-only
       });
@@ -138,6 +130,22 @@ export class TableFactory implements PromptFactory {
   }
 }
 
+// The worker sends a table as JSON text, or parsed along with the command
+export function parseDataFrame(data_frame: any): any {
+  return typeof data_frame === 'string' ? JSON.parse(data_frame) : data_frame;
+}
+
+export function dataFrameRows(dataFrame: any): PropsUITableRow[] {
+  return Object.keys(dataFrame[Object.keys(dataFrame)[0]] || {}).map(rowIndex => ({
+    __type__: "PropsUITableRow" as const,
+    id: rowIndex,
+    cells: Object.keys(dataFrame).map(column => ({
+      __type__: "PropsUITableCell" as const,
+      text: String(dataFrame[column][rowIndex])
+    }))
+  }));
+}
+
 export class DonateButtonsFactory implements PromptFactory {
   create(body: unknown, context: PromptContext): JSX.Element | null {
     if (isPropsUIDataSubmissionButtons(body)) {
@@ -0,0 +1,100 @@
+"""
+Benchmark of donation formats.
+
+Compares the JSON donation of consent tables (consent.donation_data) to
+the Arrow IPC donation (consent.donation_arrow), written with pyarrow
+and with the pure Python writer of port.api.arrow. For every format it
+reports the time to encode the donation, its size, its size as sent
+from the worker (base64 for the Arrow stream) and the time a researcher
+needs to load it back into DataFrames.
+
+Usage (from packages/python):
+    python -m benchmarks.bench_donation_format --rows 100000 --tables 3
+"""
+
+import argparse
+import base64
+import json
+import random
+import time
+
+import pandas as pd
+
+import port.api.props as props
+from port.api.arrow import PYARROW, PYTHON, pyarrow
+from port.api.consent import donation_arrow, donation_data
+
+WORDS = "video music cat dog news weather recipe travel game sport".split()
+
+
+def make_tables(rows, tables, seed):
+    rng = random.Random(seed)
+    text = props.Translatable({"en": "Title", "nl": "Titel"})
+    result = []
+    for number in range(tables):
+        df = pd.DataFrame(
+            {
+                "title": [" ".join(rng.choices(WORDS, k=rng.randint(2, 8))) for _ in range(rows)],
+                "channel": [rng.choice(WORDS) for _ in range(rows)],
+                "views": [rng.randint(0, 10**6) for _ in range(rows)],
+                "duration": [rng.random() * 600 for _ in range(rows)],
+                "watched": pd.date_range("2024-01-01", periods=rows, freq="min", tz="UTC"),
+            }
+        )
+        result.append(props.PropsUIPromptConsentFormTable(f"table_{number}", number + 1, text, text, df, data_frame_max_size=rows, searchable=False))
+    payload = json.dumps({table.id: {"deleted": [], "metadata": {"deletedRowCount": 0}} for table in result})
+    return result, payload
+
+
+def load_json(data):
+    return {table_id: pd.DataFrame(table["data"]) for table_id, table in json.loads(data).items()}
+
+
+def load_arrow(data):
+    donation = pyarrow.ipc.open_stream(data).read_all().to_pylist()
+    return {row["table"]: pyarrow.ipc.open_stream(row["data"]).read_pandas() for row in donation}
+
+
+def measure(function, *args, repeat=3):
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        seconds.append(time.perf_counter() - started)
+    return result, min(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of donation formats")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--tables", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tables, payload = make_tables(args.rows, args.tables, args.seed)
+    print(f"{args.tables} tables of {args.rows} rows")
+    print(f"{'format':<22} {'encode':>9} {'size':>10} {'sent':>10} {'load':>9}")
+
+    json_data, json_seconds = measure(donation_data, tables, payload, repeat=args.repeat)
+    json_size = len(json_data.encode())
+    load_seconds = measure(load_json, json_data, repeat=args.repeat)[1]
+    formats = [("json", json_size, json_seconds, json_size, load_seconds)]
+
+    engines = [PYTHON] if pyarrow is None else [PYARROW, PYTHON]
+    for engine in engines:
+        data, seconds = measure(donation_arrow, tables, payload, engine, repeat=args.repeat)
+        load_seconds = measure(load_arrow, data, repeat=args.repeat)[1] if pyarrow is not None else None
+        formats.append((f"arrow ({engine})", len(data), seconds, len(base64.b64encode(data)), load_seconds))
+
+    for name, size, seconds, sent, load_seconds in formats:
+        # Loading an Arrow donation needs pyarrow
+        load = f"{load_seconds:>8.3f}s" if load_seconds is not None else f"{'-':>9}"
+        line = f"{name:<22} {seconds:>8.3f}s {size / 1024**2:>7.1f} MB {sent / 1024**2:>7.1f} MB {load}"
+        if name != "json":
+            line += f"  ({json_seconds / seconds:.1f}x faster, {json_size / size:.1f}x smaller)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Throughput benchmark of port.api.redaction.
+
+Compares redacting a chat history row by row, with a regular expression
+per kind of information, to the Redactor, and hashing identifiers one by
+one to batched pseudonymization.
+
+Usage (from packages/python):
+    python -m benchmarks.bench_redaction --rows 200000 --seed 1
+"""
+
+import argparse
+import hashlib
+import random
+import re
+import time
+
+import pandas as pd
+
+from port.api.redaction import EMAIL, PHONE, TOKEN_START, URL, Redactor, pseudonymize
+
+WORDS = "ok yes no see you tomorrow lunch meeting call me later thanks great sounds good where are you".split()
+NAMES = ["Anna", "Jan de Vries", "Mohammed", "Sofia", "Lucas"]
+
+
+def make_messages(rows, seed):
+    rng = random.Random(seed)
+    messages, senders = [], []
+    for _ in range(rows):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(3, 15))]
+        extra = rng.random()
+        if extra < 0.05:
+            words.append(f"{rng.choice(NAMES).split()[0].lower()}{rng.randint(1, 99)}@example.com")
+        elif extra < 0.10:
+            words.append(f"https://example.com/{rng.randint(1, 10**6)}")
+        elif extra < 0.13:
+            words.append(f"06-{rng.randint(10**7, 10**8 - 1)}")
+        elif extra < 0.20:
+            words.insert(0, rng.choice(NAMES))
+        messages.append(" ".join(words))
+        senders.append(f"+31 6 {rng.randint(10**7, 10**8 - 1)}" if rng.random() < 0.5 else rng.choice(NAMES))
+    return pd.Series(messages), pd.Series(senders)
+
+
+def row_by_row(messages):
+    names = r"(?i:" + "|".join(re.escape(name) for name in NAMES) + r")(?!\w)"
+    result = []
+    for message in messages:
+        for kind, pattern in (("email", EMAIL), ("url", URL), ("phone", PHONE), ("name", names)):
+            message = re.sub(TOKEN_START + pattern, f"[{kind}]", message)
+        result.append(message)
+    return result
+
+
+def hash_one_by_one(senders, salt):
+    key = salt.encode()
+    return [hashlib.blake2b(sender.encode(), digest_size=8, key=key).hexdigest() for sender in senders]
+
+
+def measure(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput benchmark of port.api.redaction")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    messages, senders = make_messages(args.rows, args.seed)
+    megabytes = messages.str.len().sum() / 1024**2
+    print(f"{args.rows} messages, {megabytes:.1f} MB of text, {messages.nunique()} distinct")
+
+    expected, loop_seconds = measure(row_by_row, messages)
+    redactor, compile_seconds = measure(Redactor, None, NAMES)
+    redacted, seconds = measure(redactor.redact, messages)
+    assert redacted.tolist() == expected
+    print(f"{'redact row by row':<28} {loop_seconds:>8.3f}s {args.rows / loop_seconds:>12.0f} rows/s {megabytes / loop_seconds:>8.1f} MB/s")
+    print(f"{'Redactor.redact':<28} {seconds:>8.3f}s {args.rows / seconds:>12.0f} rows/s {megabytes / seconds:>8.1f} MB/s (compile {compile_seconds * 1000:.1f} ms)")
+
+    expected, loop_seconds = measure(hash_one_by_one, senders, "salt")
+    pseudonyms, seconds = measure(pseudonymize, senders, "salt")
+    assert pseudonyms.tolist() == expected
+    print(f"{'hash one by one':<28} {loop_seconds:>8.3f}s {args.rows / loop_seconds:>12.0f} rows/s")
+    print(f"{'pseudonymize':<28} {seconds:>8.3f}s {args.rows / seconds:>12.0f} rows/s ({senders.nunique()} distinct)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark of command serialization for large consent pages.
+
+Compares the dict path, toDict followed by toJs in the worker and a
+JSON.parse of the data_frame of every table in the browser, to the JSON
+path, to_json followed by a single JSON.parse in the worker.
+
+Under CPython the JavaScript side is not available and json.loads stands
+in for JSON.parse; the toJs conversion is only measured under Pyodide,
+e.g. by running this module in the Pyodide console of the worker.
+
+Usage (from packages/python):
+    python -m benchmarks.bench_serialization --rows 50000 --tables 3
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+import pandas as pd
+
+import port.api.props as props
+from port.api.commands import CommandUIRender
+from port.api.serialization import to_json
+
+WORDS = "video music cat dog news weather recipe travel game sport".split()
+
+
+def make_page(rows, tables, seed):
+    rng = random.Random(seed)
+    text = props.Translatable({"en": "Title", "nl": "Titel"})
+    body = []
+    for number in range(tables):
+        df = pd.DataFrame(
+            {
+                "title": [" ".join(rng.choices(WORDS, k=rng.randint(2, 8))) for _ in range(rows)],
+                "channel": [rng.choice(WORDS) for _ in range(rows)],
+                "views": [rng.randint(0, 10**6) for _ in range(rows)],
+                "watched": pd.date_range("2024-01-01", periods=rows, freq="min").astype(str),
+            }
+        )
+        body.append(props.PropsUIPromptConsentFormTable(f"table_{number}", number + 1, text, text, df, data_frame_max_size=rows, searchable=False))
+    return CommandUIRender(props.PropsUIPageDataSubmission("platform", props.PropsUIHeader(text), body))
+
+
+def measure(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def dict_path(command):
+    if sys.platform == "emscripten":
+        import js
+        from pyodide.ffi import to_js
+
+        converted = to_js(command.toDict(), create_pyproxies=False, dict_converter=js.Object.fromEntries)
+        tables = [js.JSON.parse(item.data_frame) for item in converted.page.body]
+    else:
+        converted = command.toDict()
+        tables = [json.loads(item["data_frame"]) for item in converted["page"]["body"]]
+    return converted, tables
+
+
+def json_path(command):
+    text = to_json(command)
+    if sys.platform == "emscripten":
+        import js
+
+        return js.JSON.parse(text), len(text)
+    return json.loads(text), len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of command serialization for large consent pages")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--tables", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    command = make_page(args.rows, args.tables, args.seed)
+    parse = "JSON.parse" if sys.platform == "emscripten" else "json.loads"
+    print(f"{args.tables} tables of {args.rows} rows, parsing with {parse}")
+
+    dict_seconds = min(measure(dict_path, command)[1] for _ in range(args.repeat))
+    results = [measure(json_path, command) for _ in range(args.repeat)]
+    json_seconds = min(seconds for _, seconds in results)
+    size = results[0][0][1]
+    label = "toDict + toJs + parse tables" if sys.platform == "emscripten" else "toDict + parse tables"
+    print(f"{label:<32} {dict_seconds:>8.3f}s")
+    print(f"{'to_json + parse':<32} {json_seconds:>8.3f}s {size / 1024**2:>8.1f} MB ({dict_seconds / json_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
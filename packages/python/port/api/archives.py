@@ -0,0 +1,949 @@
+"""
+Archive readers for platform exports.
+
+Platform exports are often ZIP files that contain more archives (for
+example one archive per year). NestedArchiveReader opens such exports
+recursively and presents all members of all nesting levels as one index:
+
+- inner archives that are STORED are opened as a FileWindow onto the
+  outer file, so they are read in place without copying
+- inner archives that are compressed are read with ZipStreamReader, which
+  parses local file headers while decompressing, buffering at most a few
+  blocks at a time
+- tar, tar.gz and gzip files are read with TarStreamReader and
+  GzipStreamReader in a single forward pass; an uploaded tarball is read
+  in large sequential blocks and never seeked
+- large compressed members are read with an IndexedDeflateReader, which
+  keeps checkpoints of the decompression so the member can be read again
+  or seeked without decompressing it from the start
+- members that extractors do not need, like photos and videos (see
+  port.api.media.MediaFilter), can be left out of iter_members without
+  reading their data
+
+Example:
+    reader = NestedArchiveReader(fileResult.value)
+    for member, file in reader.iter_members():
+        ...
+"""
+
+import functools
+import gzip
+import io
+import logging
+import os
+import struct
+import tarfile
+import time
+import zipfile
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+from port.api.deflate_index import DeflateIndex, IndexedDeflateReader
+from port.api.media import read_media_info
+from port.api.memory import get_governor
+from port.api.sniff import GZIP, TAR, ZIP, sniff
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+SEQUENTIAL_BLOCK_SIZE = 8 * 1024 * 1024
+MAX_DEPTH = 3
+# Number of local headers fetched at once when members are opened one after the other
+PREFETCH_MEMBERS = 512
+# Compressed members of at least this size are read with an IndexedDeflateReader
+INDEX_MIN_SIZE = 64 * 1024 * 1024
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_DATA_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+_CENTRAL_DIRECTORY_SIGNATURES = (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06")
+_ARCHIVE_SIGNATURES = (_LOCAL_HEADER_SIGNATURE, b"PK\x05\x06")
+_GZIP_SIGNATURE = b"\x1f\x8b"
+_COMPRESSED_TAR_SIGNATURES = (_GZIP_SIGNATURE, b"BZh", b"\xfd7zXZ\x00")
+_STREAM_ERRORS = (tarfile.TarError, gzip.BadGzipFile, EOFError, zlib.error)
+_ZIP64_EXTRA = 0x0001
+_ZIP64_LIMIT = 0xFFFFFFFF
+_FLAG_ENCRYPTED = 0x1
+_FLAG_DATA_DESCRIPTOR = 0x8
+
+
+@dataclass
+class ArchiveMember:
+    """A file in an archive, possibly inside nested archives
+
+    Attributes:
+        path: full path including the enclosing archives, e.g. "2021.zip/watch-history.json"
+        name: name of the member within its own archive
+        size: uncompressed size (in bytes), -1 if it is not known before reading
+        compress_size: compressed size (in bytes)
+        compress_type: zipfile compression constant, e.g. zipfile.ZIP_DEFLATED
+        date_time: modification time as a (year, month, day, hour, minute, second) tuple
+        depth: nesting level, 0 for members of the uploaded archive
+        is_archive: whether the member is an archive that is opened recursively
+    """
+
+    path: str
+    name: str
+    size: int
+    compress_size: int
+    compress_type: int = zipfile.ZIP_STORED
+    date_time: tuple = (1980, 1, 1, 0, 0, 0)
+    depth: int = 0
+    is_archive: bool = False
+
+
+class ArchiveError(zipfile.BadZipFile):
+    """The file is not a supported archive or it is corrupt
+
+    Subclass of zipfile.BadZipFile, so existing ``except zipfile.error``
+    handlers also catch errors in tar and gzip files.
+    """
+
+
+def archive_kind(name):
+    """Return "zip", "tar" or "gzip" based on the file name, or None for other files."""
+    name = name.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith((".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")):
+        return "tar"
+    if name.endswith(".gz"):
+        return "gzip"
+    return None
+
+
+def is_zip_name(name):
+    return archive_kind(name) == "zip"
+
+
+def is_archive_name(name):
+    return archive_kind(name) is not None
+
+
+class FileWindow:
+    """
+    A read-only file-like view onto a byte range of another file.
+
+    Reads are forwarded to the parent file, so a STORED member of an
+    archive can be opened as a file of its own without copying it.
+
+    Args:
+        fp: seekable parent file
+        offset: start of the window in the parent file
+        size: length of the window
+        name: optional name of the window
+    """
+
+    def __init__(self, fp, offset, size, name=None):
+        self.fp = fp
+        self.offset = offset
+        self.size = size
+        self.name = name
+        self.position = 0
+        self._closed = False
+
+    def read(self, size=-1):
+        if self._closed:
+            raise ValueError("I/O operation on closed file")
+
+        remaining = self.size - self.position
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        if size <= 0:
+            return b""
+
+        # The parent can be shared with other readers, so always seek first
+        self.fp.seek(self.offset + self.position)
+        result = self.fp.read(size)
+        self.position += len(result)
+        return result
+
+    def seek(self, offset, whence=0):
+        if self._closed:
+            raise ValueError("I/O operation on closed file")
+
+        if whence == 0:
+            new_pos = offset
+        elif whence == 1:
+            new_pos = self.position + offset
+        elif whence == 2:
+            new_pos = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence value: {whence}")
+
+        self.position = max(0, min(new_pos, self.size))
+        return self.position
+
+    def tell(self):
+        if self._closed:
+            raise ValueError("I/O operation on closed file")
+        return self.position
+
+    def prefetch(self, ranges):
+        """Pass a prefetch hint for ranges of the window on to the parent, see AsyncFileAdapter.prefetch."""
+        if not hasattr(self.fp, "prefetch"):
+            return 0
+        return self.fp.prefetch(
+            (self.offset + max(0, start), self.offset + min(end, self.size)) for start, end in ranges
+        )
+
+    def close(self):
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def readable(self):
+        return not self._closed
+
+    def seekable(self):
+        return not self._closed
+
+    def writable(self):
+        return False
+
+
+class _Source:
+    """Forward-only reader with a pushback buffer, reading at most block_size bytes at a time"""
+
+    def __init__(self, fp, block_size):
+        self._fp = fp
+        self._block_size = block_size
+        self._buffer = b""
+
+    def read_block(self, limit=None):
+        """Return up to min(limit, block_size) bytes, or b"" at the end of the stream."""
+        size = self._block_size if limit is None else min(limit, self._block_size)
+        if size <= 0:
+            return b""
+        if self._buffer:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+            return data
+        return self._fp.read(size)
+
+    def read_exact(self, size):
+        parts = []
+        while size > 0:
+            data = self.read_block(size)
+            if not data:
+                raise zipfile.BadZipFile("Truncated archive")
+            parts.append(data)
+            size -= len(data)
+        return b"".join(parts)
+
+    def skip(self, size):
+        while size > 0:
+            data = self.read_block(size)
+            if not data:
+                raise zipfile.BadZipFile("Truncated archive")
+            size -= len(data)
+
+    def unread(self, data):
+        if data:
+            self._buffer = data + self._buffer
+
+
+class _StreamedEntry(io.RawIOBase):
+    """Sequential reader for the data of one member of a ZipStreamReader"""
+
+    def __init__(self, source, member, flags, crc, zip64, block_size):
+        super().__init__()
+        self.member = member
+        self.name = member.name
+        self._source = source
+        self._flags = flags
+        self._crc = crc
+        self._zip64 = zip64
+        self._block_size = block_size
+        self._has_descriptor = bool(flags & _FLAG_DATA_DESCRIPTOR)
+        self._remaining = None if self._has_descriptor else member.compress_size
+        self._decompressor = None
+        self._pending = b""
+        self._pending_offset = 0
+        self._running_crc = 0
+        self._started = False
+        self._finished = False
+        self._supported = member.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+
+        if member.compress_type == zipfile.ZIP_DEFLATED:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        if self._has_descriptor and member.compress_type == zipfile.ZIP_STORED:
+            raise zipfile.BadZipFile(f"Cannot stream STORED member with data descriptor: {member.name}")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._read_chunk(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def peek(self, size=1):
+        """Return buffered data without consuming it, like BufferedReader.peek."""
+        while self._pending_offset >= len(self._pending) and not self._finished:
+            self._fill()
+        return self._pending[self._pending_offset : self._pending_offset + max(size, 1)]
+
+    def _read_chunk(self, size):
+        while self._pending_offset >= len(self._pending) and not self._finished:
+            self._fill()
+        data = self._pending[self._pending_offset : self._pending_offset + size]
+        self._pending_offset += len(data)
+        return data
+
+    def _fill(self):
+        if not self._supported:
+            raise NotImplementedError("That compression method is not supported")
+        if self._flags & _FLAG_ENCRYPTED:
+            raise NotImplementedError("Encrypted members are not supported")
+        self._started = True
+
+        if self._decompressor is None:
+            data = self._source.read_block(self._remaining)
+            if not data:
+                raise zipfile.BadZipFile(f"Truncated member: {self.name}")
+            self._remaining -= len(data)
+        else:
+            decompressor = self._decompressor
+            if decompressor.unconsumed_tail:
+                data = decompressor.decompress(decompressor.unconsumed_tail, self._block_size)
+            else:
+                raw = self._source.read_block(self._remaining)
+                if not raw:
+                    raise zipfile.BadZipFile(f"Truncated member: {self.name}")
+                if self._remaining is not None:
+                    self._remaining -= len(raw)
+                data = decompressor.decompress(raw, self._block_size)
+            if decompressor.eof:
+                self._source.unread(decompressor.unused_data)
+                if self._remaining is not None:
+                    self._remaining += len(decompressor.unused_data)
+
+        self._running_crc = zlib.crc32(data, self._running_crc)
+        self._pending = data
+        self._pending_offset = 0
+
+        done = self._decompressor.eof if self._decompressor is not None else self._remaining == 0
+        if done:
+            self._finish(check_crc=True)
+
+    def _finish(self, check_crc):
+        self._finished = True
+        if self._has_descriptor:
+            self._read_descriptor()
+        if check_crc and self._running_crc != self._crc:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for file {self.name!r}")
+
+    def _read_descriptor(self):
+        value = self._source.read_exact(4)
+        if value == _DATA_DESCRIPTOR_SIGNATURE:
+            value = self._source.read_exact(4)
+        size_format = "<QQ" if self._zip64 else "<LL"
+        self._crc = struct.unpack("<L", value)[0]
+        compress_size, size = struct.unpack(size_format, self._source.read_exact(struct.calcsize(size_format)))
+        self.member.compress_size = compress_size
+        self.member.size = size
+
+    def drain(self):
+        """Move the source to the end of this member, skipping compressed data where possible."""
+        if self._finished:
+            return
+        if not self._started and self._remaining is not None:
+            self._source.skip(self._remaining)
+            self._remaining = 0
+            self._finish(check_crc=False)
+            return
+        while not self._finished:
+            self._fill()
+
+    def seekable(self):
+        return False
+
+    def writable(self):
+        return False
+
+
+class ZipStreamReader:
+    """
+    Reads a ZIP archive front to back from a non-seekable stream.
+
+    The central directory at the end of the archive is never used: members
+    are discovered from their local file headers while reading. This makes
+    it possible to read a compressed inner archive while it is being
+    decompressed, with at most a few blocks buffered.
+
+    Args:
+        fp: file-like object positioned at the start of the archive
+        name: optional name of the archive, used as path prefix of its members
+        depth: nesting level of the members
+        block_size: maximum number of bytes read from fp at a time
+    """
+
+    def __init__(self, fp, name="", depth=0, block_size=BLOCK_SIZE):
+        self.name = name
+        self.depth = depth
+        self.block_size = block_size
+        self._source = _Source(fp, block_size)
+
+    def __iter__(self):
+        """Yield (ArchiveMember, file) pairs. A file is only valid until the next pair is requested."""
+        while True:
+            signature = self._source.read_block(4)
+            if signature and len(signature) < 4:
+                signature += self._source.read_exact(4 - len(signature))
+            if not signature or signature in _CENTRAL_DIRECTORY_SIGNATURES:
+                return
+            if signature != _LOCAL_HEADER_SIGNATURE:
+                raise zipfile.BadZipFile("Bad magic number for file header")
+
+            entry = self._read_entry(signature + self._source.read_exact(_LOCAL_HEADER.size - 4))
+            yield entry.member, entry
+            entry.drain()
+
+    def _read_entry(self, header):
+        (
+            _,
+            _version,
+            flags,
+            method,
+            dos_time,
+            dos_date,
+            crc,
+            compress_size,
+            size,
+            name_length,
+            extra_length,
+        ) = _LOCAL_HEADER.unpack(header)
+        raw_name = self._source.read_exact(name_length)
+        extra = self._source.read_exact(extra_length)
+
+        name = raw_name.decode("utf-8" if flags & 0x800 else "cp437")
+        zip64 = False
+        if size == _ZIP64_LIMIT or compress_size == _ZIP64_LIMIT:
+            zip64 = True
+            size, compress_size = _parse_zip64_extra(extra, size, compress_size)
+
+        member = ArchiveMember(
+            path=f"{self.name}/{name}" if self.name else name,
+            name=name,
+            size=size,
+            compress_size=compress_size,
+            compress_type=method,
+            date_time=_dos_date_time(dos_date, dos_time),
+            depth=self.depth,
+        )
+        return _StreamedEntry(self._source, member, flags, crc, zip64, self.block_size)
+
+
+def _parse_zip64_extra(extra, size, compress_size):
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<HH", extra, offset)
+        if header_id == _ZIP64_EXTRA:
+            values = iter(struct.unpack_from(f"<{length // 8}Q", extra, offset + 4))
+            if size == _ZIP64_LIMIT:
+                size = next(values)
+            if compress_size == _ZIP64_LIMIT:
+                compress_size = next(values)
+            break
+        offset += 4 + length
+    return size, compress_size
+
+
+def _dos_date_time(dos_date, dos_time):
+    return (
+        (dos_date >> 9) + 1980,
+        (dos_date >> 5) & 0xF,
+        dos_date & 0x1F,
+        dos_time >> 11,
+        (dos_time >> 5) & 0x3F,
+        (dos_time & 0x1F) * 2,
+    )
+
+
+class SequentialReader(io.RawIOBase):
+    """
+    Forward-only reader that fetches large blocks from a file.
+
+    Stream parsers such as tarfile and gzip issue many small reads. Serving
+    them from large blocks means that an AsyncFileAdapter is read with a
+    few big sequential calls instead of many small ones.
+
+    Args:
+        fp: file-like object to read from, read from its current position
+        block_size: number of bytes fetched per read of fp, shrinks under memory pressure by default
+    """
+
+    def __init__(self, fp, block_size=None):
+        super().__init__()
+        self.fp = fp
+        self.name = getattr(fp, "name", None)
+        self.block_size = block_size or get_governor().block_size(SEQUENTIAL_BLOCK_SIZE)
+        self._block = memoryview(b"")
+        self._offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._offset >= len(self._block):
+            self._block = memoryview(self.fp.read(self.block_size))
+            self._offset = 0
+        size = min(len(buffer), len(self._block) - self._offset)
+        buffer[:size] = self._block[self._offset : self._offset + size]
+        self._offset += size
+        return size
+
+    def peek(self, size=1):
+        if self._offset >= len(self._block):
+            self._block = memoryview(self.fp.read(self.block_size))
+            self._offset = 0
+        return bytes(self._block[self._offset : self._offset + max(size, 1)])
+
+
+class TarStreamReader:
+    """
+    Reads a tar archive (optionally gzip, bz2 or xz compressed) in one forward pass.
+
+    Args:
+        fp: file-like object positioned at the start of the archive
+        name: optional name of the archive, used as path prefix of its members
+        depth: nesting level of the members
+        block_size: read size used by the tar parser
+    """
+
+    def __init__(self, fp, name="", depth=0, block_size=BLOCK_SIZE):
+        self.fp = fp
+        self.name = name
+        self.depth = depth
+        self.block_size = block_size
+
+    def __iter__(self):
+        """Yield (ArchiveMember, file) pairs. A file is only valid until the next pair is requested."""
+        try:
+            with tarfile.open(fileobj=self.fp, mode="r|*", bufsize=self.block_size) as tar:
+                for info in tar:
+                    # tarfile remembers every member, which adds up for large exports
+                    tar.members = []
+                    if not info.isfile():
+                        continue
+                    member = ArchiveMember(
+                        path=f"{self.name}/{info.name}" if self.name else info.name,
+                        name=info.name,
+                        size=info.size,
+                        compress_size=info.size,
+                        date_time=_mtime_date_time(info.mtime),
+                        depth=self.depth,
+                    )
+                    yield member, _GuardedReader(tar.extractfile(info), info.name)
+        except _STREAM_ERRORS as e:
+            raise ArchiveError(f"Bad tar file: {e}") from e
+
+
+class GzipStreamReader:
+    """
+    Reads a gzip file as an archive with a single member.
+
+    Args:
+        fp: file-like object positioned at the start of the gzip file
+        name: name of the gzip file, the member is named after it without ".gz"
+        depth: nesting level of the member
+    """
+
+    def __init__(self, fp, name="", depth=0):
+        self.fp = fp
+        self.name = name
+        self.depth = depth
+
+    def __iter__(self):
+        base = os.path.basename(self.name or getattr(self.fp, "name", None) or "data.gz")
+        name = base[:-3] if base.lower().endswith(".gz") else base
+        member = ArchiveMember(
+            path=f"{self.name}/{name}" if self.name else name,
+            name=name,
+            size=-1,
+            compress_size=-1,
+            compress_type=zipfile.ZIP_DEFLATED,
+            depth=self.depth,
+        )
+        yield member, _GuardedReader(gzip.GzipFile(fileobj=self.fp, mode="rb"), name)
+
+
+class _GuardedReader(io.RawIOBase):
+    """Reader for a tar or gzip member that reports corrupt data as ArchiveError"""
+
+    def __init__(self, fp, name):
+        super().__init__()
+        self._fp = fp
+        self.name = name
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        try:
+            return self._fp.read(size)
+        except _STREAM_ERRORS as e:
+            raise ArchiveError(f"Bad archive member {self.name}: {e}") from e
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def peek(self, size=1):
+        try:
+            return self._fp.peek(size)
+        except _STREAM_ERRORS as e:
+            raise ArchiveError(f"Bad archive member {self.name}: {e}") from e
+
+
+def _mtime_date_time(mtime):
+    return time.gmtime(max(mtime, 315532800))[:6]
+
+
+def _looks_like(kind, head):
+    if kind == "zip":
+        return head[:4] in _ARCHIVE_SIGNATURES
+    if kind == "gzip":
+        return head[:2] == _GZIP_SIGNATURE
+    return head[257:262] == b"ustar" or head.startswith(_COMPRESSED_TAR_SIGNATURES)
+
+
+class _ZipNode:
+    """Archive with random access through its central directory"""
+
+    def __init__(self, zip_file, member, index_min_size=INDEX_MIN_SIZE):
+        self.zip_file = zip_file
+        self.member = member
+        self.index_min_size = index_min_size
+        # DeflateIndex per member, kept across opens of the member
+        self.indexes = {}
+
+    def children(self, prefetch=False):
+        """
+        Yield (ArchiveMember, ZipInfo) for the files in the archive.
+
+        With prefetch, the local headers of the members are fetched in
+        batches ahead of opening the members, see AsyncFileAdapter.prefetch.
+        """
+        prefix = f"{self.member.path}/" if self.member else ""
+        depth = self.member.depth + 1 if self.member else 0
+        infos = [info for info in self.zip_file.infolist() if not info.is_dir()]
+        prefetch = prefetch and hasattr(self.zip_file.fp, "prefetch")
+        for index, info in enumerate(infos):
+            if prefetch and index % PREFETCH_MEMBERS == 0:
+                self.prefetch_headers(infos[index : index + PREFETCH_MEMBERS])
+            member = ArchiveMember(
+                path=prefix + info.filename,
+                name=info.filename,
+                size=info.file_size,
+                compress_size=info.compress_size,
+                compress_type=info.compress_type,
+                date_time=info.date_time,
+                depth=depth,
+            )
+            yield member, info
+
+    def open(self, info):
+        if (
+            info.compress_type != zipfile.ZIP_DEFLATED
+            or info.file_size < self.index_min_size
+            or info.flag_bits & _FLAG_ENCRYPTED
+            or self.zip_file.fp is None
+            or not self.zip_file.fp.seekable()
+        ):
+            return self.zip_file.open(info)
+        index = self.indexes.setdefault(info.filename, DeflateIndex())
+        raw = IndexedDeflateReader(
+            self.zip_file.fp,
+            self.data_offset(info),
+            info.compress_size,
+            info.file_size,
+            index=index,
+            crc=info.CRC,
+            name=info.filename,
+        )
+        return io.BufferedReader(raw, BLOCK_SIZE)
+
+    def indexed(self, info):
+        """Return whether a member can be read at any offset through its DeflateIndex."""
+        index = self.indexes.get(info.filename)
+        return index is not None and index.covered >= info.file_size
+
+    def prefetch_headers(self, infos):
+        # The extra field of the local header can differ from the central directory, allow some slack
+        self.zip_file.fp.prefetch(
+            (
+                info.header_offset,
+                info.header_offset + _LOCAL_HEADER.size + len(info.orig_filename.encode()) + len(info.extra) + 64,
+            )
+            for info in infos
+        )
+
+    def data_offset(self, info):
+        """Return the offset of the data of a member, after its local header."""
+        fp = self.zip_file.fp
+        fp.seek(info.header_offset)
+        header = fp.read(_LOCAL_HEADER.size)
+        if len(header) != _LOCAL_HEADER.size or header[:4] != _LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile("Bad magic number for file header")
+        name_length, extra_length = struct.unpack("<2H", header[-4:])
+        return info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+
+    def window(self, info):
+        """Return a FileWindow onto the data of a STORED member, or None if that is not possible."""
+        if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & _FLAG_ENCRYPTED:
+            return None
+        fp = self.zip_file.fp
+        if fp is None or not fp.seekable():
+            return None
+        return FileWindow(fp, self.data_offset(info), info.compress_size, name=info.filename)
+
+
+class _StreamNode:
+    """Archive that can only be read front to back
+
+    The first pass can read from a stream that is already open (the entry
+    of an enclosing streamed archive), later passes reopen it.
+    """
+
+    def __init__(self, kind, opener, member, block_size, current=None):
+        self.kind = kind
+        self.opener = opener
+        self.member = member
+        self.block_size = block_size
+        self._current = current
+
+    def children(self, prefetch=False):
+        fp, self._current = self._current or self.opener(), None
+        name = self.member.path if self.member else ""
+        depth = self.member.depth + 1 if self.member else 0
+        if self.kind == "tar":
+            reader = TarStreamReader(fp, name, depth, self.block_size)
+        elif self.kind == "gzip":
+            reader = GzipStreamReader(fp, name, depth)
+        else:
+            reader = ZipStreamReader(fp, name, depth, self.block_size)
+        for member, entry in reader:
+            yield member, entry
+
+
+class NestedArchiveReader:
+    """
+    Reads an archive and all archives nested inside it.
+
+    The uploaded file can be a zip, tar (optionally compressed) or gzip
+    file. Zip files are read through their central directory; the other
+    formats are read in a single forward pass.
+
+    Args:
+        fp: seekable file-like object, e.g. an AsyncFileAdapter
+        max_depth: maximum nesting level that is opened recursively
+        is_archive: function that decides from a member name whether it is a nested archive
+        block_size: maximum number of bytes buffered when streaming compressed inner archives
+        index_min_size: compressed zip members of at least this size are indexed for random access
+        sniffed: the Sniff of fp, if the file was sniffed already
+        skip: function of an ArchiveMember and a peek function (that returns the first
+            bytes of the member) that decides whether iter_members leaves the member out,
+            e.g. a MediaFilter
+
+    Raises:
+        ArchiveError: the file is not a zip, tar or gzip file, or it is truncated
+    """
+
+    def __init__(
+        self,
+        fp,
+        max_depth=MAX_DEPTH,
+        is_archive=is_archive_name,
+        block_size=BLOCK_SIZE,
+        index_min_size=INDEX_MIN_SIZE,
+        sniffed=None,
+        skip=None,
+    ):
+        self.fp = fp
+        self.max_depth = max_depth
+        self.is_archive = is_archive
+        self.block_size = block_size
+        self.index_min_size = index_min_size
+        self.sniffed = sniffed if sniffed is not None else sniff(fp)
+        self.skip = skip
+        # Members left out of iter_members by skip
+        self.skipped: list[ArchiveMember] = []
+        self._root = self._open_root(fp)
+        self._index: Optional[list[ArchiveMember]] = None
+        self._by_path = {}
+        self._locations = {}
+
+    def _open_root(self, fp):
+        # The kind is known from the head and the tail of the file, wrong files are rejected before they are parsed
+        kind = self.sniffed.kind
+        if kind == ZIP:
+            fp.seek(0)
+            return _ZipNode(zipfile.ZipFile(fp), None, self.index_min_size)
+        if kind in (TAR, GZIP):
+            return _StreamNode(kind, functools.partial(_rewind, fp), None, self.block_size)
+        raise ArchiveError(f"File is not a zip, tar or gzip file: {self.sniffed}")
+
+    def members(self):
+        """Return the members of all nesting levels, including the nested archives themselves."""
+        if self._index is None:
+            self._index = []
+            for member, _ in self._walk(self._root, drain=True):
+                self._index.append(member)
+                self._by_path[member.path] = member
+        return self._index
+
+    def namelist(self):
+        return [member.path for member in self.members() if not member.is_archive]
+
+    def getinfo(self, path):
+        self.members()
+        try:
+            return self._by_path[path]
+        except KeyError:
+            raise KeyError(f"There is no item named {path!r} in the archive") from None
+
+    def iter_members(self):
+        """
+        Yield (ArchiveMember, file) for every file in a single forward pass.
+
+        Nested archives are entered instead of being yielded. A file is only
+        valid until the next member is requested. Members that skip selects
+        are not yielded and their data is not read.
+        """
+        self.skipped = []
+        for member, file in self._walk(self._root, drain=False):
+            if file is not None:
+                yield member, file
+
+    def media_info(self, member):
+        """
+        Return the MediaInfo of a photo, video or audio member from its headers, None for other members.
+
+        STORED members, and compressed members that are fully indexed, are read
+        in place, so only their headers are read. Other compressed members are
+        read up to the media data, see port.api.media.
+        """
+        if isinstance(member, str):
+            member = self.getinfo(member)
+        node, key = self._locations[member.path]
+        file = node.window(key) if isinstance(node, _ZipNode) else None
+        random_access = file is not None
+        if file is None:
+            random_access = isinstance(node, _ZipNode) and node.indexed(key)
+            file = self.open(member)
+        with file:
+            return read_media_info(file, member.name, member.size, random_access)
+
+    def open(self, member):
+        """
+        Open a member by ArchiveMember or path.
+
+        Members of zip files are opened through the central directory. Members
+        of tar and gzip files, and of zip files nested in them, can only be
+        reached by reading the stream again from its start, so every open of
+        such a member reads (and decompresses) everything before it. Use
+        iter_members to read many of them.
+        """
+        if isinstance(member, str):
+            member = self.getinfo(member)
+        node, key = self._locations[member.path]
+        if isinstance(node, _ZipNode):
+            return node.open(key)
+        # Streamed archives are read again from the start up to the member
+        return self._reopen(node, key)
+
+    def close(self):
+        if isinstance(self._root, _ZipNode):
+            self._root.zip_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def _walk(self, node, drain):
+        # Members are opened one after the other, unless only the index is built
+        for member, key in node.children(prefetch=not drain):
+            self._locations[member.path] = (node, key if isinstance(node, _ZipNode) else member.name)
+            child = None
+            if member.depth < self.max_depth and self.is_archive(member.name):
+                child = self._child(node, member, key)
+
+            if child is not None:
+                member.is_archive = True
+                yield member, None
+                try:
+                    yield from self._walk(child, drain)
+                except zipfile.BadZipFile as e:
+                    logger.warning(f"Skipping rest of nested archive {member.path}: {e}")
+            elif drain:
+                yield member, None
+            else:
+                peek = _Peek(node, key)
+                if self.skip is not None and self.skip(member, peek):
+                    self.skipped.append(member)
+                    continue
+                yield member, peek.open()
+
+    def _child(self, node, member, key):
+        """Return the node for a nested archive, or None if the member is not a readable archive."""
+        kind = archive_kind(member.name) or "zip"
+        current = None
+        try:
+            if isinstance(node, _ZipNode):
+                if kind == "zip":
+                    window = node.window(key)
+                    if window is not None:
+                        return _ZipNode(zipfile.ZipFile(window), member, self.index_min_size)
+                current = node.open(key)
+                opener = functools.partial(node.open, key)
+            else:
+                current = key
+                opener = functools.partial(self._reopen, node, member.name)
+            if not _looks_like(kind, current.peek(512)):
+                raise ArchiveError(f"File is not a {kind} file")
+            return _StreamNode(kind, opener, member, self.block_size, current=current)
+        except zipfile.BadZipFile as e:
+            logger.warning(f"Reading nested archive {member.path} as a regular file: {e}")
+            # The entry of a streamed archive belongs to its reader, a member opened here is closed here
+            if current is not None and isinstance(node, _ZipNode):
+                current.close()
+            return None
+
+    def _reopen(self, node, name):
+        for candidate, entry in node.children():
+            if candidate.name == name:
+                return entry
+        raise KeyError(name)
+
+
+class _Peek:
+    """Returns the first bytes of a member, which is only opened when it is called"""
+
+    def __init__(self, node, key):
+        self.node = node
+        self.key = key
+        self.file = None
+
+    def open(self):
+        if self.file is None:
+            self.file = self.node.open(self.key) if isinstance(self.node, _ZipNode) else self.key
+        return self.file
+
+    def __call__(self, size):
+        return self.open().peek(size)[:size]
+
+
+def _rewind(fp):
+    fp.seek(0)
+    return SequentialReader(fp)
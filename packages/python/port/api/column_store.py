@@ -0,0 +1,300 @@
+"""
+Compressed in-memory column store for extracted records.
+
+Extractors keep every parsed record in lists or DataFrames until the
+consent step, so the size of the exports that can be processed is capped
+by the heap of the worker. A ColumnStore keeps records in chunks of a
+fixed number of rows instead. Only the chunk that is being filled holds
+plain Python values; full chunks are sealed, which stores every column
+compressed with zlib:
+
+- numbers, booleans and datetimes as the bytes of their numpy array
+- strings dictionary encoded, as the codes of the values and the distinct values
+- other values pickled
+
+Platform exports repeat the same strings (channels, event types, URLs)
+very often, which the dictionary encoding and zlib make use of. Chunks
+are scanned one at a time as DataFrames, or the whole store is turned
+into a DataFrame when it is needed.
+
+When memory runs low, sealed chunks are paged out to the spill storage
+of port.api.spill and read back while scanning, so a store can hold
+more data than fits in the heap. Closing a store, or dropping the last
+reference to it, releases its chunks in the spill storage.
+
+Only the extracted records live in the store. A consent table, and the
+donation made from it, holds the rows it shows as a DataFrame in the
+heap; their number is capped by data_frame_max_size and the memory
+governor. Build the table from head, or stream the chunks into it with
+port.api.consent.stream_table(..., store.scan()), and aggregate larger
+stores chunk by chunk with scan.
+
+Example:
+    store = ColumnStore(["time", "channel", "title"])
+    for record in records:
+        store.append(record)
+    frame = store.to_frame()
+"""
+
+import pickle
+import weakref
+import zlib
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from port.api.memory import OK, get_governor
+from port.api.spill import get_storage
+
+CHUNK_SIZE = 65536
+COMPRESSION_LEVEL = 1
+
+_NUMERIC = "numeric"
+_DICTIONARY = "dictionary"
+_PICKLE = "pickle"
+
+
+@dataclass
+class _Column:
+    """A compressed column of a sealed chunk"""
+
+    encoding: str
+    data: bytes
+    dtype: Any = None
+    uniques: bytes = b""
+
+    def nbytes(self):
+        return len(self.data) + len(self.uniques)
+
+
+@dataclass
+class _SpilledChunk:
+    """A sealed chunk in the spill storage"""
+
+    offset: int
+    length: int
+
+
+def _code_dtype(count):
+    for dtype in (np.int8, np.int16, np.int32):
+        if count < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _encode_strings(strings):
+    encoded = [string.encode("utf-8", "surrogatepass") for string in strings]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    return lengths.tobytes() + b"".join(encoded)
+
+
+def _decode_strings(data, count):
+    lengths = np.frombuffer(data, dtype=np.int64, count=count)
+    offsets = np.concatenate(([8 * count], 8 * count + np.cumsum(lengths)))
+    return [data[offsets[i] : offsets[i + 1]].decode("utf-8", "surrogatepass") for i in range(count)]
+
+
+def encode_column(values, level=COMPRESSION_LEVEL):
+    """Return values (a list, array or Series) as a compressed _Column."""
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=None if len(values) else object)
+    dtype = series.dtype
+    if dtype.kind in "biufcmM" and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        array = np.ascontiguousarray(series.to_numpy())
+        return _Column(_NUMERIC, zlib.compress(array.tobytes(), level), array.dtype)
+
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+    if kind in ("string", "empty"):
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        codes = codes.astype(_code_dtype(len(uniques)))
+        return _Column(
+            _DICTIONARY,
+            zlib.compress(codes.tobytes(), level),
+            (codes.dtype, len(uniques), dtype),
+            zlib.compress(_encode_strings(uniques), level),
+        )
+
+    return _Column(_PICKLE, zlib.compress(pickle.dumps(series.tolist(), pickle.HIGHEST_PROTOCOL), level))
+
+
+def decode_column(column):
+    """Return the values of a _Column as a numpy array or a list."""
+    if column.encoding == _NUMERIC:
+        return np.frombuffer(zlib.decompress(column.data), dtype=column.dtype)
+    if column.encoding == _DICTIONARY:
+        code_dtype, count, dtype = column.dtype
+        codes = np.frombuffer(zlib.decompress(column.data), dtype=code_dtype)
+        # The code of missing values is -1, which takes the None at the end
+        uniques = np.array(_decode_strings(zlib.decompress(column.uniques), count) + [None], dtype=object)
+        return pd.array(uniques[codes], dtype=dtype)
+    return pickle.loads(zlib.decompress(column.data))
+
+
+class ColumnStore:
+    """
+    Accumulates rows in compressed column chunks.
+
+    Args:
+        columns: names of the columns
+        chunk_size: number of rows per chunk
+        level: zlib compression level of sealed chunks
+        spill: page sealed chunks out to the spill storage: always (True), never (False)
+            or when memory is not OK (None)
+        storage: spill storage, the one of port.api.spill.get_storage by default
+    """
+
+    def __init__(self, columns, chunk_size=CHUNK_SIZE, level=COMPRESSION_LEVEL, spill=None, storage=None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.columns = list(columns)
+        self.chunk_size = chunk_size
+        self.level = level
+        self.spill = spill
+        self.storage = storage
+        self._chunks = []
+        self._lengths = []
+        self._open = {column: [] for column in self.columns}
+        self._open_rows = 0
+        self.raw_nbytes = 0
+        # The spilled chunks are released when the store is closed or garbage collected
+        self._spilled = []
+        self._finalizer = None
+
+    def __len__(self):
+        return sum(self._lengths) + self._open_rows
+
+    def append(self, row):
+        """
+        Append a row, a dict of column values or a sequence in column order.
+
+        Columns missing from a dict are None.
+        """
+        if isinstance(row, dict):
+            for column in self.columns:
+                self._open[column].append(row.get(column))
+        else:
+            if len(row) != len(self.columns):
+                raise ValueError(f"Expected {len(self.columns)} values, got {len(row)}")
+            for column, value in zip(self.columns, row):
+                self._open[column].append(value)
+        self._open_rows += 1
+        if self._open_rows >= self.chunk_size:
+            self.seal()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def append_frame(self, data_frame):
+        """Append the rows of a DataFrame with (at least) the columns of the store."""
+        self.seal()
+        for start in range(0, len(data_frame), self.chunk_size):
+            self._seal_frame(data_frame.iloc[start : start + self.chunk_size][self.columns])
+
+    def seal(self):
+        """Compress the rows appended since the last sealed chunk."""
+        if self._open_rows == 0:
+            return
+        frame = pd.DataFrame(self._open, columns=self.columns)
+        self._open = {column: [] for column in self.columns}
+        self._open_rows = 0
+        self._seal_frame(frame)
+
+    def _seal_frame(self, frame):
+        self.raw_nbytes += int(frame.memory_usage(index=False, deep=True).sum())
+        chunk = [encode_column(frame[column], self.level) for column in self.columns]
+        if self.spill or (self.spill is None and get_governor().state() != OK):
+            chunk = self._page_out(chunk)
+        self._chunks.append(chunk)
+        self._lengths.append(len(frame))
+
+    def _page_out(self, chunk):
+        if self.storage is None:
+            self.storage = get_storage()
+        if self._finalizer is None or not self._finalizer.alive:
+            # A closed store that is appended to again needs a new finalizer
+            self._finalizer = weakref.finalize(self, _release, self.storage, self._spilled)
+        data = pickle.dumps(chunk, pickle.HIGHEST_PROTOCOL)
+        spilled = _SpilledChunk(self.storage.append(data), len(data))
+        self._spilled.append(spilled)
+        return spilled
+
+    def _page_in(self, chunk):
+        if isinstance(chunk, _SpilledChunk):
+            return pickle.loads(self.storage.read(chunk.offset, chunk.length))
+        return chunk
+
+    def nbytes(self):
+        """Return the number of bytes of the compressed chunks in memory."""
+        return sum(column.nbytes() for chunk in self._chunks if not isinstance(chunk, _SpilledChunk) for column in chunk)
+
+    def spilled_nbytes(self):
+        """Return the number of bytes of the chunks in the spill storage."""
+        return sum(chunk.length for chunk in self._chunks if isinstance(chunk, _SpilledChunk))
+
+    def scan(self, columns=None):
+        """
+        Yield the rows as DataFrames of at most chunk_size rows, one chunk in memory at a time.
+
+        Args:
+            columns: columns to decompress, all columns by default
+        """
+        columns = self.columns if columns is None else list(columns)
+        positions = [self.columns.index(column) for column in columns]
+        for chunk in self._chunks:
+            chunk = self._page_in(chunk)
+            yield pd.DataFrame({column: decode_column(chunk[position]) for column, position in zip(columns, positions)})
+        if self._open_rows:
+            yield pd.DataFrame({column: self._open[column] for column in columns}, columns=columns)
+
+    def to_frame(self, columns=None):
+        """Return all rows as a single DataFrame."""
+        return self._concat(list(self.scan(columns)), columns)
+
+    def head(self, rows, columns=None):
+        """Return the first rows as a DataFrame, e.g. for a consent table; only the chunks needed are read."""
+        frames, count = [], 0
+        if rows > 0:
+            for frame in self.scan(columns):
+                frames.append(frame.iloc[: rows - count])
+                count += len(frames[-1])
+                if count >= rows:
+                    break
+        return self._concat(frames, columns)
+
+    def records_json(self, columns=None):
+        """
+        Return all rows as a JSON array of records, like DataFrame.to_json(orient="records").
+
+        The JSON is built chunk by chunk, so the rows are never in memory as a single DataFrame.
+        """
+        parts = [frame.to_json(orient="records")[1:-1] for frame in self.scan(columns) if len(frame)]
+        return "[" + ",".join(parts) + "]"
+
+    def close(self):
+        """Drop all rows and release the chunks in the spill storage."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._chunks = []
+        self._lengths = []
+        self._open = {column: [] for column in self.columns}
+        self._open_rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def _concat(self, frames, columns):
+        if not frames:
+            return pd.DataFrame(columns=self.columns if columns is None else list(columns))
+        return pd.concat(frames, ignore_index=True)
+
+
+def _release(storage, spilled):
+    for chunk in spilled:
+        storage.release(chunk.offset, chunk.length)
+    spilled.clear()
@@ -11,18 +11,48 @@ class CommandUIRender:
         return dict
 
 
+class CommandUIAppend:
+    """Appends rows to a streaming consent table on the page that is shown, see PropsUIPromptConsentFormTable.append"""
+
+    __slots__ = "table_id", "data_frame", "done"
+
+    def __init__(self, table_id, data_frame, done=False):
+        self.table_id = table_id
+        self.data_frame = data_frame
+        self.done = done
+
+    def toDict(self):
+        dict = {}
+        dict["__type__"] = "CommandUIAppend"
+        dict["table_id"] = self.table_id
+        dict["data_frame"] = self.data_frame
+        dict["done"] = self.done
+        return dict
+
+
 class CommandSystemDonate:
-    __slots__ = "key", "json_string"
+    """
+    Donates data under key: JSON text (json_string) or an Arrow IPC stream (data), see port.api.arrow.
+    """
+
+    __slots__ = "key", "json_string", "data"
 
-    def __init__(self, key, json_string):
+    def __init__(self, key, json_string=None, data=None):
+        if (json_string is None) == (data is None):
+            raise ValueError("A donation needs either json_string or data")
         self.key = key
         self.json_string = json_string
+        self.data = data
 
     def toDict(self):
         dict = {}
         dict["__type__"] = "CommandSystemDonate"
         dict["key"] = self.key
-        dict["json_string"] = self.json_string
+        if self.data is None:
+            dict["json_string"] = self.json_string
+        else:
+            dict["format"] = "arrow"
+            dict["data"] = self.data
         return dict
 
 
@@ -0,0 +1,159 @@
+"""
+Donations from consent tables.
+
+The consent page does not send the tables back to the worker. For every
+table it sends the ids of the rows the participant deleted, as ranges of
+row numbers, and the script applies the deletions to the DataFrames it
+already holds:
+
+    {"<table id>": {"deleted": [[0, 3], [7, 8], "<row id>"], "metadata": {"deletedRowCount": 4}}}
+
+A range [start, end] stands for the row ids start up to (not including)
+end; other rows are sent as their id. Row ids are the row numbers of the
+table: the table resets the index of its DataFrame, so the keys that
+DataFrame.to_json writes for the rows are their positions, whatever the
+index of the extracted DataFrame was (dates, floats, strings).
+
+A consent page can also be shown before all rows are extracted, with
+stream_table: the participant starts reviewing the first rows while the
+rest are appended to the table.
+"""
+
+import json
+import time
+
+import pandas as pd
+
+from port.api.arrow import encode_donation
+from port.api.scheduler import BUDGET, Scheduler
+
+
+def deleted_row_ids(deleted):
+    """
+    Decode a list of deleted row ranges and ids.
+
+    Returns:
+        tuple: list of integer ids, list of other ids
+    """
+    numbers = []
+    labels = []
+    for entry in deleted or []:
+        if isinstance(entry, (list, tuple)):
+            start, end = entry
+            numbers.extend(range(int(start), int(end)))
+        else:
+            labels.append(str(entry))
+    return numbers, labels
+
+
+def apply_deletions(data_frame, deleted):
+    """
+    Return the rows of data_frame that the participant did not delete.
+
+    Args:
+        data_frame: DataFrame of the consent table
+        deleted: deleted row ranges and ids as sent by the consent table
+    """
+    numbers, labels = deleted_row_ids(deleted)
+    if not numbers and not labels:
+        return data_frame
+    # The row ids are the row numbers, not the index labels
+    positions = pd.RangeIndex(len(data_frame))
+    removed = positions.isin(numbers) | positions.astype(str).isin(labels)
+    return data_frame[~removed]
+
+
+def _submissions(tables, payload):
+    """Yield (table, submission) for the tables in the payload of the consent page."""
+    submitted = json.loads(payload) if isinstance(payload, str) else payload
+    for table in tables:
+        if table.id in submitted:
+            yield table, submitted[table.id]
+
+
+def donation_data(tables, payload):
+    """
+    Return the JSON string to donate for the consent tables.
+
+    Args:
+        tables: list of PropsUIPromptConsentFormTable shown to the participant
+        payload: value of the PayloadJSON returned by the consent page
+
+    Returns:
+        str: {"<table id>": {"data": [<row>, ...], "metadata": {...}}}
+    """
+    parts = []
+    for table, submission in _submissions(tables, payload):
+        metadata = json.dumps(submission.get("metadata", {}))
+        if "data" in submission:
+            # Consent pages of older versions send the rows themselves
+            data = json.dumps(submission["data"])
+        else:
+            data = apply_deletions(table.data_frame, submission.get("deleted")).to_json(orient="records")
+        parts.append(f'{json.dumps(table.id)}: {{"data": {data}, "metadata": {metadata}}}')
+    return "{" + ", ".join(parts) + "}"
+
+
+def donation_arrow(tables, payload, engine=None):
+    """
+    Return the donation of the consent tables as an Arrow IPC stream, see port.api.arrow.
+
+    Donate it with CommandSystemDonate(key, data=...). The rows are the
+    same as those of donation_data.
+
+    Args:
+        tables: list of PropsUIPromptConsentFormTable shown to the participant
+        payload: value of the PayloadJSON returned by the consent page
+        engine: PYARROW or PYTHON, see port.api.arrow.encode_frame
+    """
+    donated = []
+    for table, submission in _submissions(tables, payload):
+        if "data" in submission:
+            # Consent pages of older versions send the rows themselves
+            data_frame = pd.DataFrame.from_records(submission["data"])
+        else:
+            data_frame = apply_deletions(table.data_frame, submission.get("deleted"))
+        donated.append((table.id, data_frame, submission.get("metadata", {})))
+    return encode_donation(donated, engine)
+
+
+def stream_table(render, table, chunks, budget=BUDGET, clock=time.perf_counter):
+    """
+    Generator that shows the consent page as soon as the first rows of a table are extracted.
+
+    The page is rendered when the first chunk arrives, the rows of later
+    chunks are sent in one append per time budget. The page can be
+    submitted once the last rows are appended. Use it with yield from:
+
+        table = props.PropsUIPromptConsentFormTable(..., pd.DataFrame(columns=columns), streaming=True)
+        result = yield from consent.stream_table(lambda: prompt_consent([table]), table, chunks)
+
+    Args:
+        render: function returning the CommandUIRender of the consent page with the table
+        table: PropsUIPromptConsentFormTable with streaming=True
+        chunks: iterable of DataFrames with rows of the table, e.g. ColumnStore.scan()
+        budget: seconds between two appends
+        clock: function returning the time in seconds
+
+    Returns:
+        the payload of the consent page
+    """
+    # The progress commands of the scheduler are the appends, made here
+    scheduler = Scheduler(None, budget, clock)
+    pending = []
+    rendered = False
+    for chunk in chunks:
+        if len(chunk):
+            pending.append(chunk)
+        if pending and (not rendered or scheduler.due()):
+            command = table.append(pd.concat(pending))
+            pending = []
+            yield command if rendered else render()
+            rendered = True
+            scheduler.reset()
+
+    if not rendered:
+        yield render()
+    rows = pd.concat(pending) if pending else None
+    payload = yield table.append(rows, done=True)
+    return payload
@@ -0,0 +1,209 @@
+"""
+Random access into DEFLATE compressed members.
+
+A compressed zip member can only be decompressed from its start, so
+reading it again (to page through it, or to filter it again after the
+participant changed a choice) costs a full decompression each time, and
+seeking backwards in a ZipExtFile starts over from the beginning.
+
+IndexedDeflateReader decompresses a member once from front to back and
+keeps a copy of the state of the decompressor every SPAN bytes of
+output, like zran of zlib: a DeflateIndex. A later read at any offset
+restores the nearest checkpoint before it and decompresses at most SPAN
+bytes to get there. The index belongs to the member, so it is kept
+across reopens of the member.
+
+A checkpoint holds the 32 KiB window of the decompressor, so an index of
+a 4 GB member with the default span takes about 10 MB. No checkpoints
+are added when memory is critical.
+"""
+
+import bisect
+import io
+import zlib
+from dataclasses import dataclass
+from typing import Any
+
+from port.api.memory import CRITICAL, get_governor
+
+# Bytes of output between two checkpoints
+SPAN = 16 * 1024 * 1024
+# Bytes of compressed data read at a time
+INPUT_BLOCK_SIZE = 256 * 1024
+# Bytes of output decompressed at a time
+OUTPUT_BLOCK_SIZE = 1024 * 1024
+# Estimate of the memory of a checkpoint, the window and the state of the decompressor
+CHECKPOINT_SIZE = 40 * 1024
+
+
+@dataclass
+class _Checkpoint:
+    """State of the decompressor at an offset in the output"""
+
+    output_offset: int
+    input_offset: int
+    decompressor: Any
+
+
+class DeflateIndex:
+    """
+    Checkpoints of the decompression of a member.
+
+    Args:
+        span: bytes of output between two checkpoints
+    """
+
+    def __init__(self, span=SPAN):
+        self.span = span
+        self.checkpoints = []
+        self._offsets = []
+        # Offset in the output up to which the member was decompressed
+        self.covered = 0
+
+    def __len__(self):
+        return len(self.checkpoints)
+
+    def nbytes(self):
+        return len(self.checkpoints) * CHECKPOINT_SIZE
+
+    def next_offset(self):
+        """Return the offset in the output at which the next checkpoint is due."""
+        return (self._offsets[-1] if self._offsets else 0) + self.span
+
+    def add(self, output_offset, input_offset, decompressor):
+        """Add a checkpoint after the last one, with a copy of decompressor."""
+        if self._offsets and output_offset <= self._offsets[-1]:
+            return
+        if get_governor().state() == CRITICAL:
+            return
+        self.checkpoints.append(_Checkpoint(output_offset, input_offset, decompressor.copy()))
+        self._offsets.append(output_offset)
+
+    def nearest(self, output_offset):
+        """Return the last checkpoint at or before output_offset, None if there is none."""
+        position = bisect.bisect_right(self._offsets, output_offset)
+        return self.checkpoints[position - 1] if position else None
+
+
+class IndexedDeflateReader(io.RawIOBase):
+    """
+    Seekable reader of raw DEFLATE data in a file, that builds and uses a DeflateIndex.
+
+    Wrap it in an io.BufferedReader for small reads and peek.
+
+    Args:
+        fp: seekable file with the compressed data, shared with others (it is seeked before every read)
+        offset: offset of the compressed data in fp
+        compress_size: number of bytes of compressed data
+        size: number of bytes of decompressed data
+        index: DeflateIndex of the member, a new one by default
+        crc: CRC-32 of the decompressed data, checked when the member is read from start to end
+        name: name of the member
+    """
+
+    def __init__(self, fp, offset, compress_size, size, index=None, crc=None, name=None):
+        super().__init__()
+        self.fp = fp
+        self.offset = offset
+        self.compress_size = compress_size
+        self.size = size
+        self.index = index if index is not None else DeflateIndex()
+        self.crc = crc
+        self.name = name
+        self._pos = 0
+        self._restart(None)
+
+    def _restart(self, checkpoint):
+        if checkpoint is None:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            self._input_pos = 0
+            self._output_pos = 0
+        else:
+            self._decompressor = checkpoint.decompressor.copy()
+            self._input_pos = checkpoint.input_offset
+            self._output_pos = checkpoint.output_offset
+        self._tail = b""
+        # The CRC is only known when the member is read from its start
+        self._running_crc = 0 if checkpoint is None else None
+
+    def _inflate(self, max_length):
+        """Decompress at most max_length bytes at the position of the decompressor, b"" at the end."""
+        while True:
+            if self._decompressor.eof:
+                return b""
+            if not self._tail:
+                remaining = self.compress_size - self._input_pos
+                if remaining <= 0:
+                    return b""
+                self.fp.seek(self.offset + self._input_pos)
+                self._tail = self.fp.read(min(INPUT_BLOCK_SIZE, remaining))
+                if not self._tail:
+                    raise EOFError(f"Compressed data of {self.name or 'member'} ends early")
+                self._input_pos += len(self._tail)
+
+            # Stop at the next checkpoint, so checkpoints are SPAN bytes apart
+            due = self.index.next_offset() - self._output_pos
+            data = self._decompressor.decompress(self._tail, min(max_length, due) if due > 0 else max_length)
+            self._tail = self._decompressor.unconsumed_tail
+            if not data:
+                continue
+
+            self._output_pos += len(data)
+            if self._running_crc is not None:
+                self._running_crc = zlib.crc32(data, self._running_crc)
+                if self._decompressor.eof:
+                    self._check_crc()
+            self.index.covered = max(self.index.covered, self._output_pos)
+            if self._output_pos >= self.index.next_offset():
+                # The decompressor holds the input before the unconsumed tail
+                self.index.add(self._output_pos, self._input_pos - len(self._tail), self._decompressor)
+            return data
+
+    def _check_crc(self):
+        if self.crc is not None and self._running_crc != self.crc:
+            raise zlib.error(f"Bad CRC-32 for {self.name or 'member'}")
+
+    def _position(self, target):
+        """Move the decompressor to target in the output."""
+        if target == self._output_pos:
+            return
+        checkpoint = self.index.nearest(target)
+        checkpoint_offset = checkpoint.output_offset if checkpoint is not None else 0
+        if target < self._output_pos or checkpoint_offset > self._output_pos:
+            self._restart(checkpoint)
+        while self._output_pos < target:
+            if not self._inflate(min(OUTPUT_BLOCK_SIZE, target - self._output_pos)):
+                break
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._pos + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._pos = position
+        return self._pos
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.size - self._pos)
+        if size <= 0:
+            return 0
+        self._position(self._pos)
+        data = self._inflate(min(size, OUTPUT_BLOCK_SIZE))
+        buffer[: len(data)] = data
+        self._pos += len(data)
+        return len(data)
@@ -0,0 +1,153 @@
+"""
+Memory-compact dtypes for extraction DataFrames.
+
+Frames built from lists of Python tuples keep every string as a Python
+object, which is expensive in Pyodide's wasm heap. This module rewrites
+columns into the smallest dtype that still produces the same JSON for
+the consent table, and reports how much memory was saved.
+"""
+
+import logging
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Strings are stored as categoricals when at most this fraction of the values is unique
+CATEGORY_THRESHOLD = 0.5
+
+
+@dataclass
+class DtypeReport:
+    """Result of a dtype optimization pass
+
+    Attributes:
+        memory_before: deep memory usage of the frame before optimization (in bytes)
+        memory_after: deep memory usage of the frame after optimization (in bytes)
+        conversions: mapping of column name to "<old dtype> -> <new dtype>"
+    """
+
+    memory_before: int
+    memory_after: int
+    conversions: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def saved(self):
+        return self.memory_before - self.memory_after
+
+    def __str__(self):
+        return (
+            f"dtype optimization: {self.memory_before} -> {self.memory_after} bytes "
+            f"({len(self.conversions)} columns converted)"
+        )
+
+
+def optimize_dtypes(data_frame, category_threshold=CATEGORY_THRESHOLD):
+    """
+    Convert the columns of a DataFrame to memory-compact dtypes.
+
+    Integers are downcast to the smallest integer type, floats to float32
+    when that is lossless, low-cardinality strings become categoricals and
+    timestamps held as Python objects are stored as int64 milliseconds
+    since the epoch (the representation ``DataFrame.to_json`` produces for
+    them anyway). datetime64 columns are kept as they are: int64 takes as
+    much memory and would change the column type shown to participants.
+    A conversion is only kept when it actually reduces memory usage.
+
+    Args:
+        data_frame: the DataFrame to optimize, it is not modified
+        category_threshold: maximum ratio of unique values for a string column to become categorical
+
+    Returns:
+        tuple: the optimized DataFrame and a DtypeReport
+    """
+    memory_before = int(data_frame.memory_usage(deep=True).sum())
+    columns = {}
+    conversions = {}
+
+    for position, name in enumerate(data_frame.columns):
+        series = data_frame.iloc[:, position]
+        converted = _optimize_series(series, category_threshold)
+        if (
+            converted is not None
+            and converted.dtype != series.dtype
+            and converted.memory_usage(index=False, deep=True) < series.memory_usage(index=False, deep=True)
+        ):
+            columns[position] = converted
+            conversions[str(name)] = f"{series.dtype} -> {converted.dtype}"
+
+    if columns:
+        data_frame = data_frame.copy(deep=False)
+        for position, converted in columns.items():
+            data_frame.isetitem(position, converted)
+
+    report = DtypeReport(
+        memory_before=memory_before,
+        memory_after=int(data_frame.memory_usage(deep=True).sum()),
+        conversions=conversions,
+    )
+    logger.debug(str(report))
+    return data_frame, report
+
+
+def _optimize_series(series, category_threshold):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return None
+
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return None
+
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return None
+
+    if pd.api.types.is_integer_dtype(series.dtype):
+        if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            return None
+        unsigned = len(series) > 0 and series.min() >= 0
+        return pd.to_numeric(series, downcast="unsigned" if unsigned else "integer")
+
+    if pd.api.types.is_float_dtype(series.dtype):
+        if series.dtype != np.float64:
+            return None
+        downcast = series.astype(np.float32)
+        if np.array_equal(downcast.to_numpy(np.float64), series.to_numpy(), equal_nan=True):
+            return downcast
+        return None
+
+    if pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred in ("datetime", "datetime64"):
+            try:
+                return _timestamps_to_int64(pd.to_datetime(series, utc=True))
+            except (TypeError, ValueError):
+                return None
+        if inferred == "string":
+            return _strings_to_category(series, category_threshold)
+
+    return None
+
+
+def _timestamps_to_int64(series):
+    if series.dt.tz is not None:
+        series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+    milliseconds = series.dt.as_unit("ms")
+    mask = milliseconds.isna().to_numpy()
+    values = milliseconds.to_numpy().view(np.int64)
+    if mask.any():
+        return pd.Series(
+            pd.arrays.IntegerArray(values.copy(), mask), index=series.index, name=series.name
+        )
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def _strings_to_category(series, category_threshold):
+    if len(series) == 0:
+        return None
+    if series.nunique(dropna=True) / len(series) > category_threshold:
+        return None
+    categorical = series.astype("category")
+    if categorical.memory_usage(deep=True) >= series.memory_usage(deep=True):
+        return None
+    return categorical
@@ -3,10 +3,101 @@ File utilities for handling browser File API with synchronous Python I/O.
 
 This module provides adapters to bridge async browser File APIs with
 synchronous Python file operations, avoiding the need to copy entire
-files into Pyodide's virtual filesystem.
+files into Pyodide's virtual filesystem. MmapFileAdapter offers the same
+interface for local files, so scripts can run under CPython (see port.runner).
+
+Every read of an AsyncFileAdapter is a call into JavaScript. Readers that
+know which scattered ranges they will need, like the local file headers
+of zip members, can pass them to prefetch, which fetches them all in a
+single call.
+
+The buffers returned by the reader arrive as JsProxy objects. They are
+copied into Python bytes and destroyed right away, so the JavaScript
+heap does not depend on the Python garbage collector to release them.
+proxy_stats keeps count of the proxies that are alive: the buffers while
+they are copied and the readers until their AsyncFileAdapter is closed,
+and of the bytes of the buffers that are alive.
 """
 
-import js
+import bisect
+import logging
+import mmap
+import os
+
+from port.api.memory import get_governor
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of bytes kept by prefetch
+PREFETCH_SIZE = 8 * 1024 * 1024
+
+
+class ProxyStats:
+    """
+    Accounting of the JsProxy objects of file readers and of the buffers received from them.
+
+    Attributes:
+        live: number of proxies that were not destroyed yet
+        bytes_held: size of the buffers of the live proxies
+        peak_live: highest number of live proxies
+        peak_bytes_held: highest bytes_held
+        created: number of proxies received
+        destroyed: number of proxies destroyed
+    """
+
+    __slots__ = "live", "bytes_held", "peak_live", "peak_bytes_held", "created", "destroyed"
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.live = 0
+        self.bytes_held = 0
+        self.peak_live = 0
+        self.peak_bytes_held = 0
+        self.created = 0
+        self.destroyed = 0
+
+    def acquired(self, size=0):
+        self.live += 1
+        self.bytes_held += size
+        self.created += 1
+        self.peak_live = max(self.peak_live, self.live)
+        self.peak_bytes_held = max(self.peak_bytes_held, self.bytes_held)
+
+    def released(self, size=0):
+        self.live -= 1
+        self.bytes_held -= size
+        self.destroyed += 1
+
+    def __str__(self):
+        return (
+            f"proxies: {self.live} live holding {self.bytes_held} bytes "
+            f"(peak {self.peak_live} holding {self.peak_bytes_held} bytes), "
+            f"{self.created} created, {self.destroyed} destroyed"
+        )
+
+
+proxy_stats = ProxyStats()
+
+
+def take_bytes(buffer):
+    """
+    Return the data of an ArrayBuffer proxy as bytes and destroy the proxy.
+
+    Buffers without to_bytes are converted with to_py.
+    """
+    size = getattr(buffer, "byteLength", 0)
+    proxy_stats.acquired(size)
+    try:
+        if hasattr(buffer, "to_bytes"):
+            # A single copy from the JavaScript heap
+            return buffer.to_bytes()
+        return bytes(buffer.to_py())
+    finally:
+        if hasattr(buffer, "destroy"):
+            buffer.destroy()
+        proxy_stats.released(size)
 
 
 class AsyncFileAdapter:
@@ -24,10 +115,12 @@ class AsyncFileAdapter:
     def __init__(self, js_reader):
         # Store the JS reader object directly (via Pyodide FFI)
         self.reader = js_reader
+        proxy_stats.acquired()
         self.position = 0
         self.size = self.reader.size
         self.name = self.reader.name
         self._closed = False
+        self._clear_prefetched()
 
     def read(self, size=-1):
         """
@@ -45,20 +138,89 @@ class AsyncFileAdapter:
         if size == -1:
             size = self.size - self.position
 
+        # Ensure we don't read past the end, reading at the end needs no call into JavaScript
+        size = min(size, self.size - self.position)
+
         if size <= 0:
             return b""
 
-        # Ensure we don't read past the end
-        size = min(size, self.size - self.position)
+        result = self._prefetched_slice(self.position, self.position + size)
+        if result is None:
+            result = self._read_slice(self.position, self.position + size)
+        self.position += len(result)
 
+        return result
+
+    def _read_slice(self, start, end):
         # Call the synchronous JS function (uses FileReaderSync in worker)
-        chunk_data = self.reader.readSlice(self.position, self.position + size)
+        return take_bytes(self.reader.readSlice(start, end))
 
-        # Convert to Python bytes
-        result = bytes(chunk_data.to_py())
-        self.position += len(result)
+    def _read_slices(self, ranges):
+        """Return the data of all (start, end) ranges, concatenated."""
+        if not hasattr(self.reader, "readSlices"):
+            return b"".join(self._read_slice(start, end) for start, end in ranges)
+        # A single call and a single buffer for all ranges
+        flat = [offset for start_end in ranges for offset in start_end]
+        return take_bytes(self.reader.readSlices(flat))
 
-        return result
+    def prefetch(self, ranges):
+        """
+        Hint that the given byte ranges will be read soon.
+
+        The ranges are fetched in a single read and later reads that fall
+        inside one of them are answered from memory, until the next call
+        to prefetch. Ranges beyond PREFETCH_SIZE bytes, scaled down by the
+        memory governor, are not fetched.
+
+        Args:
+            ranges: iterable of (start, end) byte offsets
+
+        Returns:
+            int: the number of bytes fetched
+        """
+        if self._closed:
+            raise ValueError("I/O operation on closed file")
+
+        merged = []
+        for start, end in sorted((max(0, start), min(end, self.size)) for start, end in ranges):
+            if end <= start:
+                continue
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        limit = get_governor().block_size(PREFETCH_SIZE)
+        selected, total = [], 0
+        for start, end in merged:
+            if total + end - start > limit:
+                break
+            selected.append((start, end))
+            total += end - start
+
+        self._clear_prefetched()
+        if not selected:
+            return 0
+        data = memoryview(self._read_slices(selected))
+        position = 0
+        for start, end in selected:
+            self._prefetched_starts.append(start)
+            self._prefetched_ends.append(end)
+            self._prefetched_data.append(data[position : position + end - start])
+            position += end - start
+        return total
+
+    def _prefetched_slice(self, start, end):
+        index = bisect.bisect_right(self._prefetched_starts, start) - 1
+        if index < 0 or end > self._prefetched_ends[index]:
+            return None
+        offset = start - self._prefetched_starts[index]
+        return bytes(self._prefetched_data[index][offset : offset + end - start])
+
+    def _clear_prefetched(self):
+        self._prefetched_starts = []
+        self._prefetched_ends = []
+        self._prefetched_data = []
 
     def seek(self, offset, whence=0):
         """
@@ -100,7 +262,11 @@ class AsyncFileAdapter:
         """Close the file and clean up resources."""
         if not self._closed:
             self._closed = True
-            # JS object cleanup is handled by Pyodide's garbage collection
+            self._clear_prefetched()
+            if hasattr(self.reader, "destroy"):
+                self.reader.destroy()
+            proxy_stats.released()
+            logger.debug(f"Closed {self.name}, {proxy_stats}")
 
     def __enter__(self):
         """Support for context manager protocol."""
@@ -122,3 +288,40 @@ class AsyncFileAdapter:
     def writable(self):
         """Return whether the file is writable (always False)."""
         return False
+
+
+class MmapFileAdapter(AsyncFileAdapter):
+    """
+    A file-like object that reads a local file through a memory map.
+
+    This adapter has the same interface as AsyncFileAdapter, so code that
+    reads uploaded files in the browser reads local files the same way
+    under CPython. Pages are loaded by the operating system when they are
+    read, so large files are not copied into memory.
+
+    Args:
+        path: path of the local file
+    """
+
+    def __init__(self, path):
+        self.reader = None
+        self.position = 0
+        self.size = os.path.getsize(path)
+        self.name = os.path.basename(path)
+        self._closed = False
+        self._clear_prefetched()
+        self._file = open(path, "rb")
+        # Empty files cannot be mapped
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def _read_slice(self, start, end):
+        return self._mmap[start:end]
+
+    def close(self):
+        """Close the file and unmap it."""
+        if not self._closed:
+            self._closed = True
+            self._clear_prefetched()
+            if self._mmap is not None:
+                self._mmap.close()
+            self._file.close()
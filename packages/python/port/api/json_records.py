@@ -0,0 +1,249 @@
+"""
+Projected parsing of JSON records.
+
+Extractors usually need a handful of fields out of records with dozens
+of nested keys. Loading a member with json.load materializes the whole
+document as Python objects, and pd.json_normalize then flattens every
+field of every record before the columns that are needed are selected.
+
+The readers here scan the member in blocks and decode one record at a
+time with the C decoder of the json module. Only the values at the
+projected paths are kept, as one list per column, and the record is
+dropped before the next one is decoded. Memory is bounded by a block, a
+single record and the projected columns, no matter how large the member
+is. Records are read from:
+
+- a top-level array, [{...}, {...}]
+- JSON Lines or concatenated values, {...}\\n{...}
+- the array at records_path in a top-level object, {"data": {"items": [...]}}
+
+A path is a dotted string ("subtitles.0.name", integers index lists) or a
+sequence of keys and indexes. Values missing from a record are None.
+
+Example:
+    fields = {"time": "time", "title": "title", "channel": "subtitles.0.name"}
+    data_frame = read_frame(file, fields)
+"""
+
+import codecs
+import json
+from collections.abc import Mapping
+
+import pandas as pd
+
+BLOCK_SIZE = 1024 * 1024
+# Number of rows per DataFrame of iter_frames
+CHUNK_SIZE = 65536
+
+_WHITESPACE = " \t\n\r"
+_MISSING = object()
+
+
+def parse_path(path):
+    """Return a path as a tuple of keys and indexes."""
+    if isinstance(path, str):
+        return tuple(int(part) if part.lstrip("-").isdigit() else part for part in path.split("."))
+    return tuple(path)
+
+
+def _resolve(record, path):
+    value = record
+    for part in path:
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING) if isinstance(part, str) else value.get(str(part), _MISSING)
+        elif isinstance(value, list) and isinstance(part, int) and -len(value) <= part < len(value):
+            value = value[part]
+        else:
+            return None
+        if value is _MISSING:
+            return None
+    return value
+
+
+class Projection:
+    """
+    The fields to keep of every record.
+
+    Args:
+        fields: mapping of column names to paths, or a list of paths that are also the column names
+    """
+
+    def __init__(self, fields):
+        if not isinstance(fields, Mapping):
+            fields = {path if isinstance(path, str) else ".".join(map(str, path)): path for path in fields}
+        if not fields:
+            raise ValueError("A projection needs at least one field")
+        self.columns = list(fields)
+        self.paths = [parse_path(path) for path in fields.values()]
+
+    def extract(self, record):
+        """Return the values of the fields of record, in column order."""
+        return [_resolve(record, path) for path in self.paths]
+
+
+class _Scanner:
+    """Decodes JSON values one at a time from a file read in blocks."""
+
+    def __init__(self, fp, block_size):
+        self.fp = fp
+        self.block_size = block_size
+        self.decoder = json.JSONDecoder()
+        self.incremental = None
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size):
+        if self.eof:
+            return False
+        data = self.fp.read(size)
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            if self.incremental is None:
+                self.incremental = codecs.getincrementaldecoder("utf-8-sig")()
+            text = self.incremental.decode(bytes(data), final=not data)
+        else:
+            text = data
+        if not data:
+            self.eof = True
+        # Drop the text that was decoded already
+        self.text = self.text[self.pos :] + text
+        self.pos = 0
+        return bool(data) or bool(text)
+
+    def peek(self):
+        """Return the next character that is not whitespace, "" at the end."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self._fill(self.block_size):
+                return ""
+
+    def expect(self, characters):
+        character = self.peek()
+        if character == "" or character not in characters:
+            raise json.JSONDecodeError(f"Expected one of {characters!r}", self.text, self.pos)
+        self.pos += 1
+        return character
+
+    def value(self):
+        """Decode the next value."""
+        self.peek()
+        size = self.block_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.text, self.pos)
+                # A number at the end of the text may continue in the next block
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # The value does not fit in the text read so far, read more at a growing pace
+            self._fill(size)
+            size *= 2
+
+
+def _array_items(scanner):
+    scanner.expect("[")
+    if scanner.peek() == "]":
+        scanner.pos += 1
+        return
+    while True:
+        yield scanner.value()
+        if scanner.expect(",]") == "]":
+            return
+
+
+def _find_array(scanner, path):
+    """Move the scanner to the array at path in the object that starts at the scanner."""
+    for depth, key in enumerate(path):
+        missing = KeyError(f"No records at {'.'.join(map(str, path[: depth + 1]))}")
+        scanner.expect("{")
+        if scanner.peek() == "}":
+            raise missing
+        while True:
+            name = scanner.value()
+            scanner.expect(":")
+            if name == str(key):
+                break
+            # Values before the records are decoded to skip them
+            scanner.value()
+            if scanner.expect(",}") == "}":
+                raise missing
+
+
+def iter_records(fp, records_path=None, block_size=BLOCK_SIZE):
+    """
+    Yield the records of a JSON file one at a time.
+
+    Args:
+        fp: file object, binary (UTF-8) or text
+        records_path: path of the array of records in a top-level object
+        block_size: number of bytes read at a time
+    """
+    scanner = _Scanner(fp, block_size)
+    if records_path is not None:
+        _find_array(scanner, parse_path(records_path))
+        yield from _array_items(scanner)
+        return
+
+    if scanner.peek() == "[":
+        yield from _array_items(scanner)
+        return
+    while scanner.peek() != "":
+        yield scanner.value()
+
+
+def iter_rows(fp, fields, records_path=None, block_size=BLOCK_SIZE):
+    """Yield the projected fields of every record as a list of values."""
+    projection = fields if isinstance(fields, Projection) else Projection(fields)
+    for record in iter_records(fp, records_path, block_size):
+        if isinstance(record, dict):
+            yield projection.extract(record)
+
+
+def read_columns(fp, fields, records_path=None, block_size=BLOCK_SIZE, limit=None):
+    """
+    Return the projected fields of the records as a dict of column lists, for pd.DataFrame.
+
+    Records that are not objects are skipped.
+
+    Args:
+        fields: mapping of column names to paths, or a list of paths
+        limit: maximum number of records to read
+    """
+    projection = fields if isinstance(fields, Projection) else Projection(fields)
+    columns = [[] for _ in projection.columns]
+    appends = [column.append for column in columns]
+    for count, row in enumerate(iter_rows(fp, projection, records_path, block_size)):
+        if limit is not None and count >= limit:
+            break
+        for append, value in zip(appends, row):
+            append(value)
+    return dict(zip(projection.columns, columns))
+
+
+def read_frame(fp, fields, records_path=None, block_size=BLOCK_SIZE, limit=None):
+    """Return the projected fields of the records as a DataFrame, see read_columns."""
+    projection = fields if isinstance(fields, Projection) else Projection(fields)
+    return pd.DataFrame(read_columns(fp, projection, records_path, block_size, limit), columns=projection.columns)
+
+
+def iter_frames(fp, fields, records_path=None, block_size=BLOCK_SIZE, chunk_size=CHUNK_SIZE):
+    """
+    Yield the projected fields of the records as DataFrames of at most chunk_size rows.
+
+    The DataFrames can be appended to a ColumnStore or a streaming consent table.
+    """
+    projection = fields if isinstance(fields, Projection) else Projection(fields)
+    rows = []
+    for row in iter_rows(fp, projection, records_path, block_size):
+        rows.append(row)
+        if len(rows) >= chunk_size:
+            yield pd.DataFrame(rows, columns=projection.columns)
+            rows = []
+    if rows:
+        yield pd.DataFrame(rows, columns=projection.columns)
@@ -0,0 +1,401 @@
+"""
+Header-only inspection of photos, videos and audio in platform exports.
+
+Most of the bytes of an export are media that extractors never look at.
+MediaFilter decides whether a member is media from its name, which is in
+the central directory, and only for names without a known extension from
+the first few bytes of the member. NestedArchiveReader leaves the members
+it selects out of iter_members, so their data is never read.
+
+read_media_info extracts what is known about a media file from its
+headers: the dimensions of photos and videos, the duration of videos and
+audio, and the time a photo or video was taken. The headers are found by
+seeking from box to box or segment to segment, so the payload of a file
+that can be read at any offset (a plain file or a STORED member) is never
+read, also when the headers of a video are at its end. Compressed members
+can only be read front to back, so in them the walk stops at the media
+data: a video with its headers at the end then only tells its format.
+
+Supported formats:
+
+- images: JPEG (with EXIF), PNG, GIF, WebP, HEIC (format only)
+- videos: MP4, QuickTime, 3GP, AVI
+- audio: WAV, FLAC, M4A, MP3 and Ogg (format only)
+"""
+
+import os
+import struct
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+IMAGE = "image"
+VIDEO = "video"
+AUDIO = "audio"
+
+MEDIA_KINDS = (IMAGE, VIDEO, AUDIO)
+
+# Number of bytes that tell the format of a file
+HEADER_SIZE = 32
+# Maximum number of segments, boxes or chunks visited in a file
+MAX_STEPS = 256
+# End of a file of unknown size that cannot be seeked to its end cheaply
+_UNKNOWN_END = 1 << 62
+
+_EXTENSIONS = {
+    IMAGE: (".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".heif", ".bmp", ".tif", ".tiff", ".dng"),
+    VIDEO: (".mp4", ".mov", ".m4v", ".3gp", ".avi", ".mkv", ".webm", ".wmv"),
+    AUDIO: (".mp3", ".m4a", ".aac", ".wav", ".flac", ".ogg", ".oga", ".opus", ".amr", ".wma"),
+}
+_KIND_OF_EXTENSION = {extension: kind for kind, extensions in _EXTENSIONS.items() for extension in extensions}
+# Extensions of the files that extractors read, which are never peeked at
+_DATA_EXTENSIONS = (".json", ".js", ".csv", ".tsv", ".txt", ".html", ".htm", ".xml", ".ics", ".vcf", ".zip", ".tar", ".gz")
+
+_KIND_OF_FORMAT = {
+    "jpeg": IMAGE,
+    "png": IMAGE,
+    "gif": IMAGE,
+    "webp": IMAGE,
+    "heic": IMAGE,
+    "mp4": VIDEO,
+    "quicktime": VIDEO,
+    "3gp": VIDEO,
+    "avi": VIDEO,
+    "m4a": AUDIO,
+    "wav": AUDIO,
+    "flac": AUDIO,
+    "mp3": AUDIO,
+    "ogg": AUDIO,
+}
+_HEIF_BRANDS = (b"heic", b"heix", b"heim", b"heis", b"mif1", b"msf1", b"avif")
+_MP4_EPOCH = datetime(1904, 1, 1)
+_EXIF_DATE_TIME = 0x0132
+_EXIF_IFD = 0x8769
+_EXIF_DATE_TIME_ORIGINAL = 0x9003
+# SOF markers of JPEG, without DHT (C4), JPG (C8) and DAC (CC)
+_JPEG_FRAME_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+@dataclass
+class MediaInfo:
+    """What the headers of a media file tell
+
+    Attributes:
+        kind: IMAGE, VIDEO or AUDIO
+        format: e.g. "jpeg" or "mp4", None if only the name tells it is media
+        width: width in pixels
+        height: height in pixels
+        duration: duration in seconds
+        taken: time the photo or video was taken, local time for EXIF and UTC for videos
+    """
+
+    kind: str
+    format: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    duration: Optional[float] = None
+    taken: Optional[datetime] = None
+
+
+def media_kind(name):
+    """Return IMAGE, VIDEO or AUDIO based on the file name, or None for other files."""
+    return _KIND_OF_EXTENSION.get(os.path.splitext(name)[1].lower())
+
+
+def media_format(header):
+    """Return the format of a media file from its first HEADER_SIZE bytes, or None for other files."""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if header[:4] == b"RIFF":
+        return {b"WEBP": "webp", b"WAVE": "wav", b"AVI ": "avi"}.get(header[8:12])
+    if header[4:8] == b"ftyp":
+        brand = header[8:12]
+        if brand in _HEIF_BRANDS:
+            return "heic"
+        if brand == b"qt  ":
+            return "quicktime"
+        if brand.startswith(b"3g"):
+            return "3gp"
+        if brand in (b"M4A ", b"M4B "):
+            return "m4a"
+        return "mp4"
+    if header.startswith(b"fLaC"):
+        return "flac"
+    if header.startswith(b"ID3") or header[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "mp3"
+    if header.startswith(b"OggS"):
+        return "ogg"
+    return None
+
+
+class MediaFilter:
+    """
+    Decides whether a member of an archive is media that is skipped.
+
+    Pass it as skip to NestedArchiveReader. Members with a media extension
+    are decided from their name. Members without a known extension (some
+    platforms name photos by an id) are decided from their first bytes,
+    which costs a read of a few bytes.
+
+    Args:
+        kinds: kinds of media that are skipped
+        peek_unknown: look at the first bytes of members without a known extension
+    """
+
+    def __init__(self, kinds=MEDIA_KINDS, peek_unknown=True):
+        self.kinds = tuple(kinds)
+        self.peek_unknown = peek_unknown
+
+    def __call__(self, member, peek):
+        """
+        Return whether member is skipped.
+
+        Args:
+            member: ArchiveMember
+            peek: function that returns the first bytes of the member
+        """
+        kind = media_kind(member.name)
+        if kind is not None:
+            return kind in self.kinds
+        if not self.peek_unknown or member.name.lower().endswith(_DATA_EXTENSIONS) or member.size == 0:
+            return False
+        return _KIND_OF_FORMAT.get(media_format(peek(HEADER_SIZE))) in self.kinds
+
+
+def _read_at(fp, offset, size):
+    fp.seek(offset)
+    return fp.read(size)
+
+
+def _exif_taken(tiff):
+    """Return DateTimeOriginal (or DateTime) of the TIFF structure of an EXIF segment."""
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if order is None:
+        return None
+
+    def entries(offset):
+        (count,) = struct.unpack_from(order + "H", tiff, offset)
+        for index in range(min(count, MAX_STEPS)):
+            tag, _, length, value = struct.unpack_from(order + "HHI4s", tiff, offset + 2 + 12 * index)
+            yield tag, length, value
+
+    def text(length, value):
+        (offset,) = struct.unpack(order + "I", value)
+        return tiff[offset : offset + length].split(b"\x00")[0].decode("ascii", "replace")
+
+    found = {}
+    (ifd,) = struct.unpack_from(order + "I", tiff, 4)
+    for tag, length, value in entries(ifd):
+        if tag == _EXIF_DATE_TIME:
+            found[tag] = text(length, value)
+        elif tag == _EXIF_IFD:
+            for exif_tag, exif_length, exif_value in entries(struct.unpack(order + "I", value)[0]):
+                if exif_tag == _EXIF_DATE_TIME_ORIGINAL:
+                    found[exif_tag] = text(exif_length, exif_value)
+    for tag in (_EXIF_DATE_TIME_ORIGINAL, _EXIF_DATE_TIME):
+        try:
+            return datetime.strptime(found[tag].strip(), "%Y:%m:%d %H:%M:%S")
+        except (KeyError, ValueError):
+            continue
+    return None
+
+
+def _jpeg(fp, header, info):
+    position = 2
+    for _ in range(MAX_STEPS):
+        marker = _read_at(fp, position, 4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            return
+        code = marker[1]
+        if code == 0xFF:
+            # Fill byte
+            position += 1
+            continue
+        if code == 0x01 or 0xD0 <= code <= 0xD8:
+            position += 2
+            continue
+        if code in (0xD9, 0xDA):
+            # The image data starts, no headers follow
+            return
+        (length,) = struct.unpack(">H", marker[2:])
+        if code == 0xE1 and info.taken is None:
+            segment = _read_at(fp, position + 4, length - 2)
+            if segment.startswith(b"Exif\x00\x00"):
+                info.taken = _exif_taken(segment[6:])
+        elif code in _JPEG_FRAME_MARKERS:
+            info.height, info.width = struct.unpack(">xHH", _read_at(fp, position + 4, 5))
+            return
+        position += 2 + length
+
+
+def _png(fp, header, info):
+    if header[12:16] == b"IHDR":
+        info.width, info.height = struct.unpack(">II", header[16:24])
+
+
+def _gif(fp, header, info):
+    info.width, info.height = struct.unpack("<HH", header[6:10])
+
+
+def _webp(fp, header, info):
+    chunk = header[12:16]
+    if chunk == b"VP8X":
+        info.width = int.from_bytes(header[24:27], "little") + 1
+        info.height = int.from_bytes(header[27:30], "little") + 1
+    elif chunk == b"VP8L":
+        (bits,) = struct.unpack("<I", header[21:25])
+        info.width = (bits & 0x3FFF) + 1
+        info.height = ((bits >> 14) & 0x3FFF) + 1
+    elif chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", header[26:30])
+        info.width, info.height = width & 0x3FFF, height & 0x3FFF
+
+
+def _boxes(fp, start, end):
+    """Yield (type, start, end) of the data of the ISO media boxes between start and end."""
+    position = start
+    for _ in range(MAX_STEPS):
+        if position + 8 > end:
+            return
+        header = _read_at(fp, position, 16)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1 and len(header) == 16:
+            (size,) = struct.unpack(">Q", header[8:])
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size:
+            return
+        yield box_type, position + header_size, min(position + size, end)
+        position += size
+
+
+def _movie_header(data, info):
+    if data[0] == 1:
+        created, _, timescale, duration = struct.unpack(">QQIQ", data[4:32])
+    else:
+        created, _, timescale, duration = struct.unpack(">IIII", data[4:20])
+    if timescale:
+        info.duration = duration / timescale
+    if created:
+        info.taken = _MP4_EPOCH + timedelta(seconds=created)
+
+
+def _track_header(data, info):
+    offset = 88 if data[0] == 1 else 76
+    width, height = struct.unpack(">II", data[offset : offset + 8])
+    if width and height and info.width is None:
+        info.width, info.height = width >> 16, height >> 16
+
+
+def _mp4(fp, info, size, random_access):
+    if size is None or size < 0:
+        size = fp.seek(0, os.SEEK_END) if random_access else _UNKNOWN_END
+    for box_type, start, stop in _boxes(fp, 0, size):
+        # The media data (mdat) is skipped, the movie (moov) can come before or after it
+        if box_type == b"mdat" and not random_access:
+            return
+        if box_type != b"moov":
+            continue
+        for child_type, child_start, child_stop in _boxes(fp, start, stop):
+            if child_type == b"mvhd":
+                _movie_header(_read_at(fp, child_start, 32), info)
+            elif child_type == b"trak":
+                for track_type, track_start, _ in _boxes(fp, child_start, child_stop):
+                    if track_type == b"tkhd":
+                        _track_header(_read_at(fp, track_start, 96), info)
+        return
+
+
+def _riff_chunks(fp, start, end):
+    position = start
+    for _ in range(MAX_STEPS):
+        header = _read_at(fp, position, 8)
+        if len(header) < 8 or position + 8 > end:
+            return
+        chunk_type, size = struct.unpack("<4sI", header)
+        yield chunk_type, position + 8, size
+        # Chunks are aligned to two bytes
+        position += 8 + size + (size & 1)
+
+
+def _wav(fp, header, info):
+    (riff_size,) = struct.unpack("<I", header[4:8])
+    byte_rate = None
+    for chunk_type, start, size in _riff_chunks(fp, 12, 8 + riff_size):
+        if chunk_type == b"fmt ":
+            (byte_rate,) = struct.unpack("<I", _read_at(fp, start + 8, 4))
+        elif chunk_type == b"data":
+            if byte_rate:
+                info.duration = size / byte_rate
+            return
+
+
+def _avi(fp, header, info):
+    # The main AVI header is the first chunk of the hdrl list at the start of the file
+    data = _read_at(fp, 12, 64)
+    if data[:4] != b"LIST" or data[8:12] != b"hdrl" or data[12:16] != b"avih":
+        return
+    frame_time, _, _, _, frames, _, _, _, width, height = struct.unpack("<10I", data[20:60])
+    info.width, info.height = width, height
+    info.duration = frames * frame_time / 1e6
+
+
+def _flac(fp, header, info):
+    # STREAMINFO is the first metadata block
+    (bits,) = struct.unpack(">Q", header[18:26])
+    sample_rate = bits >> 44
+    samples = bits & 0xFFFFFFFFF
+    if sample_rate and samples:
+        info.duration = samples / sample_rate
+
+
+_PARSERS = {
+    "jpeg": _jpeg,
+    "png": _png,
+    "gif": _gif,
+    "webp": _webp,
+    "wav": _wav,
+    "avi": _avi,
+    "flac": _flac,
+}
+
+
+_ISO_FORMATS = ("mp4", "quicktime", "3gp", "m4a")
+
+
+def read_media_info(fp, name=None, size=None, random_access=True):
+    """
+    Return the MediaInfo of a media file from its headers, None if it is not media.
+
+    Headers that cannot be parsed leave the fields they hold None.
+
+    Args:
+        fp: seekable file-like object positioned at the start of the file
+        name: name of the file, used when the format is not recognized
+        size: size of the file in bytes, found by seeking to its end by default
+        random_access: whether fp can be seeked far ahead without reading what is in between;
+            False for compressed members, then the headers after the media data are not read
+    """
+    header = fp.read(HEADER_SIZE)
+    media = media_format(header)
+    if media is None:
+        kind = media_kind(name) if name else None
+        return MediaInfo(kind) if kind is not None else None
+
+    info = MediaInfo(_KIND_OF_FORMAT[media], media)
+    try:
+        if media in _ISO_FORMATS:
+            _mp4(fp, info, size, random_access)
+        elif media in _PARSERS:
+            _PARSERS[media](fp, header, info)
+    except (struct.error, ValueError, IndexError, OSError, EOFError, OverflowError):
+        pass
+    return info
@@ -0,0 +1,82 @@
+"""
+Memoization of static props.
+
+Scripts build the same headers, file prompts and confirmation prompts
+again on every render, some of them once per file of an export. The
+static decorator keeps the props a function returns per set of arguments
+and wraps them in StaticProps, which serializes the props tree only once.
+A repeated render then costs a dictionary lookup.
+
+    @static
+    def prompt_file(extensions):
+        return props.PropsUIPromptFileInput(description, extensions)
+
+Only use it for functions whose result depends on nothing but their
+(hashable) arguments. The cache shrinks when memory runs low and is not
+used at all when memory is critical.
+"""
+
+import functools
+from collections import OrderedDict
+
+from port.api.memory import get_governor
+
+MAX_ENTRIES = 128
+
+
+class StaticProps:
+    """
+    Props tree that does not change, with its toDict computed once.
+
+    The dict returned by toDict is shared between renders and must not be
+    modified. Attributes of the props are available on the StaticProps.
+    """
+
+    __slots__ = "props", "_dict"
+
+    def __init__(self, props):
+        self.props = props
+        self._dict = None
+
+    def toDict(self):
+        if self._dict is None:
+            self._dict = self.props.toDict()
+        return self._dict
+
+    def __getattr__(self, name):
+        # Not self.props, which would recurse while the slot is unset
+        return getattr(object.__getattribute__(self, "props"), name)
+
+    def __repr__(self):
+        return f"StaticProps({self.props!r})"
+
+
+def static(function=None, max_entries=MAX_ENTRIES):
+    """
+    Decorator that memoizes a function returning props, see the module docstring.
+
+    Args:
+        max_entries: number of results to keep, scaled down by the memory governor
+    """
+    if function is None:
+        return functools.partial(static, max_entries=max_entries)
+
+    cache = OrderedDict()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        result = StaticProps(function(*args, **kwargs))
+        size = get_governor().cache_size(max_entries)
+        if size > 0:
+            cache[key] = result
+        while len(cache) > size:
+            cache.popitem(last=False)
+        return result
+
+    wrapper.cache_clear = cache.clear
+    return wrapper
@@ -0,0 +1,146 @@
+"""
+Heap memory budget for the Python worker.
+
+Pyodide runs in a wasm heap of at most a few GB, and an export that is
+larger than expected ends the session with an out-of-memory error.
+The MemoryGovernor samples heap usage and exposes a budget that other
+parts of port use to adapt: read block sizes, consent table sizes and
+cache sizes shrink as memory fills up, and the ScriptWrapper warns the
+participant before the heap runs out.
+
+Heap usage is the size of the wasm memory under Pyodide (which only grows,
+so it is the high-water mark) and the memory traced by tracemalloc under
+CPython. Under Pyodide the state therefore never returns to OK once it has
+left it, even when memory is freed: limits stay reduced for the rest of the
+session. Without a budget the heap is never sampled, so tracemalloc, which
+slows down allocations, is only started when a budget is set under CPython.
+"""
+
+import sys
+import tracemalloc
+
+OK = "ok"
+WARNING = "warning"
+CRITICAL = "critical"
+
+# wasm32 can address 4 GB, but browsers often refuse to grow the heap beyond 2 GB
+PYODIDE_BUDGET = 2 * 1024**3
+MIN_BLOCK_SIZE = 64 * 1024
+MIN_ROWS = 100
+
+
+def _wasm_heap_size():
+    import pyodide_js
+
+    return pyodide_js._module.HEAP8.length
+
+
+def _traced_memory():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return tracemalloc.get_traced_memory()[0]
+
+
+class MemoryGovernor:
+    """
+    Tracks heap usage against a memory budget.
+
+    Args:
+        budget: memory budget in bytes, None for no budget
+        soft_limit: fraction of the budget at which memory is reported as WARNING
+        hard_limit: fraction of the budget at which memory is reported as CRITICAL
+        sampler: function returning the heap usage in bytes, detected from the platform by default
+    """
+
+    def __init__(self, budget=None, soft_limit=0.7, hard_limit=0.9, sampler=None):
+        self.budget = budget
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        if sampler is None:
+            sampler = _wasm_heap_size if sys.platform == "emscripten" else _traced_memory
+        self.sampler = sampler
+        self.peak = 0
+
+    @classmethod
+    def for_platform(cls):
+        """Return a governor with a budget under Pyodide and without one under CPython."""
+        if sys.platform == "emscripten":
+            return cls(budget=PYODIDE_BUDGET)
+        return cls()
+
+    def used(self):
+        """Return the current heap usage in bytes."""
+        used = self.sampler()
+        self.peak = max(self.peak, used)
+        return used
+
+    def available(self):
+        """Return the number of bytes left in the budget, None without a budget."""
+        if self.budget is None:
+            return None
+        return max(0, self.budget - self.used())
+
+    def pressure(self):
+        """Return the used fraction of the budget, 0.0 without a budget."""
+        if self.budget is None:
+            return 0.0
+        return self.used() / self.budget
+
+    def state(self):
+        """Return OK, WARNING or CRITICAL; under Pyodide it never goes back down (see above)."""
+        pressure = self.pressure()
+        if pressure >= self.hard_limit:
+            return CRITICAL
+        if pressure >= self.soft_limit:
+            return WARNING
+        return OK
+
+    def can_allocate(self, size):
+        """Return whether size more bytes fit in the budget without reaching the hard limit."""
+        if self.budget is None:
+            return True
+        return self.used() + size < self.budget * self.hard_limit
+
+    def _scale(self):
+        state = self.state()
+        if state == CRITICAL:
+            return 0.25
+        if state == WARNING:
+            return 0.5
+        return 1.0
+
+    def block_size(self, default):
+        """Return the read block size to use instead of default."""
+        return max(MIN_BLOCK_SIZE, int(default * self._scale())) if default > MIN_BLOCK_SIZE else default
+
+    def max_rows(self, requested):
+        """Return the number of table rows to keep instead of requested."""
+        return max(min(requested, MIN_ROWS), int(requested * self._scale()))
+
+    def cache_size(self, requested):
+        """Return the number of cache entries to keep instead of requested, no caching when critical."""
+        if self.state() == CRITICAL:
+            return 0
+        return int(requested * self._scale())
+
+    def __str__(self):
+        if self.budget is None:
+            return "memory: no budget"
+        return f"memory: {self.used()} of {self.budget} bytes used ({self.state()}), peak {self.peak} bytes"
+
+
+_governor = None
+
+
+def get_governor():
+    """Return the governor shared by all of port."""
+    global _governor
+    if _governor is None:
+        _governor = MemoryGovernor.for_platform()
+    return _governor
+
+
+def set_governor(governor):
+    """Replace the shared governor, e.g. to set a budget when running under CPython."""
+    global _governor
+    _governor = governor
@@ -3,6 +3,13 @@ from typing import Optional, TypedDict, Union
 
 import pandas as pd
 
+from port.api.dtypes import optimize_dtypes
+from port.api.memory import get_governor
+from port.api.commands import CommandUIAppend
+from port.api.search import extend_index
+from port.api.serialization import RawJSON
+from port.api.truncation import Head, TruncationStrategy
+
 
 class Translations(TypedDict):
     """Typed dict containing text that is  display in a speficic language
@@ -91,15 +98,27 @@ class PropsUIPromptConsentFormTable:
     """Table to be shown to the participant prior to data_submission
 
     It is truncated to a maximum number of rows to avoid overloading the UI.
+    By default the first rows are kept, see port.api.truncation for other strategies.
+    When the worker runs low on memory fewer rows are kept.
+
+    A streaming table is shown while its rows are still being extracted.
+    The rows extracted later are added with append, which returns the
+    command that adds them to the table on the page, see
+    port.api.consent.stream_table. Appended rows beyond the maximum size
+    are dropped.
 
     Attributes:
         id: a unique string to itentify the table after donation
         number: the number of table in the list of tables
         title: title of the table
         description: description of the table
-        data_frame: table to be shown
+        data_frame: table to be shown, its index is replaced by the row numbers
         data_frame_max_size: maximum size of the table (in rows)
         headers: optional headers for the table columns
+        compact_dtypes: convert the columns of the table to memory-compact dtypes
+        truncation: strategy that selects the rows to show when the table is too large
+        searchable: index the rows in the worker while the page with the table is shown, to answer its search bar
+        streaming: rows are appended after the table is shown, until an append with done=True
     """
 
     id: str
@@ -109,12 +128,56 @@ class PropsUIPromptConsentFormTable:
     data_frame: pd.DataFrame
     data_frame_max_size: int = 10000
     headers: Optional[dict[str, Translatable]] = None
+    compact_dtypes: bool = True
+    truncation: Optional[TruncationStrategy] = None
+    searchable: bool = True
+    streaming: bool = False
 
     def __post_init__(self):
         if self.data_frame_max_size < 1:
             self.data_frame_max_size = 1
-        if len(self.data_frame) > self.data_frame_max_size:
-            self.data_frame = self.data_frame.head(self.data_frame_max_size).reset_index(drop=True)
+        max_size = get_governor().max_rows(self.data_frame_max_size)
+        if len(self.data_frame) > max_size:
+            truncation = self.truncation or Head()
+            self.data_frame = truncation.truncate(self.data_frame, max_size)
+        # The row ids of the consent table are the row numbers, see port.api.consent
+        self.data_frame = self.data_frame.reset_index(drop=True)
+        # The dtypes of a streaming table are made compact once all rows are appended
+        if self.compact_dtypes and not self.streaming:
+            self.data_frame, _ = optimize_dtypes(self.data_frame)
+
+    def append(self, data_frame=None, done=False):
+        """
+        Add rows to a streaming table.
+
+        The rows are numbered after the rows of the table. Yield the returned
+        command to add the rows to the table on the page; before the table is
+        shown they are simply part of the table.
+
+        Args:
+            data_frame: DataFrame with the columns of the table, or None
+            done: no rows follow, the consent page can be submitted
+
+        Returns:
+            CommandUIAppend
+        """
+        rows = self.data_frame.iloc[:0] if data_frame is None else data_frame
+        room = max(0, get_governor().max_rows(self.data_frame_max_size) - len(self.data_frame))
+        rows = rows.iloc[:room]
+        index = self.data_frame.index
+        start = int(index.max()) + 1 if len(index) and pd.api.types.is_integer_dtype(index) else len(index)
+        rows = rows.set_axis(pd.RangeIndex(start, start + len(rows)))
+        if len(rows):
+            self.data_frame = pd.concat([self.data_frame, rows])
+
+        data_frame_json = RawJSON(rows.to_json())
+        if self.searchable and len(rows):
+            extend_index(self.id, data_frame_json)
+        if done:
+            self.streaming = False
+            if self.compact_dtypes:
+                self.data_frame, _ = optimize_dtypes(self.data_frame)
+        return CommandUIAppend(self.id, data_frame_json, done)
 
     def toDict(self):
         dict = {}
@@ -123,11 +186,13 @@ class PropsUIPromptConsentFormTable:
         dict["number"] = self.number
         dict["title"] = self.title.toDict()
         dict["description"] = self.description.toDict()
-        dict["data_frame"] = self.data_frame.to_json()
+        dict["data_frame"] = RawJSON(self.data_frame.to_json())
         if self.headers:
             dict["headers"] = {
                 key: value.toDict() for key, value in self.headers.items()
             }
+        if self.streaming:
+            dict["streaming"] = True
         return dict
 
 
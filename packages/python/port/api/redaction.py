@@ -0,0 +1,161 @@
+"""
+Redaction of personal information before donation.
+
+Free text in chat and search histories contains email addresses, phone
+numbers, URLs and names that studies do not want to receive. Redacting
+row by row with a regular expression per kind of information is slow on
+large histories, so the Redactor compiles all patterns into a single
+matcher once and applies it to whole columns. Every distinct value is
+redacted only once, which pays off on the repetitive text in exports.
+
+Identifier columns (user names, chat partners, device ids) are replaced
+with pseudonyms: a keyed hash of the value, so the same value gets the
+same pseudonym within a donation while the salt stays with the participant.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+EMAIL = r"[\w.%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}"
+URL = r"(?:https?://|www\.)[^\s<>\"']+"
+# International numbers, numbers with an area code in parentheses, numbers with a trunk
+# prefix followed by a separator and 10-digit numbers grouped 3-3-4 (555-123-4567, (555) 123-4567);
+# not dates (01-02-2023, 01.02.2023), times or plain ids (0123456789)
+PHONE = (
+    r"(?:\+\d{1,3}[\s.-]?|\(0\d{1,4}\)[\s.-]?)\d(?:[\s.-]?\d){6,12}(?!\w)"
+    r"|(?!0\d?[.-]\d\d?[.-]\d{2,4}(?!\d))0\d{1,4}[\s.-]\d(?:[\s.-]?\d){5,11}(?!\w)"
+    r"|(?:1[\s.-])?(?:\(\d{3}\)\s?|\d{3}[\s.-])\d{3}[\s.-]\d{4}(?!\w)"
+)
+
+# Matches only start at the start of a token, which rejects most positions in a single step
+TOKEN_START = r"(?<![\w.%+-])"
+
+# Patterns are tried in order at every position, emails before URLs before phone numbers
+DEFAULT_PATTERNS = {
+    "email": EMAIL,
+    "url": URL,
+    "phone": PHONE,
+}
+
+
+class Redactor:
+    """
+    Replaces personal information in text with a label per kind of information.
+
+    Args:
+        patterns: mapping of kind to regular expression, DEFAULT_PATTERNS by default;
+            patterns only match at the start of a token
+        names: names to redact, matched as whole words regardless of case
+        replacement: replacement text, "{kind}" is replaced with the kind of information
+    """
+
+    def __init__(self, patterns=None, names=(), replacement="[{kind}]"):
+        patterns = dict(DEFAULT_PATTERNS if patterns is None else patterns)
+        names = sorted({name.strip() for name in names if name and name.strip()}, key=len, reverse=True)
+        if names:
+            patterns["name"] = r"(?i:" + "|".join(re.escape(name) for name in names) + r")(?!\w)"
+        if not patterns:
+            raise ValueError("Nothing to redact")
+
+        self.kinds = list(patterns)
+        alternatives = "|".join(f"(?P<{kind}>{pattern})" for kind, pattern in patterns.items())
+        self.pattern = re.compile(f"{TOKEN_START}(?:{alternatives})")
+        self.replacements = {kind: replacement.format(kind=kind) for kind in self.kinds}
+
+    def _replace(self, match):
+        return self.replacements[match.lastgroup]
+
+    def redact_text(self, text):
+        """Return text with personal information replaced."""
+        return self.pattern.sub(self._replace, text)
+
+    def redact(self, values):
+        """
+        Return a Series with personal information replaced in every value.
+
+        Missing values and non-string values are kept as they are.
+        """
+        series = values if isinstance(values, pd.Series) else pd.Series(values)
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        # The code of missing values is -1, which takes the None at the end
+        redacted = np.array([self.redact_text(value) if isinstance(value, str) else value for value in uniques] + [None], dtype=object)
+        result = pd.Series(redacted[codes], index=series.index, name=series.name)
+        if isinstance(series.dtype, pd.StringDtype):
+            result = result.astype(series.dtype)
+        return result
+
+    def redact_frame(self, data_frame, columns=None):
+        """
+        Return a copy of data_frame with personal information replaced.
+
+        Args:
+            data_frame: the DataFrame to redact, it is not modified
+            columns: columns to redact, all string columns by default
+        """
+        result = data_frame.copy()
+        if columns is None:
+            columns = [
+                column
+                for column in result.columns
+                if pd.api.types.is_string_dtype(result[column].dtype) or result[column].dtype == object
+            ]
+        for column in columns:
+            result[column] = self.redact(result[column])
+        return result
+
+    def count(self, values):
+        """Return the number of matches per kind of information in values, e.g. to report what was redacted."""
+        counts = dict.fromkeys(self.kinds, 0)
+        for value in pd.unique(pd.Series(values).dropna()):
+            if isinstance(value, str):
+                for match in self.pattern.finditer(value):
+                    counts[match.lastgroup] += 1
+        return counts
+
+
+def _key(salt):
+    key = salt.encode() if isinstance(salt, str) else bytes(salt)
+    if not key:
+        raise ValueError("A salt is required for pseudonymization")
+    # blake2b takes keys up to 64 bytes
+    return key if len(key) <= 64 else hashlib.sha512(key).digest()
+
+
+def pseudonymize(values, salt, digest_size=8, prefix=""):
+    """
+    Replace every value with a salted hash of the value.
+
+    Distinct values are hashed once, in a batch, with keyed BLAKE2b. Equal
+    values get equal pseudonyms for the same salt, so donated tables can
+    still be joined on pseudonymized columns. Missing values stay missing.
+
+    Args:
+        values: Series or list of identifiers
+        salt: secret salt (str or bytes), keep it out of the donation
+        digest_size: size of the hash in bytes, the pseudonym has twice as many hex digits
+        prefix: text to put in front of every pseudonym
+
+    Returns:
+        pd.Series: pseudonyms, with the index of values
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    key = _key(salt)
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    # The code of missing values is -1, which takes the None at the end
+    hashed = np.array(
+        [prefix + hashlib.blake2b(str(value).encode(), digest_size=digest_size, key=key).hexdigest() for value in uniques]
+        + [None],
+        dtype=object,
+    )
+    return pd.Series(hashed[codes], index=series.index, name=series.name)
+
+
+def pseudonymize_frame(data_frame, columns, salt, digest_size=8):
+    """Return a copy of data_frame with the given identifier columns pseudonymized."""
+    result = data_frame.copy()
+    for column in columns:
+        result[column] = pseudonymize(result[column], salt, digest_size)
+    return result
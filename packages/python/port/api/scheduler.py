@@ -0,0 +1,90 @@
+"""
+Time-sliced execution of long running script steps.
+
+The page in the browser only changes when the script yields a command,
+so a step that runs for a long time between two yields leaves the
+participant with a frozen progress bar. Yielding a progress page for
+every unit of work has the opposite problem: every yield is a round trip
+to the browser and a render, which is slow for thousands of small units.
+
+A Scheduler yields a progress page only when a time budget has been used
+up since the previous one, so the page is updated at a steady pace no
+matter how large the input is. It is used with yield from inside the
+process generator of a script:
+
+    scheduler = Scheduler(lambda done, total, unit: render_progress(done, total))
+    results = yield from scheduler.map(extract_file, files)
+
+    for index, table in enumerate(tables):
+        yield from scheduler.checkpoint(index, len(tables), table)
+        ...
+"""
+
+import time
+
+# Seconds of work between two progress pages
+BUDGET = 0.2
+
+
+class Scheduler:
+    """
+    Yields progress commands when a time budget is used up.
+
+    Args:
+        progress: function (done, total, unit) returning the command to yield, e.g. a
+            CommandUIRender with a PropsUIPromptProgress; total is None when unknown
+        budget: seconds of work between two progress commands
+        clock: function returning the time in seconds
+    """
+
+    def __init__(self, progress, budget=BUDGET, clock=time.perf_counter):
+        self.progress = progress
+        self.budget = budget
+        self.clock = clock
+        self.yields = 0
+        self.reset()
+
+    def reset(self):
+        """Start a new time slice, e.g. after the script yielded a command of its own."""
+        self._slice_started = self.clock()
+
+    def due(self):
+        """Return whether the time budget of the current slice is used up."""
+        return self.clock() - self._slice_started >= self.budget
+
+    def checkpoint(self, done, total=None, unit=None, force=False):
+        """
+        Generator that yields a progress command if the time budget is used up.
+
+        Use it with yield from between units of work. Returns the payload of
+        the progress command, None when nothing was yielded.
+
+        Args:
+            force: yield the progress command even if the budget is not used up
+        """
+        if not force and not self.due():
+            return None
+        self.yields += 1
+        payload = yield self.progress(done, total, unit)
+        self.reset()
+        return payload
+
+    def map(self, function, units, total=None):
+        """
+        Generator that applies function to every unit and returns the list of results.
+
+        A progress command is yielded before the first unit, so the page changes
+        right away, and before later units when the time budget is used up.
+
+        Args:
+            function: the work to do for a unit
+            units: iterable of units of work
+            total: number of units, taken from len(units) when possible
+        """
+        if total is None and hasattr(units, "__len__"):
+            total = len(units)
+        results = []
+        for done, unit in enumerate(units):
+            yield from self.checkpoint(done, total, unit, force=done == 0)
+            results.append(function(unit))
+        return results
@@ -0,0 +1,179 @@
+"""
+Search in consent tables.
+
+The search bar of a consent table filters the rows that contain every
+word of the query, ignoring case. On tables with hundreds of thousands
+of rows, matching the text of every row in the browser on each key
+stroke makes the page unresponsive, so the worker builds a SearchIndex
+for the consent tables of every page that is rendered and answers the
+queries. The indexes are dropped when another page is rendered and when
+data is donated, so only the tables on screen are held twice.
+
+The index holds the lowercased text of all rows, as the table shows it,
+in a single string with the offset of every row. A word is looked up
+with one substring scan of that string, which runs at C speed, and the
+matching offsets are mapped to rows with a binary search. The search
+bar matches substrings, which rules out a word index.
+"""
+
+import json
+import logging
+import math
+import re
+
+import numpy as np
+
+from port.api.memory import CRITICAL, get_governor
+
+logger = logging.getLogger(__name__)
+
+# Rows are separated by a character the words of a query do not contain
+SEPARATOR = "\n"
+
+_indexes = {}
+
+
+def _cell_text(value):
+    """Return the text of a cell, like String(value) of the parsed JSON in the browser."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        if math.isfinite(value) and value.is_integer() and abs(value) < 1e21:
+            return str(int(value))
+        return repr(value)
+    if isinstance(value, (dict, list)):
+        return "[object Object]" if isinstance(value, dict) else ",".join(_cell_text(item) for item in value)
+    return str(value)
+
+
+class SearchIndex:
+    """
+    Index of the rows of a table for the search bar.
+
+    Args:
+        columns: the table as parsed from DataFrame.to_json, {column: {row id: value}}
+    """
+
+    def __init__(self, columns):
+        self.row_ids = []
+        self.text = ""
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.extend(columns)
+
+    def extend(self, columns):
+        """Add the rows of a table with the same columns, e.g. the rows appended to a streaming table."""
+        cells = [list(map(_cell_text, column.values())) for column in columns.values()]
+        row_ids = list(next(iter(columns.values()), {}))
+        if not row_ids:
+            return
+        # Words never contain whitespace, so line breaks in cells can be replaced
+        texts = [text.replace(SEPARATOR, " ").lower() for text in map(" ".join, zip(*cells))]
+        text = SEPARATOR.join(texts)
+        self.text = self.text + SEPARATOR + text if self.row_ids else text
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)) + 1
+        self.offsets = np.concatenate((self.offsets, self.offsets[-1] + np.cumsum(lengths)))
+        self.row_ids.extend(row_ids)
+
+    @classmethod
+    def from_json(cls, data_frame_json):
+        return cls(json.loads(data_frame_json))
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def rows_with(self, word):
+        """Return the numbers of the rows that contain word, in order."""
+        # The match runs to the end of the row, so every row matches at most once
+        matches = re.finditer(re.escape(word) + ".*", self.text)
+        positions = np.fromiter((match.start() for match in matches), dtype=np.int64)
+        return np.searchsorted(self.offsets, positions, side="right") - 1
+
+    def search(self, query):
+        """
+        Return the ids of the rows that contain every word of query.
+
+        Args:
+            query: list of words or a string, split on whitespace
+        """
+        words = [query] if isinstance(query, str) else query
+        words = sorted({word.lower() for text in words for word in str(text).split()}, key=len, reverse=True)
+        if not words:
+            return list(self.row_ids)
+
+        # The longest word usually has the fewest matches
+        rows = self.rows_with(words[0])
+        for word in words[1:]:
+            if len(rows) == 0:
+                break
+            rows = np.intersect1d(rows, self.rows_with(word), assume_unique=True)
+        return [self.row_ids[row] for row in rows]
+
+
+def index_table(table_id, data_frame_json):
+    """
+    Build the SearchIndex of a table, replacing the index of an earlier table with the same id.
+
+    The index is skipped when memory is critical, the table then searches in the browser.
+    """
+    if get_governor().state() == CRITICAL:
+        _indexes.pop(table_id, None)
+        logger.debug(f"Not indexing table {table_id}, memory is critical")
+        return None
+    index = SearchIndex.from_json(data_frame_json)
+    _indexes[table_id] = index
+    return index
+
+
+def extend_index(table_id, data_frame_json):
+    """Add rows to the SearchIndex of a table, if it has one."""
+    index = _indexes.get(table_id)
+    if index is None:
+        return None
+    if get_governor().state() == CRITICAL:
+        # An index without the new rows would hide them from the search
+        del _indexes[table_id]
+        logger.debug(f"Dropped the index of table {table_id}, memory is critical")
+        return None
+    index.extend(json.loads(data_frame_json))
+    return index
+
+
+def search(table_id, query):
+    """
+    Return the ids of the rows of the table that match query, None when the table is not indexed.
+
+    Called from the worker when the participant searches in a consent table.
+    """
+    index = _indexes.get(table_id)
+    if index is None:
+        return None
+    return index.search(query)
+
+
+def index_page(page, page_dict):
+    """
+    Replace the indexes with those of the searchable consent tables of a page that is rendered.
+
+    Args:
+        page: the page, e.g. a PropsUIPageDataSubmission
+        page_dict: page.toDict(), the tables are indexed from the JSON sent to the browser
+    """
+    clear()
+    body = getattr(page, "body", None)
+    if body is None:
+        return
+    items = body if isinstance(body, list) else [body]
+    for item, item_dict in zip(items, page_dict["body"]):
+        # A consent form holds tables, a table can also be part of the page by itself
+        tables = getattr(item, "tables", None)
+        pairs = zip(tables, item_dict["tables"]) if tables is not None else [(item, item_dict)]
+        for table, table_dict in pairs:
+            if getattr(table, "searchable", False):
+                index_table(table.id, table_dict["data_frame"])
+
+
+def clear():
+    """Drop all indexes."""
+    _indexes.clear()
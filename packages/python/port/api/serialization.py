@@ -0,0 +1,69 @@
+"""
+JSON serialization of commands.
+
+Commands reach the browser as the dicts of their toDict methods, which
+the worker converts to JavaScript objects with toJs. That conversion
+walks the dict through a proxy per node and is slow on large pages. The
+worker can instead ask for a single JSON string and parse it with
+JSON.parse, which runs natively on both sides.
+
+Values that are JSON text already, like the data_frame of a consent
+table, are marked as RawJSON by toDict. They stay strings in the dict,
+but to_json embeds them as JSON values instead of encoding (and later
+parsing) them a second time.
+
+Binary values, like the data of a CommandSystemDonate in the Arrow
+format, are written as base64 text, which the worker decodes.
+"""
+
+import base64
+import json
+import os
+
+# Placeholder for raw values, random so that it does not occur in the text of a page
+_PLACEHOLDER = f"\x00raw-{os.urandom(8).hex()}-"
+_ENCODED_PLACEHOLDER = '"' + json.dumps(_PLACEHOLDER)[1:-1]
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), check_circular=False)
+
+
+class RawJSON(str):
+    """Text that is valid JSON and is embedded as is by to_json"""
+
+    __slots__ = ()
+
+
+def _replace_raw(value, raw):
+    if isinstance(value, RawJSON):
+        raw.append(value)
+        return f"{_PLACEHOLDER}{len(raw) - 1}"
+    if isinstance(value, dict):
+        return {key: _replace_raw(item, raw) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_replace_raw(item, raw) for item in value]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode("ascii")
+    return value
+
+
+def to_json(value):
+    """
+    Return value, a command or a dict from toDict, as a compact JSON string.
+
+    RawJSON strings are written as the JSON values they contain.
+    """
+    if hasattr(value, "toDict"):
+        value = value.toDict()
+    raw = []
+    text = _encoder.encode(_replace_raw(value, raw))
+    if not raw:
+        return text
+
+    parts = text.split(_ENCODED_PLACEHOLDER)
+    result = [parts[0]]
+    for part in parts[1:]:
+        # part starts with the number of the raw value, followed by the closing quote
+        number, rest = part.split('"', 1)
+        result.append(raw[int(number)])
+        result.append(rest)
+    return "".join(result)
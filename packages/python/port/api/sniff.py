@@ -0,0 +1,208 @@
+"""
+Classification of uploaded files from a few of their bytes.
+
+Participants regularly pick the wrong file: the HTML page of a download,
+a single JSON file out of an export, or an export that was not fully
+downloaded. sniff tells these apart with two small reads, the head and
+the tail of the file, before anything tries to parse it:
+
+- zip: a local header at the start or an end of central directory record
+  at the end; a zip without a complete end record is truncated
+- tar: a ustar header, or a bzip2 or xz stream (a compressed tarball);
+  the size of a plain tarball is a multiple of 512 bytes
+- gzip: a gzip header, a compressed tarball if the start of the
+  decompressed data is a tar header
+- json, html and csv: UTF-8 text, told apart by its first characters; a
+  JSON document that does not end with } or ] is truncated
+
+Files that look like one of these but are damaged are corrupted, files
+that look like none of them are unknown. Only zip, tar and gzip files
+are opened by NestedArchiveReader.
+
+Example:
+    sniffed = sniff(file)
+    if sniffed.kind == CORRUPTED:
+        ...
+"""
+
+import csv
+import struct
+import zlib
+from dataclasses import dataclass
+
+ZIP = "zip"
+TAR = "tar"
+GZIP = "gzip"
+JSON = "json"
+HTML = "html"
+CSV = "csv"
+CORRUPTED = "corrupted"
+UNKNOWN = "unknown"
+
+ARCHIVE_KINDS = (ZIP, TAR, GZIP)
+
+HEAD_SIZE = 4096
+# The end of central directory record with the longest comment
+TAIL_SIZE = 22 + 65535
+
+_END_RECORD = struct.Struct("<4s4H2LH")
+_END_RECORD_SIGNATURE = b"PK\x05\x06"
+_ZIP_SIGNATURES = (b"PK\x03\x04", _END_RECORD_SIGNATURE)
+_GZIP_SIGNATURE = b"\x1f\x8b"
+_COMPRESSED_TAR_SIGNATURES = (b"BZh", b"\xfd7zXZ\x00")
+_TAR_BLOCK = 512
+_BOM = b"\xef\xbb\xbf"
+_CSV_DELIMITERS = ",;\t|"
+
+
+@dataclass
+class Sniff:
+    """The kind of a file
+
+    Attributes:
+        kind: ZIP, TAR, GZIP, JSON, HTML, CSV, CORRUPTED or UNKNOWN
+        size: size of the file in bytes
+        reason: why the file is corrupted or unknown, or what it looks like
+    """
+
+    kind: str
+    size: int
+    reason: str = ""
+
+    @property
+    def is_archive(self):
+        return self.kind in ARCHIVE_KINDS
+
+    def __str__(self):
+        return f"{self.kind} ({self.reason})" if self.reason else self.kind
+
+
+def _file_size(fp):
+    size = getattr(fp, "size", None)
+    if isinstance(size, int):
+        return size
+    return fp.seek(0, 2)
+
+
+def _end_record(tail, size):
+    """Return whether tail ends with a valid end of central directory record."""
+    position = tail.rfind(_END_RECORD_SIGNATURE)
+    while position >= 0:
+        if position + _END_RECORD.size <= len(tail):
+            fields = _END_RECORD.unpack_from(tail, position)
+            directory_size, directory_offset, comment_length = fields[5], fields[6], fields[7]
+            complete = position + _END_RECORD.size + comment_length == len(tail)
+            # Zip64 archives keep the offsets in a record of their own
+            in_file = directory_offset == 0xFFFFFFFF or directory_offset + directory_size <= size
+            if complete and in_file:
+                return True
+        position = tail.rfind(_END_RECORD_SIGNATURE, 0, position)
+    return False
+
+
+def _sniff_gzip(head, size):
+    if len(head) < 10 or head[2] != 8:
+        return Sniff(CORRUPTED, size, "bad gzip header")
+    try:
+        inner = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(head, _TAR_BLOCK)
+    except zlib.error:
+        return Sniff(CORRUPTED, size, "bad gzip data")
+    if inner[257:262] == b"ustar":
+        return Sniff(TAR, size, "gzip")
+    return Sniff(GZIP, size)
+
+
+def _decode_text(data, complete):
+    """Return data as text, None if it is not UTF-8 text."""
+    if b"\x00" in data:
+        return None
+    if data.startswith(_BOM):
+        data = data[len(_BOM) :]
+    # The head can end in the middle of a character
+    for cut in range(1 if complete else 4):
+        try:
+            return data[: len(data) - cut].decode("utf-8")
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def _looks_like_csv(text, complete):
+    lines = text.splitlines()
+    if not complete:
+        # The last line can be cut off
+        lines = lines[:-1]
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return False
+    try:
+        dialect = csv.Sniffer().sniff("\n".join(lines), delimiters=_CSV_DELIMITERS)
+    except csv.Error:
+        return False
+    counts = {line.count(dialect.delimiter) for line in lines}
+    return min(counts) > 0
+
+
+def _sniff_text(head, tail, size):
+    complete = len(head) == size
+    text = _decode_text(head, complete)
+    if text is None:
+        return Sniff(UNKNOWN, size, "binary data")
+    start = text.lstrip()
+    if not start:
+        return Sniff(UNKNOWN, size, "empty text")
+
+    if start[0] in "{[":
+        # The tail can start in the middle of a character
+        end = tail[-64:].decode("utf-8", "ignore").rstrip()
+        if not end.endswith(("}", "]")):
+            return Sniff(CORRUPTED, size, "JSON is truncated")
+        return Sniff(JSON, size)
+    lower = start[:1024].lower()
+    if lower.startswith(("<!doctype html", "<html")) or "<html" in lower:
+        return Sniff(HTML, size)
+    if start[0] == "<":
+        return Sniff(UNKNOWN, size, "markup")
+    if _looks_like_csv(text, complete):
+        return Sniff(CSV, size)
+    return Sniff(UNKNOWN, size, "text")
+
+
+def sniff(fp, head_size=HEAD_SIZE, tail_size=TAIL_SIZE):
+    """
+    Return the Sniff of a file, from a read of its head and a read of its tail.
+
+    The file is left at its start.
+
+    Args:
+        fp: seekable file-like object, e.g. an AsyncFileAdapter
+        head_size: number of bytes read at the start
+        tail_size: number of bytes read at the end
+    """
+    size = _file_size(fp)
+    fp.seek(0)
+    head = fp.read(min(head_size, size))
+    if size <= len(head):
+        tail = head
+    else:
+        fp.seek(max(0, size - tail_size))
+        tail = fp.read(tail_size)
+    fp.seek(0)
+
+    if size == 0:
+        return Sniff(CORRUPTED, size, "empty file")
+    # Zip files can have data before their first member, e.g. self-extracting archives
+    end_record = _end_record(tail, size)
+    if head[:4] in _ZIP_SIGNATURES or end_record:
+        if not end_record:
+            return Sniff(CORRUPTED, size, "zip file is truncated")
+        return Sniff(ZIP, size)
+    if head[:2] == _GZIP_SIGNATURE:
+        return _sniff_gzip(head, size)
+    if head.startswith(_COMPRESSED_TAR_SIGNATURES):
+        return Sniff(TAR, size, "compressed")
+    if head[257:262] == b"ustar":
+        if size % _TAR_BLOCK:
+            return Sniff(CORRUPTED, size, "tar file is truncated")
+        return Sniff(TAR, size)
+    return _sniff_text(head, tail, size)
@@ -0,0 +1,151 @@
+"""
+Spill storage for data that does not fit in the heap.
+
+Sealed chunks of a ColumnStore can be paged out to a spill storage and
+are read back one at a time when the store is scanned, so extraction
+results larger than the heap can be kept and aggregated. The rows shown
+in a consent table, and donated from it, are still held in the heap, see
+port.api.column_store.
+
+A spill storage is a single file that data is appended to: append returns
+the offset of the data, read returns it again and release tells the
+storage that the data is no longer needed. The file is truncated to the
+end of the last data that is still in use, so it is empty again once all
+ColumnStores that spilled to it are closed. In the browser the worker opens a
+file in the Origin Private File System with a synchronous access handle
+and exposes it as self.spillStorage; the data then lives outside the
+wasm heap. Under CPython, and in browsers without OPFS, a temporary file
+is used (which under Pyodide lives in the in-memory file system).
+"""
+
+import logging
+import sys
+import tempfile
+from abc import ABC, abstractmethod
+
+from port.api.file_utils import take_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class _SpillStorage(ABC):
+    """
+    Bookkeeping of the data in a spill storage.
+
+    Attributes:
+        size: size of the storage in bytes
+    """
+
+    def __init__(self):
+        self.size = 0
+        # Length of the data at every offset that is still in use
+        self._regions = {}
+
+    def _added(self, offset, length):
+        self._regions[offset] = length
+        self.size = max(self.size, offset + length)
+
+    def release(self, offset, length):
+        """Mark the data at offset as no longer needed, truncating the storage after the data still in use."""
+        if self._regions.get(offset) != length:
+            return
+        del self._regions[offset]
+        end = max((start + size for start, size in self._regions.items()), default=0)
+        if end < self.size:
+            self.size = end
+            self._truncate(end)
+
+    @abstractmethod
+    def _truncate(self, size):
+        pass
+
+
+class FileSpillStorage(_SpillStorage):
+    """
+    Spill storage in a local file.
+
+    Args:
+        path: file to use, a temporary file that is removed on close by default
+    """
+
+    def __init__(self, path=None):
+        super().__init__()
+        self._file = tempfile.TemporaryFile() if path is None else open(path, "w+b")
+
+    def append(self, data):
+        """Write data at the end of the storage and return its offset."""
+        offset = self.size
+        self._file.seek(offset)
+        self._file.write(data)
+        self._added(offset, len(data))
+        return offset
+
+    def read(self, offset, length):
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def _truncate(self, size):
+        # Stores can be released after the storage is closed
+        if not self._file.closed:
+            self._file.truncate(size)
+
+    def close(self):
+        self._file.close()
+
+
+class BrowserSpillStorage(_SpillStorage):
+    """
+    Spill storage in the Origin Private File System of the browser.
+
+    Args:
+        js_storage: the spillStorage object of the worker, with append(Uint8Array), read(offset, length)
+            and truncate(size)
+    """
+
+    def __init__(self, js_storage):
+        super().__init__()
+        self.js_storage = js_storage
+
+    def append(self, data):
+        from pyodide.ffi import to_js
+
+        # Copied into a Uint8Array on the JavaScript heap
+        offset = self.js_storage.append(to_js(data))
+        self._added(offset, len(data))
+        return offset
+
+    def read(self, offset, length):
+        return take_bytes(self.js_storage.read(offset, length))
+
+    def _truncate(self, size):
+        self.js_storage.truncate(size)
+
+    def close(self):
+        pass
+
+
+_storage = None
+
+
+def get_storage():
+    """Return the spill storage shared by all of port, created on first use."""
+    global _storage
+    if _storage is None:
+        js_storage = None
+        if sys.platform == "emscripten":
+            import js
+
+            js_storage = getattr(js, "spillStorage", None)
+        if js_storage is not None:
+            _storage = BrowserSpillStorage(js_storage)
+        else:
+            if sys.platform == "emscripten":
+                logger.warning("No spill storage in this browser, spilled data stays in memory")
+            _storage = FileSpillStorage()
+    return _storage
+
+
+def set_storage(storage):
+    """Replace the shared spill storage, e.g. with a FileSpillStorage in a given directory in tests."""
+    global _storage
+    _storage = storage
@@ -0,0 +1,410 @@
+"""
+Truncation strategies for consent tables.
+
+A consent table shows at most ``data_frame_max_size`` rows. Which rows are
+kept is decided by a truncation strategy. Every strategy can be used in two
+ways:
+
+- ``strategy.truncate(data_frame, max_size)`` selects rows from a frame
+  that already exists (this is what PropsUIPromptConsentFormTable does)
+- ``strategy.collector(max_size, columns)`` returns a RowCollector that
+  selects rows while they are produced, so the full dataset never has to
+  be materialized just to show a preview
+
+Example:
+    collector = ReservoirSample(seed=42).collector(1000, columns=["time", "title"])
+    for record in records:
+        collector.add((record["time"], record["title"]))
+    data_frame = collector.to_data_frame()
+"""
+
+import heapq
+import math
+import random
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+
+class RowCollector(ABC):
+    """Streaming selection of at most max_size rows
+
+    Rows can be tuples (matching the columns) or dicts.
+
+    Attributes:
+        max_size: maximum number of rows to keep
+        columns: column names of the rows, used by to_data_frame
+        seen: number of rows offered so far
+    """
+
+    def __init__(self, max_size, columns=None):
+        self.max_size = max(1, max_size)
+        self.columns = columns
+        self.seen = 0
+
+    @abstractmethod
+    def add(self, row):
+        pass
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+
+    @abstractmethod
+    def rows(self):
+        """Return the selected rows in display order."""
+
+    def __len__(self):
+        return min(self.seen, self.max_size)
+
+    def to_data_frame(self, columns=None):
+        return pd.DataFrame(self.rows(), columns=columns or self.columns)
+
+
+class TruncationStrategy(ABC):
+    """Decides which rows of a too large table are shown to the participant"""
+
+    @abstractmethod
+    def truncate(self, data_frame, max_size):
+        """Return at most max_size rows of data_frame with a fresh index."""
+
+    @abstractmethod
+    def collector(self, max_size, columns=None):
+        """Return a RowCollector that applies this strategy to a stream of rows."""
+
+
+class Head(TruncationStrategy):
+    """Keep the first rows (the default)"""
+
+    def truncate(self, data_frame, max_size):
+        if len(data_frame) <= max_size:
+            return data_frame
+        return data_frame.head(max_size).reset_index(drop=True)
+
+    def collector(self, max_size, columns=None):
+        return _HeadCollector(max_size, columns)
+
+
+class NewestFirst(TruncationStrategy):
+    """Keep the newest rows, newest first
+
+    Attributes:
+        time_column: column to order by, if None rows are assumed to be in chronological order
+    """
+
+    def __init__(self, time_column=None):
+        self.time_column = time_column
+
+    def truncate(self, data_frame, max_size):
+        if self.time_column is None:
+            positions = np.arange(len(data_frame) - 1, max(-1, len(data_frame) - 1 - max_size), -1)
+        else:
+            order = data_frame[self.time_column].argsort(kind="stable").to_numpy()
+            positions = order[::-1][:max_size]
+        return data_frame.iloc[positions].reset_index(drop=True)
+
+    def collector(self, max_size, columns=None):
+        if self.time_column is None:
+            return _TailCollector(max_size, columns)
+        return _NewestCollector(max_size, columns, _row_key(self.time_column, columns))
+
+
+class ReservoirSample(TruncationStrategy):
+    """Keep a uniform random sample of the rows, in their original order
+
+    Attributes:
+        seed: seed for the random generator, for reproducible samples
+    """
+
+    def __init__(self, seed=None):
+        self.seed = seed
+
+    def truncate(self, data_frame, max_size):
+        if len(data_frame) <= max_size:
+            return data_frame
+        rng = np.random.default_rng(self.seed)
+        positions = np.sort(rng.choice(len(data_frame), size=max_size, replace=False))
+        return data_frame.iloc[positions].reset_index(drop=True)
+
+    def collector(self, max_size, columns=None):
+        return _ReservoirCollector(max_size, columns, random.Random(self.seed))
+
+
+class TimeStratifiedSample(TruncationStrategy):
+    """Keep a random sample that covers every time bucket proportionally
+
+    Rows are grouped into buckets (days by default) and every bucket
+    contributes rows in proportion to its size, so short bursts of activity
+    do not crowd out the rest of the timeline.
+
+    Attributes:
+        time_column: column holding the timestamps
+        freq: pandas frequency string of the buckets, e.g. "D", "W" or "h"
+        bucket: optional function mapping a timestamp value to its bucket, used by the collector
+        seed: seed for the random generator, for reproducible samples
+    """
+
+    def __init__(self, time_column, freq="D", bucket=None, seed=None):
+        self.time_column = time_column
+        self.freq = freq
+        self.bucket = bucket
+        self.seed = seed
+
+    def truncate(self, data_frame, max_size):
+        if len(data_frame) <= max_size:
+            return data_frame
+        times = pd.to_datetime(data_frame[self.time_column], utc=True, errors="coerce")
+        codes, _ = pd.factorize(times.dt.floor(self.freq), use_na_sentinel=False)
+        quota = _allocate(np.bincount(codes), max_size)
+
+        rng = np.random.default_rng(self.seed)
+        shuffled = rng.permutation(len(data_frame))
+        shuffled_codes = codes[shuffled]
+        rank = pd.Series(shuffled_codes).groupby(shuffled_codes).cumcount().to_numpy()
+        positions = np.sort(shuffled[rank < quota[shuffled_codes]])
+        return data_frame.iloc[positions].reset_index(drop=True)
+
+    def collector(self, max_size, columns=None):
+        bucket = self.bucket or (lambda value: _floor(value, self.freq))
+        return _StratifiedCollector(
+            max_size,
+            columns,
+            _row_key(self.time_column, columns),
+            bucket,
+            random.Random(self.seed),
+        )
+
+
+class _HeadCollector(RowCollector):
+    def __init__(self, max_size, columns):
+        super().__init__(max_size, columns)
+        self._rows = []
+
+    def add(self, row):
+        self.seen += 1
+        if len(self._rows) < self.max_size:
+            self._rows.append(row)
+
+    def rows(self):
+        return list(self._rows)
+
+
+class _TailCollector(RowCollector):
+    def __init__(self, max_size, columns):
+        super().__init__(max_size, columns)
+        self._rows = deque(maxlen=self.max_size)
+
+    def add(self, row):
+        self.seen += 1
+        self._rows.append(row)
+
+    def rows(self):
+        return list(reversed(self._rows))
+
+
+class _NewestCollector(RowCollector):
+    def __init__(self, max_size, columns, key):
+        super().__init__(max_size, columns)
+        self._key = key
+        self._heap = []
+
+    def add(self, row):
+        # the sequence number keeps ties stable and avoids comparing rows
+        item = (self._key(row), self.seen, row)
+        self.seen += 1
+        if len(self._heap) < self.max_size:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def rows(self):
+        return [row for _, _, row in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
+
+
+class _ReservoirCollector(RowCollector):
+    """Reservoir sampling with Li's algorithm L, which skips over rows
+    instead of drawing a random number for every one of them."""
+
+    def __init__(self, max_size, columns, rng):
+        super().__init__(max_size, columns)
+        self._rng = rng
+        self._items = []
+        self._weight = 1.0
+        self._next = None
+
+    def add(self, row):
+        index = self.seen
+        self.seen += 1
+        if index < self.max_size:
+            self._items.append((index, row))
+            if self.seen == self.max_size:
+                self._schedule(index)
+        elif index == self._next:
+            self._items[self._rng.randrange(self.max_size)] = (index, row)
+            self._schedule(index)
+
+    def _schedule(self, index):
+        self._weight *= math.exp(math.log(self._random()) / self.max_size)
+        skip = 0
+        if self._weight < 1:
+            skip = math.floor(math.log(self._random()) / math.log1p(-self._weight))
+        self._next = index + skip + 1
+
+    def _random(self):
+        # random() can return 0.0, which has no logarithm
+        return self._rng.random() or 1e-300
+
+    def rows(self):
+        return [row for _, row in sorted(self._items, key=lambda item: item[0])]
+
+
+class _StratifiedCollector(RowCollector):
+    """One uniform reservoir per time bucket. Reservoirs shrink as more buckets
+    appear, and when there are more than twice max_size buckets they are merged
+    into longer periods (see _PERIODS), so at most twice max_size rows are held
+    at any time."""
+
+    def __init__(self, max_size, columns, key, bucket, rng):
+        super().__init__(max_size, columns)
+        self._key = key
+        self._bucket = bucket
+        self._rng = rng
+        self._capacity = self.max_size
+        self._buckets = {}
+        self._held = 0
+        # Number of times the buckets were merged into longer periods
+        self._level = 0
+
+    def add(self, row):
+        index = self.seen
+        self.seen += 1
+        bucket = _coarsen(self._bucket(self._key(row)), self._level)
+        state = self._buckets.get(bucket)
+        if state is None:
+            state = self._buckets[bucket] = [0, []]
+        state[0] += 1
+        items = state[1]
+        # Only a reservoir that holds every row of its bucket can grow, merged reservoirs cannot
+        if len(items) == state[0] - 1 and len(items) < self._capacity:
+            items.append((index, row))
+            self._held += 1
+            if self._held > 2 * self.max_size:
+                self._shrink()
+        else:
+            slot = self._rng.randrange(state[0])
+            if slot < len(items):
+                items[slot] = (index, row)
+
+    def _shrink(self):
+        while len(self._buckets) > 2 * self.max_size:
+            self._merge()
+        self._capacity = max(1, math.ceil(2 * self.max_size / len(self._buckets)) // 2)
+        self._held = 0
+        for state in self._buckets.values():
+            items = state[1]
+            if len(items) > self._capacity:
+                # a random subset of a uniform sample is still a uniform sample
+                self._rng.shuffle(items)
+                del items[self._capacity:]
+            self._held += len(items)
+
+    def _merge(self):
+        """Merge the buckets into the next longer period."""
+        self._level += 1
+        groups = {}
+        for bucket, state in self._buckets.items():
+            groups.setdefault(_coarsen(bucket, self._level), []).append(state)
+        self._buckets = {bucket: self._combine(states) for bucket, states in groups.items()}
+
+    def _combine(self, states):
+        """Return one uniform reservoir of the rows of the reservoirs of states."""
+        if len(states) == 1:
+            return states[0]
+        remaining = [state[0] for state in states]
+        pools = [list(state[1]) for state in states]
+        # A bucket can be drawn from as often as its reservoir has rows
+        size = min([self._capacity, sum(remaining)] + [len(state[1]) for state in states if len(state[1]) < state[0]])
+        items = []
+        for _ in range(size):
+            # A uniform draw from the union comes from each bucket in proportion to its rows not drawn yet
+            slot = self._rng.randrange(sum(remaining))
+            group = 0
+            while slot >= remaining[group]:
+                slot -= remaining[group]
+                group += 1
+            remaining[group] -= 1
+            pool = pools[group]
+            items.append(pool.pop(self._rng.randrange(len(pool))))
+        return [sum(state[0] for state in states), items]
+
+    def rows(self):
+        states = list(self._buckets.values())
+        counts = np.array([state[0] for state in states])
+        caps = np.array([len(state[1]) for state in states])
+        quota = _allocate(counts, self.max_size, caps)
+        selected = []
+        for state, take in zip(states, quota):
+            items = state[1]
+            selected.extend(items if take >= len(items) else self._rng.sample(items, int(take)))
+        return [row for _, row in sorted(selected, key=lambda item: item[0])]
+
+
+def _allocate(counts, max_size, caps=None):
+    """Divide max_size over groups in proportion to counts (largest remainder method),
+    giving no group more than its cap."""
+    caps = counts if caps is None else np.minimum(counts, caps)
+    total = counts.sum()
+    if total == 0:
+        return np.zeros(len(counts), dtype=np.int64)
+    budget = min(max_size, int(caps.sum()))
+    exact = counts * (budget / total)
+    quota = np.minimum(np.floor(exact).astype(np.int64), caps)
+    remainder = exact - quota
+    while quota.sum() < budget:
+        open_groups = quota < caps
+        order = np.argsort(-np.where(open_groups, remainder, -np.inf), kind="stable")
+        for group in order[: budget - quota.sum()]:
+            if not open_groups[group]:
+                break
+            quota[group] += 1
+        remainder = np.where(quota < caps, remainder, -np.inf)
+    return quota
+
+
+def _row_key(column, columns):
+    if columns is not None and column in columns:
+        position = list(columns).index(column)
+        return lambda row: row[column] if isinstance(row, dict) else row[position]
+    return lambda row: row[column]
+
+
+# Periods that the buckets of a _StratifiedCollector are merged into, before all rows share one bucket.
+# Each period nests in the next, so merged buckets keep the rows of exactly one period
+_PERIODS = ("D", "M", "Q", "Y")
+
+
+def _coarsen(bucket, level):
+    """Return the bucket that bucket is merged into after level merges."""
+    if level == 0:
+        return bucket
+    if level > len(_PERIODS):
+        return None
+    try:
+        timestamp = pd.Timestamp(bucket)
+    except (TypeError, ValueError):
+        return bucket
+    if timestamp is pd.NaT:
+        return bucket
+    return timestamp.tz_localize(None).to_period(_PERIODS[level - 1]).start_time
+
+
+def _floor(value, freq):
+    if freq == "D" and isinstance(value, (datetime, date)):
+        return value.date() if isinstance(value, datetime) else value
+    try:
+        return pd.Timestamp(value).floor(freq)
+    except (TypeError, ValueError):
+        return None
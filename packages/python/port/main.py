@@ -1,41 +1,157 @@
+import gc
 import logging
 from collections import deque
 from collections.abc import Generator
+import port.api.props as props
+import port.api.search as search
 from port.script import process
-from port.api.commands import CommandSystemExit
-from port.api.file_utils import AsyncFileAdapter
+from port.api.commands import CommandSystemDonate, CommandSystemExit, CommandUIRender
+from port.api.file_utils import AsyncFileAdapter, proxy_stats
 from port.api.logging import LogForwardingHandler
+from port.api.memory import OK, get_governor
+from port.api.serialization import to_json
+
+logger = logging.getLogger(__name__)
 
 
 class ScriptWrapper(Generator):
-    def __init__(self, script):
+    def __init__(self, script, governor=None):
         self.script = script
         self.queue = deque()
+        self.governor = governor or get_governor()
+        self.memory_warning_shown = False
+        self.awaiting_memory_warning = False
+        self.log_handlers = []
 
     def add_log_handler(self, logger_name="port.script"):
         """Attach a handler to the named logger that forwards log records as CommandSystemLog commands."""
         logger = logging.getLogger(logger_name)
         logger.setLevel(logging.DEBUG)
-        logger.addHandler(LogForwardingHandler(self.queue))
+        handler = LogForwardingHandler(self.queue)
+        logger.addHandler(handler)
+        self.log_handlers.append((logger, handler))
+        return handler
+
+    def remove_log_handlers(self):
+        """Detach the handlers attached with add_log_handler, e.g. when running many sessions in one process."""
+        for logger, handler in self.log_handlers:
+            logger.removeHandler(handler)
+        self.log_handlers = []
 
     def send(self, data):
+        if self.awaiting_memory_warning:
+            self.awaiting_memory_warning = False
+            if data and getattr(data, '__type__') == "PayloadFalse":
+                self.queue.clear()
+                self.script.close()
+                return CommandSystemExit(0, "Stopped after memory warning").toDict()
+
         if not self.queue:
-            if data and getattr(data, '__type__') == "PayloadFile":
+            if data and getattr(data, '__type__') == "PayloadFile" and not isinstance(data.value, AsyncFileAdapter):
                 data.value = AsyncFileAdapter(data.value)
             try:
                 command = self.script.send(data)
             except StopIteration:
-                return CommandSystemExit(0, "End of script").toDict()
-            self.queue.append(command.toDict())
+                # Queued before the exit command, the worker stops asking for commands after it
+                logger.debug(f"End of script, {proxy_stats}")
+                command = CommandSystemExit(0, "End of script")
+            except MemoryError:
+                # The script cannot be resumed, the next send ends the session
+                gc.collect()
+                logger.error(f"Script ran out of memory, {self.governor}")
+                return render_memory_page(MEMORY_ERROR_TEXT).toDict()
+
+            # The warning replaces the page on screen, so it waits for the next page: appends to the
+            # streaming tables of a consent page would otherwise go nowhere and the page would never be submitted
+            is_page = isinstance(command, CommandUIRender)
+            if is_page and not self.memory_warning_shown and self.governor.state() != OK:
+                # Logged before the command is queued: only the answer to the last command in the queue reaches the script
+                logger.warning(f"Memory is running low, {self.governor}")
+                self.memory_warning_shown = True
+                self.awaiting_memory_warning = True
+                self.queue.appendleft(render_memory_page(MEMORY_WARNING_TEXT).toDict())
+            command_dict = command.toDict()
+            if isinstance(command, CommandUIRender):
+                # Only the tables of the page on screen can be searched
+                search.index_page(command.page, command_dict["page"])
+            elif isinstance(command, CommandSystemDonate):
+                search.clear()
+            self.queue.append(command_dict)
 
         return self.queue.popleft()
 
+    def send_json(self, data):
+        """Like send, but returns the command as a JSON string for JSON.parse in the worker."""
+        return to_json(self.send(data))
+
     def throw(self, type=None, value=None, traceback=None):
         raise StopIteration
 
 
+MEMORY_WARNING_TEXT = {
+    "en": "Your file is very large and this browser is running low on memory. You can continue, but processing may fail. Choose stop to end without sharing data.",
+    "de": "Ihre Datei ist sehr groß und diesem Browser geht der Arbeitsspeicher aus. Sie können fortfahren, aber die Verarbeitung kann fehlschlagen. Wählen Sie Beenden, um ohne Datenweitergabe abzuschließen.",
+    "it": "Il tuo file è molto grande e questo browser sta esaurendo la memoria. Puoi continuare, ma l'elaborazione potrebbe non riuscire. Scegli Interrompi per terminare senza condividere i dati.",
+    "es": "Su archivo es muy grande y este navegador se está quedando sin memoria. Puede continuar, pero el procesamiento podría fallar. Elija Detener para finalizar sin compartir datos.",
+    "nl": "Uw bestand is erg groot en deze browser heeft bijna geen geheugen meer. U kunt doorgaan, maar de verwerking kan mislukken. Kies Stoppen om te eindigen zonder gegevens te delen.",
+    "ro": "Fișierul dvs. este foarte mare, iar acest browser rămâne fără memorie. Puteți continua, dar procesarea poate eșua. Alegeți Opriți pentru a încheia fără a partaja date.",
+    "lt": "Jūsų failas labai didelis, o šiai naršyklei trūksta atminties. Galite tęsti, tačiau apdorojimas gali nepavykti. Pasirinkite Sustabdyti, kad baigtumėte nebendrindami duomenų.",
+}
+
+MEMORY_ERROR_TEXT = {
+    "en": "Unfortunately your file is too large to be processed in this browser.",
+    "de": "Leider ist Ihre Datei zu groß, um in diesem Browser verarbeitet zu werden.",
+    "it": "Purtroppo il tuo file è troppo grande per essere elaborato in questo browser.",
+    "es": "Lamentablemente, su archivo es demasiado grande para procesarlo en este navegador.",
+    "nl": "Helaas is uw bestand te groot om in deze browser te verwerken.",
+    "ro": "Din păcate, fișierul dvs. este prea mare pentru a fi procesat în acest browser.",
+    "lt": "Deja, jūsų failas per didelis, kad būtų apdorotas šioje naršyklėje.",
+}
+
+
+def render_memory_page(text):
+    header = props.PropsUIHeader(
+        props.Translatable(
+            {
+                "en": "Not enough memory",
+                "de": "Nicht genügend Arbeitsspeicher",
+                "it": "Memoria insufficiente",
+                "es": "Memoria insuficiente",
+                "nl": "Onvoldoende geheugen",
+                "ro": "Memorie insuficientă",
+                "lt": "Nepakanka atminties",
+            }
+        )
+    )
+    ok = props.Translatable(
+        {
+            "en": "Continue",
+            "de": "Weiter",
+            "it": "Continua",
+            "es": "Continuar",
+            "nl": "Verder",
+            "ro": "Continuați",
+            "lt": "Tęsti",
+        }
+    )
+    cancel = props.Translatable(
+        {
+            "en": "Stop",
+            "de": "Beenden",
+            "it": "Interrompi",
+            "es": "Detener",
+            "nl": "Stoppen",
+            "ro": "Opriți",
+            "lt": "Sustabdyti",
+        }
+    )
+    body = props.PropsUIPromptConfirm(props.Translatable(text), ok, cancel)
+    return CommandUIRender(props.PropsUIPageDataSubmission("Memory", header, [body]))
+
+
 def start(sessionId):
     script = process(sessionId)
     wrapper = ScriptWrapper(script)
     wrapper.add_log_handler()
+    wrapper.add_log_handler(__name__)
     return wrapper
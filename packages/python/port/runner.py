@@ -0,0 +1,297 @@
+"""
+Headless runner for port scripts.
+
+Runs a script under CPython against local files, without a browser. The
+ScriptedResponder answers the pages the script renders the way the
+React framework would, so a whole donation flow runs in a single
+process and the time spent in each step of the script can be measured.
+
+Usage:
+    python -m port.runner export.zip
+    python -m port.runner export.zip --respond cancel --output donations/
+    python -m port.runner export.zip --script port.script_custom_ui --budget 2147483648
+
+Answers given with --respond are used in order for the prompts that need a
+decision: "ok" or "cancel" for confirm prompts, "donate" or "decline" for
+consent pages and the value of an item for radio inputs. When they run out,
+the runner confirms, donates and picks the first item. A consent page with
+streaming tables is answered when the last rows are appended to them.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+from port.api.file_utils import MmapFileAdapter
+from port.api.memory import MemoryGovernor, get_governor, set_governor
+from port.main import ScriptWrapper
+
+MAX_STEPS = 100000
+
+
+class Payload:
+    """Response to a command, like the payloads sent by the React framework"""
+
+    __slots__ = "__type__", "value"
+
+    def __init__(self, type, value=None):
+        self.__type__ = type
+        self.value = value
+
+    def __repr__(self):
+        return f"Payload({self.__type__})"
+
+
+@dataclass
+class Step:
+    """A command returned by the script and the time it took to produce it"""
+
+    command: str
+    seconds: float
+    prompt: Optional[str] = None
+
+
+@dataclass
+class RunResult:
+    """Outcome of a headless run"""
+
+    steps: list[Step] = field(default_factory=list)
+    # JSON text, or the bytes of an Arrow IPC stream
+    donations: dict[str, Union[str, bytes]] = field(default_factory=dict)
+    logs: list[tuple[str, str]] = field(default_factory=list)
+    exit_code: Optional[int] = None
+    exit_info: Optional[str] = None
+    seconds: float = 0.0
+    peak_memory: Optional[int] = None
+
+    def seconds_per_command(self):
+        totals = defaultdict(float)
+        for step in self.steps:
+            totals[step.prompt or step.command] += step.seconds
+        return dict(totals)
+
+
+def page_prompts(page):
+    """Return the body items of a rendered page."""
+    body = page.get("body", [])
+    return body if isinstance(body, list) else [body]
+
+
+def consent_payload(prompts):
+    """Return the PayloadJSON value the consent tables send when no rows are deleted."""
+    data = {}
+    for prompt in prompts:
+        if prompt["__type__"] == "PropsUIPromptConsentFormTable":
+            data[prompt["id"]] = {"deleted": [], "metadata": {"deletedRowCount": 0}}
+    return json.dumps(data)
+
+
+class ScriptedResponder:
+    """
+    Answers commands the way the participant and the React framework would.
+
+    Args:
+        files: paths of the files to select in file prompts, in order
+        responses: answers to prompts that need a decision, in order
+    """
+
+    def __init__(self, files=(), responses=()):
+        self.files = list(files)
+        self.responses = list(responses)
+        self.opened = []
+        self.result = RunResult()
+        # Consent page with streaming tables and the ids of the tables that are still open
+        self.streaming_prompts = None
+        self.open_tables = set()
+
+    def _next_response(self, default):
+        return self.responses.pop(0) if self.responses else default
+
+    def respond(self, command):
+        """Return the payload for command, None when the script has exited."""
+        kind = command["__type__"]
+        if kind == "CommandSystemExit":
+            self.result.exit_code = command["code"]
+            self.result.exit_info = command["info"]
+            return None
+        if kind == "CommandSystemDonate":
+            self.result.donations[command["key"]] = command["json_string"] if "json_string" in command else command["data"]
+            return Payload("PayloadVoid")
+        if kind == "CommandSystemLog":
+            self.result.logs.append((command["level"], command["message"]))
+            return Payload("PayloadVoid")
+        if kind == "CommandUIRender":
+            return self.render(command["page"])
+        if kind == "CommandUIAppend":
+            return self.append(command)
+        raise ValueError(f"Unknown command: {kind}")
+
+    def append(self, command):
+        if command["done"]:
+            self.open_tables.discard(command["table_id"])
+            if not self.open_tables and self.streaming_prompts is not None:
+                prompts, self.streaming_prompts = self.streaming_prompts, None
+                return self.consent(prompts)
+        return Payload("PayloadVoid")
+
+    def render(self, page):
+        self.streaming_prompts = None
+        self.open_tables = set()
+        if page["__type__"] != "PropsUIPageDataSubmission":
+            # The end page does not resolve
+            return None
+
+        prompts = page_prompts(page)
+        kinds = [prompt["__type__"] for prompt in prompts]
+        if "PropsUIPromptFileInput" in kinds:
+            if not self.files:
+                # The participant cannot continue without selecting a file
+                self.result.exit_info = "No file left to select"
+                return None
+            file = MmapFileAdapter(self.files.pop(0))
+            self.opened.append(file)
+            return Payload("PayloadFile", file)
+        if "PropsUIPromptConfirm" in kinds:
+            response = self._next_response("ok")
+            if response not in ("ok", "cancel"):
+                raise ValueError(f"Expected ok or cancel for a confirm prompt, got {response}")
+            return Payload("PayloadTrue", True) if response == "ok" else Payload("PayloadFalse", False)
+        if "PropsUIPromptRadioInput" in kinds:
+            items = prompts[kinds.index("PropsUIPromptRadioInput")]["items"]
+            response = self._next_response(items[0]["value"])
+            if response not in [item["value"] for item in items]:
+                raise ValueError(f"Expected one of the radio items, got {response}")
+            return Payload("PayloadString", response)
+        if "PropsUIDataSubmissionButtons" in kinds or "PropsUIPromptConsentForm" in kinds:
+            streaming = {prompt["id"] for prompt in prompts if prompt.get("streaming")}
+            if streaming:
+                # The page is shown right away, it is submitted when the tables are complete
+                self.streaming_prompts = prompts
+                self.open_tables = streaming
+                return Payload("PayloadVoid")
+            return self.consent(prompts)
+        # Progress prompts and plain pages resolve immediately
+        return Payload("PayloadTrue", True)
+
+    def consent(self, prompts):
+        response = self._next_response("donate")
+        if response not in ("donate", "decline"):
+            raise ValueError(f"Expected donate or decline for a consent page, got {response}")
+        if response == "decline":
+            return Payload("PayloadFalse", False)
+        return Payload("PayloadJSON", consent_payload(prompts))
+
+
+def prompt_name(command):
+    if command["__type__"] != "CommandUIRender":
+        return None
+    kinds = [prompt["__type__"] for prompt in page_prompts(command["page"])]
+    interactive = [kind for kind in kinds if kind not in ("PropsUIPromptText", "PropsUIPromptConsentFormTable")]
+    return (interactive or kinds or [command["page"]["__type__"]])[0]
+
+
+def drive(wrapper, responder, max_steps=MAX_STEPS):
+    """
+    Answer the commands of wrapper with responder until the script exits.
+
+    Returns the RunResult of responder.
+    """
+    result = responder.result
+    started = time.perf_counter()
+    payload = None
+    try:
+        for _ in range(max_steps):
+            step_started = time.perf_counter()
+            command = wrapper.send(payload)
+            result.steps.append(Step(command["__type__"], time.perf_counter() - step_started, prompt_name(command)))
+            payload = responder.respond(command)
+            if payload is None:
+                break
+        else:
+            raise RuntimeError(f"Script did not finish within {max_steps} steps")
+    finally:
+        result.seconds = time.perf_counter() - started
+        for file in responder.opened:
+            file.close()
+    return result
+
+
+def run(process, files=(), responses=(), session_id="headless", max_steps=MAX_STEPS):
+    """
+    Run a script headless and return a RunResult.
+
+    Args:
+        process: generator function of the script, like port.script.process
+        files: paths of the files to select in file prompts
+        responses: answers to prompts that need a decision
+        session_id: session id passed to the script
+        max_steps: number of commands after which the run is aborted
+    """
+    wrapper = ScriptWrapper(process(session_id))
+    for name in dict.fromkeys(["port.main", "port.script", process.__module__]):
+        wrapper.add_log_handler(name)
+
+    governor = get_governor()
+    try:
+        result = drive(wrapper, ScriptedResponder(files, responses), max_steps)
+    finally:
+        wrapper.remove_log_handlers()
+    if governor.budget is not None:
+        result.peak_memory = governor.peak
+    return result
+
+
+def format_report(result):
+    """Return a timing report of a run."""
+    lines = [f"{len(result.steps)} steps in {result.seconds:.3f}s"]
+    for name, seconds in sorted(result.seconds_per_command().items(), key=lambda item: -item[1]):
+        count = sum(1 for step in result.steps if (step.prompt or step.command) == name)
+        lines.append(f"  {name:<40} {count:>6} x {seconds:>9.3f}s")
+    if result.peak_memory is not None:
+        lines.append(f"peak memory: {result.peak_memory} bytes")
+    lines.append(f"exit: {result.exit_code} {result.exit_info}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a port script headless against local files")
+    parser.add_argument("files", nargs="*", help="files to select in file prompts, in order")
+    parser.add_argument("--script", default="port.script", help="module with the process function (default: port.script)")
+    parser.add_argument("--respond", action="append", default=[], help="answers to prompts, in order (comma separated)")
+    parser.add_argument("--session-id", default="headless", help="session id passed to the script")
+    parser.add_argument("--output", help="directory to write the donations to")
+    parser.add_argument("--budget", type=int, help="memory budget in bytes, to emulate the Pyodide heap")
+    parser.add_argument("--verbose", action="store_true", help="print the logs of the script")
+    args = parser.parse_args(argv)
+
+    if args.budget:
+        set_governor(MemoryGovernor(budget=args.budget))
+
+    process = importlib.import_module(args.script).process
+    responses = [response for value in args.respond for response in value.split(",") if response]
+    result = run(process, args.files, responses, args.session_id)
+
+    if args.verbose:
+        for level, message in result.logs:
+            print(f"[{level}] {message}", file=sys.stderr)
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        for key, data in result.donations.items():
+            if isinstance(data, bytes):
+                with open(os.path.join(args.output, f"{key}.arrow"), "wb") as f:
+                    f.write(data)
+            else:
+                with open(os.path.join(args.output, f"{key}.json"), "w") as f:
+                    f.write(data)
+    print(format_report(result))
+    return 0 if result.exit_code in (None, 0) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,6 +17,10 @@
 import port.api.props as props
 from port.api.assets import *
 from port.api.commands import CommandSystemDonate, CommandSystemExit, CommandUIRender
+from port.api.memo import static
+from port.api.archives import NestedArchiveReader
+from port.api.sniff import sniff
+import port.api.consent as consent
 
 import logging
 import pandas as pd
@@ -37,47 +41,30 @@ def process(sessionId):
     logger.debug(f"{key}: start")
 
     # STEP 1: select the file
-    data = None
+    files = None
     while True:
         logger.debug(f"{key}: prompt file")
-        promptFile = prompt_file("application/zip, text/plain")
+        promptFile = prompt_file("application/zip, application/x-tar, application/gzip, application/x-gzip, .tgz, text/plain")
         fileResult = yield render_data_submission_page([promptFile])
 
         if fileResult.__type__ == "PayloadFile":
             logger.debug(f"{key}: extracting file")
-            try:
-                zipfile_ref = zipfile.ZipFile(fileResult.value)
-            except zipfile.error as e:
-                logger.error(f"{key}: error opening zipfile: {e}")
+            # Two small reads tell whether the file is an archive, other files are not parsed at all
+            sniffed = sniff(fileResult.value)
+            if not sniffed.is_archive:
+                logger.error(f"{key}: not an archive: {sniffed}")
                 zipfile_ref = "invalid"
+            else:
+                try:
+                    zipfile_ref = NestedArchiveReader(fileResult.value, sniffed=sniffed)
+                except zipfile.error as e:
+                    logger.error(f"{key}: error opening zipfile: {e}")
+                    zipfile_ref = "invalid"
 
             if zipfile_ref and zipfile_ref != "invalid":
-                # Extracting the zipfile
-                extraction_result = []
+                logger.debug(f"{key}: go to consent form")
                 files = get_files(zipfile_ref)
-                fileCount = len(files)
-                for index, filename in enumerate(files):
-                    percentage = ((index + 1) / fileCount) * 100
-                    promptMessage = prompt_extraction_message(
-                        f"Extracting file: {filename}", percentage
-                    )
-                    yield render_data_submission_page(promptMessage)
-                    file_extraction_result = extract_file(zipfile_ref, filename)
-                    extraction_result.append(file_extraction_result)
-
-                if len(extraction_result) >= 0:
-                    logger.debug(f"{key}: extraction successful, go to consent form")
-                    data = extraction_result
-                    break
-                else:
-                    logger.debug(f"{key}: prompt confirmation to retry file selection")
-                    retry_result = yield render_data_submission_page(retry_confirmation())
-                    if retry_result.__type__ == "PayloadTrue":
-                        logger.debug(f"{key}: skip due to invalid file")
-                        continue
-                    else:
-                        logger.debug(f"{key}: retry prompt file")
-                        break
+                break
             else:
                 # Invalid file, ask for retry
                 logger.debug(f"{key}: prompt confirmation to retry file selection")
@@ -91,18 +78,35 @@ def process(sessionId):
 
     # STEP 2: ask for consent
     logger.debug(f"{key}: prompt consent")
-    for prompt in prompt_consent(data):
-        result = yield prompt
-        if result.__type__ == "PayloadJSON":
-            logger.debug(f"{key}: donate consent data")
-            yield donate(f"{sessionId}-{key}", result.value)
-        if result.__type__ == "PayloadFalse":
-            value = json.dumps('{"status" : "data_submission declined"}')
-            yield donate(f"{sessionId}-{key}", value)
+    if files is None:
+        tables = consent_tables(None)
+        result = yield prompt_consent(tables)
+    else:
+        # The consent page is shown after the first file, the other files are added to the table while they are extracted
+        tables = consent_tables([], streaming=True)
+        rows = extracted_rows(zipfile_ref, files)
+        result = yield from consent.stream_table(lambda: prompt_consent(tables), tables[0], rows)
+    if result.__type__ == "PayloadJSON":
+        logger.debug(f"{key}: donate consent data")
+        yield donate(f"{sessionId}-{key}", consent.donation_data(tables, result.value))
+    if result.__type__ == "PayloadFalse":
+        value = json.dumps('{"status" : "data_submission declined"}')
+        yield donate(f"{sessionId}-{key}", value)
 
 
 def render_data_submission_page(body):
-    header = props.PropsUIHeader(
+    header = page_header()
+
+    # Convert single body item to array if needed
+    body_items = [body] if not isinstance(body, list) else body
+    page = props.PropsUIPageDataSubmission("Zip", header, body_items)
+    return CommandUIRender(page)
+
+
+# The header, file prompt and confirmation do not change, so they are built and serialized once
+@static
+def page_header():
+    return props.PropsUIHeader(
         props.Translatable(
             {
                 "en": "Data donation flow example",
@@ -116,12 +120,8 @@ def render_data_submission_page(body):
         )
     )
 
-    # Convert single body item to array if needed
-    body_items = [body] if not isinstance(body, list) else body
-    page = props.PropsUIPageDataSubmission("Zip", header, body_items)
-    return CommandUIRender(page)
-
 
+@static
 def retry_confirmation():
     text = props.Translatable(
         {
@@ -159,6 +159,7 @@ def retry_confirmation():
     return props.PropsUIPromptConfirm(text, ok, cancel)
 
 
+@static
 def prompt_file(extensions):
     description = props.Translatable(
         {
@@ -179,22 +180,6 @@ def prompt_file(extensions):
     return props.PropsUIPromptFileInput(description, extensions)
 
 
-def prompt_extraction_message(message, percentage):
-    description = props.Translatable(
-        {
-            "en": "One moment please. Information is now being extracted from the selected file.",
-            "de": "Einen Moment bitte. Es werden nun Informationen aus der ausgewählten Datei extrahiert.",
-            "it": "Un momento, per favore. Le informazioni vengono estratte dal file selezionato.",
-            "es": "Un momento, por favor. Se están extrayendo los datos del archivo seleccionado.",
-            "nl": "Een moment geduld. Informatie wordt op dit moment uit het geselecteerde bestand gehaald.",
-            "ro": "Un moment, vă rugăm. Informațiile sunt extrase acum din fișierul selectat.",
-            "lt": "Prašome palaukti. Informacija dabar ištraukiama iš pasirinkto failo.",
-        }
-    )
-
-    return props.PropsUIPromptProgress(description, message, percentage)
-
-
 def get_files(zipfile_ref):
     try:
         return zipfile_ref.namelist()
@@ -207,26 +192,23 @@ def extract_file(zipfile_ref, filename):
         # make it slow for demo reasons only
         time.sleep(0.01)
         info = zipfile_ref.getinfo(filename)
-        return (filename, info.compress_size, info.file_size)
+        return (filename, info.compress_size, info.size)
     except zipfile.error:
         return "invalid"
 
 
-def prompt_consent(data):
-    description = props.PropsUIPromptText(
-        text=props.Translatable(
-            {
-                "en": "Please review your data below. Use the search fields to find specific information. You can remove any data you prefer not to share. Thank you for supporting this research project!",
-                "de": "Bitte überprüfen Sie Ihre Daten unten. Verwenden Sie die Suchfelder, um bestimmte Informationen zu finden. Sie können alle Daten entfernen, die Sie nicht teilen möchten. Vielen Dank für Ihre Unterstützung dieses Forschungsprojekts!",
-                "it": "Controlla i tuoi dati qui sotto. Usa i campi di ricerca per trovare informazioni specifiche. Puoi rimuovere qualsiasi dato che preferisci non condividere. Grazie per il tuo supporto a questo progetto di ricerca!",
-                "es": "Revise sus datos a continuación. Utilice los campos de búsqueda para encontrar información específica. Puede eliminar cualquier dato que prefiera no compartir. ¡Gracias por apoyar este proyecto de investigación!",
-                "nl": "Bekijk hieronder uw gegevens. Gebruik de zoekvelden om specifieke informatie te vinden. U kunt gegevens verwijderen die u liever niet deelt. Bedankt voor uw steun aan dit onderzoeksproject!",
-                "ro": "Vă rugăm să revizuiți datele de mai jos. Folosiți câmpurile de căutare pentru a găsi informații specifice. Puteți elimina orice date pe care preferați să nu le partajați. Vă mulțumim că sprijiniți acest proiect de cercetare!",
-                "lt": "Prašome peržiūrėti savo duomenis žemiau. Naudokite paieškos laukus, kad rastumėte konkrečią informaciją. Galite pašalinti bet kokius duomenis, kurių nenorite bendrinti. Ačiū, kad remiate šį tyrimų projektą!",
-            }
-        )
-    )
+ZIP_CONTENT_COLUMNS = ["filename", "compressed_size", "size"]
+
+
+def extracted_rows(zipfile_ref, files):
+    """Yield the rows of the files as DataFrames, one file at a time."""
+    for filename in files:
+        row = extract_file(zipfile_ref, filename)
+        if row != "invalid":
+            yield pd.DataFrame([row], columns=ZIP_CONTENT_COLUMNS)
+
 
+def consent_tables(data, streaming=False):
     table_title = props.Translatable(
         {
             "en": "Zip file contents",
@@ -242,7 +224,7 @@ def prompt_consent(data):
     # Show data table if extracted data is available
     data_table = None
     if data is not None:
-        data_frame = pd.DataFrame(data, columns=["filename", "compressed_size", "size"])
+        data_frame = pd.DataFrame(data, columns=ZIP_CONTENT_COLUMNS)
         data_table = props.PropsUIPromptConsentFormTable(
             "zip_content",
             1,
@@ -294,6 +276,7 @@ def prompt_consent(data):
                     }
                 ),
             },
+            streaming=streaming,
         )
 
     # A generic, illustrative second table for layout demonstration purposes
@@ -367,14 +350,31 @@ def prompt_consent(data):
             data_frame_max_size=5000,  # default is 10000, limit or expand as required by expected data
         )
 
+    return [table for table in [data_table, metadata_table] if table is not None]
+
+
+def prompt_consent(tables):
+    description = props.PropsUIPromptText(
+        text=props.Translatable(
+            {
+                "en": "Please review your data below. Use the search fields to find specific information. You can remove any data you prefer not to share. Thank you for supporting this research project!",
+                "de": "Bitte überprüfen Sie Ihre Daten unten. Verwenden Sie die Suchfelder, um bestimmte Informationen zu finden. Sie können alle Daten entfernen, die Sie nicht teilen möchten. Vielen Dank für Ihre Unterstützung dieses Forschungsprojekts!",
+                "it": "Controlla i tuoi dati qui sotto. Usa i campi di ricerca per trovare informazioni specifiche. Puoi rimuovere qualsiasi dato che preferisci non condividere. Grazie per il tuo supporto a questo progetto di ricerca!",
+                "es": "Revise sus datos a continuación. Utilice los campos de búsqueda para encontrar información específica. Puede eliminar cualquier dato que prefiera no compartir. ¡Gracias por apoyar este proyecto de investigación!",
+                "nl": "Bekijk hieronder uw gegevens. Gebruik de zoekvelden om specifieke informatie te vinden. U kunt gegevens verwijderen die u liever niet deelt. Bedankt voor uw steun aan dit onderzoeksproject!",
+                "ro": "Vă rugăm să revizuiți datele de mai jos. Folosiți câmpurile de căutare pentru a găsi informații specifice. Puteți elimina orice date pe care preferați să nu le partajați. Vă mulțumim că sprijiniți acest proiect de cercetare!",
+                "lt": "Prašome peržiūrėti savo duomenis žemiau. Naudokite paieškos laukus, kad rastumėte konkrečią informaciją. Galite pašalinti bet kokius duomenis, kurių nenorite bendrinti. Ačiū, kad remiate šį tyrimų projektą!",
+            }
+        )
+    )
+
     # Construct and render the final consent page
-    result = yield render_data_submission_page(
+    return render_data_submission_page(
         [
             item
             for item in [
                 description,
-                data_table,
-                metadata_table,
+                *tables,
                 props.PropsUIDataSubmissionButtons(
                     donate_question=props.Translatable(
                         {
@@ -403,7 +403,6 @@ def prompt_consent(data):
             if item is not None
         ]
     )
-    return result
 
 
 def donate(key, json_string):
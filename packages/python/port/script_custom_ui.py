@@ -18,8 +18,11 @@
 # --------------------------------------------------------------------
 
 import port.api.props as props
+import port.api.consent as consent
 from port.api.assets import *
 from port.api.commands import CommandSystemDonate, CommandSystemExit, CommandUIRender
+from port.api.memo import static
+from port.api.scheduler import Scheduler
 
 import pandas as pd
 import zipfile
@@ -66,18 +69,12 @@ def process(sessionId):
                 zipfile_ref = "invalid"
 
             if zipfile_ref and zipfile_ref != "invalid":
-                # Extracting the zipfile
-                extraction_result = []
+                # Extracting the zipfile, the progress is shown a few times per second
                 files = get_files(zipfile_ref)
-                fileCount = len(files)
-                for index, filename in enumerate(files):
-                    percentage = ((index + 1) / fileCount) * 100
-                    promptMessage = prompt_extraction_message(
-                        f"Extracting file: {filename}", percentage
-                    )
-                    yield render_data_submission_page(promptMessage)
-                    file_extraction_result = extract_file(zipfile_ref, filename)
-                    extraction_result.append(file_extraction_result)
+                scheduler = Scheduler(render_extraction_progress)
+                extraction_result = yield from scheduler.map(
+                    lambda filename: extract_file(zipfile_ref, filename), files
+                )
 
                 if len(extraction_result) >= 0:
                     meta_data.append(
@@ -111,21 +108,32 @@ def process(sessionId):
 
     # STEP 2: ask for consent
     meta_data.append(("debug", f"{key}: prompt consent"))
-    for prompt in prompt_consent(data):
-        result = yield prompt
-        if result.__type__ == "PayloadJSON":
-            meta_data.append(("debug", f"{key}: donate consent data"))
-            meta_frame = pd.DataFrame(meta_data, columns=["type", "message"])
-            data_submission_data = json.loads(result.value)
-            data_submission_data["meta"] = meta_frame.to_json()
-            yield donate(f"{sessionId}-{key}", json.dumps(data_submission_data))
-        if result.__type__ == "PayloadFalse":
-            value = json.dumps('{"status" : "data_submission declined"}')
-            yield donate(f"{sessionId}-{key}", value)
+    tables = consent_tables(data)
+    result = yield prompt_consent(tables)
+    if result.__type__ == "PayloadJSON":
+        meta_data.append(("debug", f"{key}: donate consent data"))
+        meta_frame = pd.DataFrame(meta_data, columns=["type", "message"])
+        data_submission_data = json.loads(consent.donation_data(tables, result.value))
+        data_submission_data["meta"] = meta_frame.to_json()
+        yield donate(f"{sessionId}-{key}", json.dumps(data_submission_data))
+    if result.__type__ == "PayloadFalse":
+        value = json.dumps('{"status" : "data_submission declined"}')
+        yield donate(f"{sessionId}-{key}", value)
 
 
 def render_data_submission_page(body):
-    header = props.PropsUIHeader(
+    header = page_header()
+
+    # Convert single body item to array if needed
+    body_items = [body] if not isinstance(body, list) else body
+    page = props.PropsUIPageDataSubmission("Zip", header, body_items)
+    return CommandUIRender(page)
+
+
+# The header, file prompt and confirmation do not change, so they are built and serialized once
+@static
+def page_header():
+    return props.PropsUIHeader(
         props.Translatable(
             {
                 "en": "Data donation flow example",
@@ -139,12 +147,8 @@ def render_data_submission_page(body):
         )
     )
 
-    # Convert single body item to array if needed
-    body_items = [body] if not isinstance(body, list) else body
-    page = props.PropsUIPageDataSubmission("Zip", header, body_items)
-    return CommandUIRender(page)
-
 
+@static
 def retry_confirmation():
     text = props.Translatable(
         {
@@ -182,6 +186,7 @@ def retry_confirmation():
     return props.PropsUIPromptConfirm(text, ok, cancel)
 
 
+@static
 def prompt_file(extensions):
     description = props.Translatable(
         {
@@ -200,8 +205,20 @@ def prompt_file(extensions):
     return props.PropsUIPromptFileInput(description, extensions)
 
 
+def render_extraction_progress(done, total, filename):
+    percentage = (done / total) * 100 if total else 0
+    return render_data_submission_page(
+        prompt_extraction_message(f"Extracting file: {filename}", percentage)
+    )
+
+
 def prompt_extraction_message(message, percentage):
-    description = props.Translatable(
+    return props.PropsUIPromptProgress(extraction_description(), message, percentage)
+
+
+@static
+def extraction_description():
+    return props.Translatable(
         {
             "en": "One moment please. Information is now being extracted from the selected file.",
             "de": "Einen Moment bitte. Es werden nun Informationen aus der ausgewählten Datei extrahiert.",
@@ -213,8 +230,6 @@ def prompt_extraction_message(message, percentage):
         }
     )
 
-    return props.PropsUIPromptProgress(description, message, percentage)
-
 
 def get_files(zipfile_ref):
     try:
@@ -233,36 +248,21 @@ def extract_file(zipfile_ref, filename):
         return "invalid"
 
 
-def prompt_consent(data):
-    description = props.PropsUIPromptText(
-        text=props.Translatable(
-            {
-                "en": "Please review your data below. Use the search fields to find specific information. You can remove any data you prefer not to share. Thank you for supporting this research project!",
-                "de": "Bitte überprüfen Sie Ihre Daten unten. Verwenden Sie die Suchfelder, um bestimmte Informationen zu finden. Sie können alle Daten entfernen, die Sie nicht teilen möchten. Vielen Dank für Ihre Unterstützung dieses Forschungsprojekts!",
-                "it": "Controlla i tuoi dati qui sotto. Usa i campi di ricerca per trovare informazioni specifiche. Puoi rimuovere qualsiasi dato che preferisci non condividere. Grazie per il tuo supporto a questo progetto di ricerca!",
-                "es": "Revise sus datos a continuación. Utilice los campos de búsqueda para encontrar información específica. Puede eliminar cualquier dato que prefiera no compartir. ¡Gracias por apoyar este proyecto de investigación!",
-                "nl": "Bekijk hieronder uw gegevens. Gebruik de zoekvelden om specifieke informatie te vinden. U kunt gegevens verwijderen die u liever niet deelt. Bedankt voor uw steun aan dit onderzoeksproject!",
-                "ro": "Vă rugăm să revizuiți datele de mai jos. Folosiți câmpurile de căutare pentru a găsi informații specifice. Puteți elimina orice date pe care preferați să nu le partajați. Vă mulțumim că sprijiniți acest proiect de cercetare!",
-                "lt": "Prašome peržiūrėti savo duomenis žemiau. Naudokite paieškos laukus, kad rastumėte konkrečią informaciją. Galite pašalinti bet kokius duomenis, kurių nenorite bendrinti. Ačiū, kad remiate šį tyrimų projektą!",
-            }
-        )
-    )
-    
-    table_title = props.Translatable(
-        {
-            "en": "Zip file contents",
-            "de": "Inhalt der ZIP-Datei",
-            "it": "Contenuto del file ZIP",
-            "es": "Contenido del archivo ZIP",
-            "nl": "Inhoud van het ZIP-bestand",
-            "ro": "Conținutul fișierului ZIP",
-            "lt": "ZIP failo turinys",
-        }
-    )
-
+def consent_tables(data):
     # Show data table if extracted data is available
     data_table = None
     if data is not None:
+        table_title = props.Translatable(
+            {
+                "en": "Zip file contents",
+                "de": "Inhalt der ZIP-Datei",
+                "it": "Contenuto del file ZIP",
+                "es": "Contenido del archivo ZIP",
+                "nl": "Inhoud van het ZIP-bestand",
+                "ro": "Conținutul fișierului ZIP",
+                "lt": "ZIP failo turinys",
+            }
+        )
         data_frame = pd.DataFrame(data, columns=["filename", "compressed_size", "size"])
         data_table = props.PropsUIPromptConsentFormTable(
             "zip_content",
@@ -387,14 +387,32 @@ def prompt_consent(data):
                 ),
             },
         )
+
+    return [table for table in [data_table, metadata_table] if table is not None]
+
+
+def prompt_consent(tables):
+    description = props.PropsUIPromptText(
+        text=props.Translatable(
+            {
+                "en": "Please review your data below. Use the search fields to find specific information. You can remove any data you prefer not to share. Thank you for supporting this research project!",
+                "de": "Bitte überprüfen Sie Ihre Daten unten. Verwenden Sie die Suchfelder, um bestimmte Informationen zu finden. Sie können alle Daten entfernen, die Sie nicht teilen möchten. Vielen Dank für Ihre Unterstützung dieses Forschungsprojekts!",
+                "it": "Controlla i tuoi dati qui sotto. Usa i campi di ricerca per trovare informazioni specifiche. Puoi rimuovere qualsiasi dato che preferisci non condividere. Grazie per il tuo supporto a questo progetto di ricerca!",
+                "es": "Revise sus datos a continuación. Utilice los campos de búsqueda para encontrar información específica. Puede eliminar cualquier dato que prefiera no compartir. ¡Gracias por apoyar este proyecto de investigación!",
+                "nl": "Bekijk hieronder uw gegevens. Gebruik de zoekvelden om specifieke informatie te vinden. U kunt gegevens verwijderen die u liever niet deelt. Bedankt voor uw steun aan dit onderzoeksproject!",
+                "ro": "Vă rugăm să revizuiți datele de mai jos. Folosiți câmpurile de căutare pentru a găsi informații specifice. Puteți elimina orice date pe care preferați să nu le partajați. Vă mulțumim că sprijiniți acest proiect de cercetare!",
+                "lt": "Prašome peržiūrėti savo duomenis žemiau. Naudokite paieškos laukus, kad rastumėte konkrečią informaciją. Galite pašalinti bet kokius duomenis, kurių nenorite bendrinti. Ačiū, kad remiate šį tyrimų projektą!",
+            }
+        )
+    )
+
     # Construct and render the final consent page
-    result = yield render_data_submission_page(
+    return render_data_submission_page(
         [
             item
             for item in [
                 description,
-                data_table,
-                metadata_table,
+                *tables,
                 # You can add an extra explanation block to the page
                 props.PropsUIPromptText(
                     title=props.Translatable(
@@ -448,7 +466,6 @@ def prompt_consent(data):
             if item is not None
         ]
     )
-    return result
 
 
 def donate(key, json_string):
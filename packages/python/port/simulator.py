@@ -0,0 +1,219 @@
+"""
+Load simulator for port sessions.
+
+Replays many donation sessions of port.main.start over a corpus of
+archives (see tests/generate_test_zip.py) in a pool of worker processes,
+with the ScriptedResponder of port.runner in the role of the participant.
+The report shows how session time scales with the size and file count
+of exports, percentiles of the latency per step, the peak memory per
+session and the throughput of the pool.
+
+Usage:
+    python -m port.simulator corpus/ --sessions 1000 --workers 8
+    python -m port.simulator small.zip large.zip --respond decline --no-trace-memory
+
+Peak memory is measured with tracemalloc, which slows down allocations;
+use --no-trace-memory to measure latency only.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from port.main import start
+from port.runner import ScriptedResponder, drive
+
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class SessionResult:
+    """Measurements of a single simulated session"""
+
+    session_id: str
+    path: str
+    size: int
+    seconds: float
+    steps: list[tuple[str, float]] = field(default_factory=list)
+    peak_memory: Optional[int] = None
+    exit_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+def percentiles(values, qs=PERCENTILES):
+    """Return the nearest-rank percentiles qs of values."""
+    ordered = sorted(values)
+    if not ordered:
+        return {q: None for q in qs}
+    return {q: ordered[min(len(ordered) - 1, max(0, -(-q * len(ordered) // 100) - 1))] for q in qs}
+
+
+def file_count(path):
+    """Return the number of members of a zip export, None for other files."""
+    if not zipfile.is_zipfile(path):
+        return None
+    with zipfile.ZipFile(path) as zf:
+        return len(zf.infolist())
+
+
+def simulate_session(session_id, path, responses=(), trace_memory=True):
+    """Run one session of port.main.start against path and return its SessionResult."""
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    wrapper = start(session_id)
+    session = SessionResult(session_id, path, os.path.getsize(path), 0.0)
+    try:
+        result = drive(wrapper, ScriptedResponder([path], responses))
+        session.seconds = result.seconds
+        session.steps = [(step.prompt or step.command, step.seconds) for step in result.steps]
+        session.exit_code = result.exit_code
+    except Exception as e:
+        session.error = f"{type(e).__name__}: {e}"
+    finally:
+        wrapper.remove_log_handlers()
+
+    if trace_memory:
+        session.peak_memory = tracemalloc.get_traced_memory()[1]
+    return session
+
+
+@dataclass
+class SimulationReport:
+    """Measurements of all simulated sessions"""
+
+    sessions: list[SessionResult]
+    seconds: float
+    workers: int
+
+    def step_latencies(self):
+        """Return the percentiles of the latency per step, by step name."""
+        latencies = defaultdict(list)
+        for session in self.sessions:
+            for name, seconds in session.steps:
+                latencies[name].append(seconds)
+        return {name: (len(values), percentiles(values)) for name, values in latencies.items()}
+
+    def session_latencies(self):
+        return percentiles([session.seconds for session in self.sessions])
+
+    def peak_memory(self):
+        return percentiles([session.peak_memory for session in self.sessions if session.peak_memory is not None])
+
+    def by_export(self):
+        """Return the median session time per export, with its size and file count."""
+        sessions = defaultdict(list)
+        for session in self.sessions:
+            sessions[session.path].append(session)
+        return [
+            (path, group[0].size, file_count(path), percentiles([session.seconds for session in group])[50])
+            for path, group in sorted(sessions.items(), key=lambda item: item[1][0].size)
+        ]
+
+    def throughput(self):
+        """Return the number of sessions and bytes processed per second."""
+        if self.seconds == 0:
+            return 0.0, 0.0
+        return len(self.sessions) / self.seconds, sum(session.size for session in self.sessions) / self.seconds
+
+    def errors(self):
+        return [session for session in self.sessions if session.error is not None]
+
+    def format(self):
+        lines = [f"{len(self.sessions)} sessions on {self.workers} workers in {self.seconds:.3f}s"]
+        sessions_per_second, bytes_per_second = self.throughput()
+        lines.append(f"throughput: {sessions_per_second:.2f} sessions/s, {bytes_per_second / 1024**2:.2f} MB/s")
+        lines.append(f"errors: {len(self.errors())}")
+
+        header = "  ".join(f"p{q:<8}" for q in PERCENTILES)
+        lines.append("")
+        lines.append(f"{'session latency (s)':<40} {'count':>8}  {header}")
+        lines.append(_format_row("session", len(self.sessions), self.session_latencies(), "{:.4f}"))
+        lines.append(f"{'step latency (s)':<40}")
+        for name, (count, values) in sorted(self.step_latencies().items(), key=lambda item: -(item[1][1][50] or 0)):
+            lines.append(_format_row(name, count, values, "{:.4f}"))
+        memory = self.peak_memory()
+        if memory[50] is not None:
+            lines.append(f"{'peak memory (MB)':<40}")
+            lines.append(_format_row("session", len(self.sessions), {q: v / 1024**2 for q, v in memory.items()}, "{:.2f}"))
+
+        lines.append("")
+        lines.append(f"{'export':<40} {'size (MB)':>10} {'files':>8} {'median (s)':>10}")
+        for path, size, count, median in self.by_export():
+            count = "-" if count is None else count
+            lines.append(f"{os.path.basename(path):<40} {size / 1024**2:>10.2f} {count:>8} {median:>10.4f}")
+        return "\n".join(lines)
+
+
+def _format_row(name, count, values, number_format):
+    cells = "  ".join(f"{number_format.format(values[q]):<9}" for q in PERCENTILES)
+    return f"  {name:<38} {count:>8}  {cells}"
+
+
+def corpus_files(paths):
+    """Return the files in paths, listing directories recursively."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def simulate(corpus, sessions=None, workers=None, responses=(), trace_memory=True):
+    """
+    Replay sessions over the files in corpus and return a SimulationReport.
+
+    Args:
+        corpus: paths of exports or directories with exports
+        sessions: number of sessions to run, one per export by default
+        workers: number of worker processes, the number of CPUs by default
+        responses: answers to prompts that need a decision, see port.runner
+        trace_memory: measure the peak memory of each session
+    """
+    files = corpus_files(corpus)
+    if not files:
+        raise ValueError("Corpus is empty")
+    sessions = sessions or len(files)
+    workers = workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(simulate_session, f"session-{index}", files[index % len(files)], tuple(responses), trace_memory)
+            for index in range(sessions)
+        ]
+        results = [future.result() for future in futures]
+    return SimulationReport(results, time.perf_counter() - started, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay port sessions over a corpus of exports")
+    parser.add_argument("corpus", nargs="+", help="exports or directories with exports")
+    parser.add_argument("--sessions", type=int, help="number of sessions (default: one per export)")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--respond", action="append", default=[], help="answers to prompts, in order (comma separated)")
+    parser.add_argument("--no-trace-memory", action="store_true", help="do not measure peak memory")
+    args = parser.parse_args(argv)
+
+    responses = [response for value in args.respond for response in value.split(",") if response]
+    report = simulate(args.corpus, args.sessions, args.workers, responses, not args.no_trace_memory)
+    print(report.format())
+    for session in report.errors():
+        print(f"{session.session_id} ({session.path}): {session.error}", file=sys.stderr)
+    return 1 if report.errors() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
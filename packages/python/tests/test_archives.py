@@ -0,0 +1,219 @@
+import gzip
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from port.api.archives import FileWindow, NestedArchiveReader, ZipStreamReader, _ZipNode
+
+
+class UnseekableWriter(io.RawIOBase):
+    """Makes zipfile write data descriptors, like streaming zip writers do"""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+def make_zip(files: dict, compression=zipfile.ZIP_DEFLATED, streamed=False) -> bytes:
+    if streamed:
+        writer = UnseekableWriter()
+        with zipfile.ZipFile(writer, "w", compression) as zf:
+            for name, data in files.items():
+                with zf.open(name, "w") as dest:
+                    dest.write(data)
+        return writer.buffer.getvalue()
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+def make_export(outer_compression=zipfile.ZIP_STORED) -> bytes:
+    innermost = make_zip({"deep.txt": b"deep" * 1000})
+    stored = make_zip({"b.txt": b"hello", "c.zip": innermost}, compression=zipfile.ZIP_STORED)
+    deflated = make_zip({"a.json": b'{"key": "value"}' * 10000, "sub.zip": innermost}, streamed=True)
+    return make_zip(
+        {"top.txt": b"top", "2020.zip": stored, "2021.zip": deflated},
+        compression=outer_compression,
+    )
+
+
+EXPECTED_FILES = [
+    "top.txt",
+    "2020.zip/b.txt",
+    "2020.zip/c.zip/deep.txt",
+    "2021.zip/a.json",
+    "2021.zip/sub.zip/deep.txt",
+]
+
+
+class TestFileWindow:
+    """Tests for the window onto a byte range of a parent file"""
+
+    def test_read_and_seek(self):
+        window = FileWindow(io.BytesIO(b"0123456789"), 2, 5)
+        assert window.read(2) == b"23"
+        assert window.read() == b"456"
+        assert window.read() == b""
+        window.seek(-1, 2)
+        assert window.read() == b"6"
+
+
+class TestZipStreamReader:
+    """Tests for reading a zip front to back without the central directory"""
+
+    def test_members_with_data_descriptors(self):
+        data = make_zip({"a.txt": b"a" * 100000, "b.txt": b"b"}, streamed=True)
+        result = {member.name: entry.read() for member, entry in ZipStreamReader(io.BytesIO(data), block_size=1024)}
+        assert result == {"a.txt": b"a" * 100000, "b.txt": b"b"}
+
+    def test_skipped_members_are_drained(self):
+        data = make_zip({"a.txt": b"a" * 1000, "b.txt": b"b" * 10})
+        reader = ZipStreamReader(io.BytesIO(data))
+        names = [member.name for member, _ in reader]
+        assert names == ["a.txt", "b.txt"]
+
+    def test_bad_crc_raises(self):
+        data = bytearray(make_zip({"a.txt": b"abc"}, compression=zipfile.ZIP_STORED))
+        data[data.index(b"abc")] = ord("x")
+        with pytest.raises(zipfile.BadZipFile):
+            for _, entry in ZipStreamReader(io.BytesIO(bytes(data))):
+                entry.read()
+
+
+class TestNestedArchiveReader:
+    """Tests for reading archives nested in archives"""
+
+    @pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+    def test_unified_index(self, compression):
+        reader = NestedArchiveReader(io.BytesIO(make_export(compression)))
+        assert reader.namelist() == EXPECTED_FILES
+        archives = [member.path for member in reader.members() if member.is_archive]
+        assert archives == ["2020.zip", "2020.zip/c.zip", "2021.zip", "2021.zip/sub.zip"]
+        assert reader.getinfo("2021.zip/sub.zip/deep.txt").depth == 2
+
+    def test_stored_inner_archive_is_not_copied(self):
+        reader = NestedArchiveReader(io.BytesIO(make_export(zipfile.ZIP_STORED)))
+        reader.members()
+        node, _ = reader._locations["2020.zip/b.txt"]
+        assert isinstance(node.zip_file.fp, FileWindow)
+
+    @pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+    def test_iter_members(self, compression):
+        reader = NestedArchiveReader(io.BytesIO(make_export(compression)))
+        contents = {member.path: file.read() for member, file in reader.iter_members()}
+        assert list(contents) == EXPECTED_FILES
+        assert contents["2020.zip/c.zip/deep.txt"] == b"deep" * 1000
+        assert contents["2021.zip/a.json"] == b'{"key": "value"}' * 10000
+
+    def test_open_by_path(self):
+        reader = NestedArchiveReader(io.BytesIO(make_export(zipfile.ZIP_DEFLATED)))
+        assert reader.open("2021.zip/sub.zip/deep.txt").read() == b"deep" * 1000
+        assert reader.open("2020.zip/b.txt").read() == b"hello"
+
+    def test_max_depth(self):
+        reader = NestedArchiveReader(io.BytesIO(make_export()), max_depth=1)
+        assert "2020.zip/c.zip" in reader.namelist()
+        assert "2020.zip/c.zip/deep.txt" not in reader.namelist()
+
+    @pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+    def test_invalid_inner_archive_is_a_regular_file(self, compression):
+        data = make_zip({"broken.zip": b"not a zip file", "a.txt": b"a"}, compression=compression)
+        reader = NestedArchiveReader(io.BytesIO(data))
+        assert reader.namelist() == ["broken.zip", "a.txt"]
+        contents = {member.path: file.read() for member, file in reader.iter_members()}
+        assert contents["broken.zip"] == b"not a zip file"
+
+    def test_invalid_inner_archive_is_closed(self, monkeypatch):
+        opened = []
+        original = _ZipNode.open
+
+        def record(node, info):
+            file = original(node, info)
+            opened.append(file)
+            return file
+
+        monkeypatch.setattr(_ZipNode, "open", record)
+        data = make_zip({"broken.zip": b"not a zip file"})
+        NestedArchiveReader(io.BytesIO(data)).members()
+        assert len(opened) == 1
+        assert opened[0].closed
+
+    def test_not_a_zip(self):
+        with pytest.raises(zipfile.BadZipFile):
+            NestedArchiveReader(io.BytesIO(b"not a zip file"))
+
+
+def make_tar(files: dict, mode="w:gz") -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class CountingFile(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+class TestTarAndGzip:
+    """Tests for tar, tar.gz and gzip uploads"""
+
+    @pytest.mark.parametrize("mode", ["w", "w:gz", "w:bz2", "w:xz"])
+    def test_tar_upload(self, mode):
+        reader = NestedArchiveReader(io.BytesIO(make_tar({"a.json": b"[]", "dir/b.txt": b"b"}, mode)))
+        contents = {member.path: file.read() for member, file in reader.iter_members()}
+        assert contents == {"a.json": b"[]", "dir/b.txt": b"b"}
+
+    def test_tarball_read_in_large_blocks(self):
+        data = make_tar({f"file_{i}.txt": b"x" * 10000 for i in range(100)})
+        fp = CountingFile(data)
+        reader = NestedArchiveReader(fp)
+        assert len(reader.namelist()) == 100
+        # one read to detect the format, one read for the data
+        assert fp.reads <= 3
+
+    def test_gzip_upload(self):
+        fp = io.BytesIO(gzip.compress(b"[1, 2, 3]"))
+        fp.name = "history.json.gz"
+        reader = NestedArchiveReader(fp)
+        contents = {member.path: file.read() for member, file in reader.iter_members()}
+        assert contents == {"history.json": b"[1, 2, 3]"}
+
+    def test_archives_nested_in_tarball(self):
+        inner_zip = make_zip({"a.txt": b"a"})
+        data = make_tar({"in.zip": inner_zip, "h.json.gz": gzip.compress(b"{}")})
+        reader = NestedArchiveReader(io.BytesIO(data))
+        assert reader.namelist() == ["in.zip/a.txt", "h.json.gz/h.json"]
+        assert reader.open("in.zip/a.txt").read() == b"a"
+
+    def test_tarball_nested_in_zip(self):
+        data = make_zip({"2021.tar.gz": make_tar({"a.txt": b"a"}), "b.txt": b"b"})
+        reader = NestedArchiveReader(io.BytesIO(data))
+        contents = {member.path: file.read() for member, file in reader.iter_members()}
+        assert contents == {"2021.tar.gz/a.txt": b"a", "b.txt": b"b"}
+
+    def test_truncated_tarball(self):
+        # Rejected by the sniffing of the file, before its members are read
+        data = make_tar({"a.txt": b"a" * 100000}, "w")[:2000]
+        with pytest.raises(zipfile.BadZipFile):
+            reader = NestedArchiveReader(io.BytesIO(data))
+            for _, file in reader.iter_members():
+                file.read()
@@ -0,0 +1,160 @@
+import base64
+import datetime
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from port.api import arrow
+from port.api.arrow import PYARROW, PYTHON, encode_donation, encode_frame
+from port.api.commands import CommandSystemDonate
+from port.api.consent import donation_arrow, donation_data
+from port.api.props import PropsUIPromptConsentFormTable, Translatable
+from port.api.serialization import to_json
+
+
+@pytest.fixture
+def pa():
+    pyarrow = pytest.importorskip("pyarrow")
+    pytest.importorskip("pyarrow.ipc")
+    return pyarrow
+
+
+def read(pa, data):
+    return pa.ipc.open_stream(data).read_all()
+
+
+def make_frame():
+    return pd.DataFrame(
+        {
+            "count": [1, 2, 3],
+            "optional": pd.array([1, None, 3], dtype="Int64"),
+            "score": [1.5, np.nan, 3.0],
+            "liked": [True, False, True],
+            "title": pd.Series(["a", None, "ü"], dtype=object),
+            "time": pd.to_datetime(["2024-01-01T12:00:00Z", None, "2024-01-02T00:00:00.5Z"], format="ISO8601"),
+            "day": pd.to_datetime(["2024-01-01", "2024-01-03", None]),
+            "tags": [["x", "y"], {"a": 1}, None],
+            "channel": pd.Categorical(["x", "y", "x"]),
+        }
+    ).set_axis([10, 11, 12])
+
+
+class TestEncodeFrame:
+    """Tests for the Arrow IPC stream of a DataFrame"""
+
+    def test_python_stream_framing(self):
+        data = encode_frame(make_frame(), PYTHON)
+        assert len(data) % 8 == 0
+        # Schema message first, end of stream marker last
+        assert struct.unpack_from("<Ii", data) == (0xFFFFFFFF, struct.unpack_from("<i", data, 4)[0])
+        assert data[-8:] == struct.pack("<Ii", 0xFFFFFFFF, 0)
+        assert b"count" in data and b"channel" in data
+
+    @pytest.mark.parametrize("engine", [PYTHON, PYARROW])
+    def test_types_and_nulls(self, pa, engine):
+        table = read(pa, encode_frame(make_frame(), engine))
+        assert [str(field.type) for field in table.schema] == [
+            "int64",
+            "int64",
+            "double",
+            "bool",
+            "string",
+            "timestamp[us, tz=UTC]",
+            "timestamp[us]",
+            "string",
+            "string",
+        ]
+        rows = table.to_pylist()
+        assert [row["optional"] for row in rows] == [1, None, 3]
+        assert [row["score"] for row in rows] == [1.5, None, 3.0]
+        assert [row["title"] for row in rows] == ["a", None, "ü"]
+        assert [row["tags"] for row in rows] == ['["x", "y"]', '{"a": 1}', None]
+        assert rows[2]["time"].isoformat() == "2024-01-02T00:00:00.500000+00:00"
+        assert rows[2]["day"] is None
+
+    def test_engines_write_the_same_table(self, pa):
+        frame = make_frame()
+        table = read(pa, encode_frame(frame, PYTHON))
+        table.validate(full=True)
+        assert table.equals(read(pa, encode_frame(frame, PYARROW)))
+
+    def test_object_columns(self, pa):
+        frame = pd.DataFrame({"numbers": pd.Series([1, None, 3], dtype=object), "raw": [b"\x00\x01", None, b""]})
+        table = read(pa, encode_frame(frame, PYTHON))
+        assert [str(field.type) for field in table.schema] == ["int64", "binary"]
+        assert table.column("numbers").to_pylist() == [1, None, 3]
+        assert table.column("raw").to_pylist() == [b"\x00\x01", None, b""]
+
+    @pytest.mark.parametrize("engine", [PYTHON, PYARROW])
+    def test_unsigned_64_bit_columns(self, pa, engine):
+        frame = pd.DataFrame(
+            {
+                "large": np.array([1, 2**63 + 5], dtype=np.uint64),
+                "optional": pd.array([None, 2**64 - 1], dtype="UInt64"),
+                "objects": pd.Series([2**63 + 5, None], dtype=object),
+                "small": np.array([1, 2], dtype=np.uint32),
+            }
+        )
+        table = read(pa, encode_frame(frame, engine))
+        assert [str(field.type) for field in table.schema] == ["uint64", "uint64", "uint64", "int64"]
+        assert table.column("large").to_pylist() == [1, 2**63 + 5]
+        assert table.column("optional").to_pylist() == [None, 2**64 - 1]
+        assert table.column("objects").to_pylist() == [2**63 + 5, None]
+
+    def test_scalars_are_written_as_text(self, pa):
+        frame = pd.DataFrame(
+            {"values": pd.Series([datetime.date(2020, 1, 1), datetime.timedelta(seconds=90), 1.5, ("a", 1)], dtype=object)}
+        )
+        table = read(pa, encode_frame(frame, PYTHON))
+        assert table.column("values").to_pylist() == ["2020-01-01", "0:01:30", "1.5", '["a", 1]']
+
+    def test_empty_frame(self, pa):
+        table = read(pa, encode_frame(pd.DataFrame({"name": pd.Series([], dtype=object)}), PYTHON))
+        assert table.num_rows == 0 and table.column_names == ["name"]
+
+    def test_pyarrow_engine_needs_pyarrow(self, monkeypatch):
+        monkeypatch.setattr(arrow, "pyarrow", None)
+        with pytest.raises(ImportError):
+            encode_frame(make_frame(), PYARROW)
+        assert encode_frame(make_frame()) == encode_frame(make_frame(), PYTHON)
+
+
+class TestDonation:
+    """Tests for binary donations of consent tables"""
+
+    def make_tables(self):
+        text = Translatable({"en": "Files"})
+        files = PropsUIPromptConsentFormTable("files", 1, text, text, pd.DataFrame({"name": ["a", "b", "c"], "size": [1, 2, 3]}))
+        other = PropsUIPromptConsentFormTable("other", 1, text, text, pd.DataFrame({"x": [1]}))
+        payload = json.dumps(
+            {
+                "files": {"deleted": [[1, 2]], "metadata": {"deletedRowCount": 1}},
+                "other": {"data": [{"x": 1}], "metadata": {"deletedRowCount": 0}},
+            }
+        )
+        return [files, other], payload
+
+    @pytest.mark.parametrize("engine", [PYTHON, PYARROW])
+    def test_same_rows_as_json(self, pa, engine):
+        tables, payload = self.make_tables()
+        donation = read(pa, donation_arrow(tables, payload, engine)).to_pylist()
+        expected = json.loads(donation_data(tables, payload))
+        assert [row["table"] for row in donation] == list(expected)
+        for row in donation:
+            assert json.loads(row["metadata"]) == expected[row["table"]]["metadata"]
+            assert read(pa, row["data"]).to_pylist() == expected[row["table"]]["data"]
+
+    def test_donation_of_no_tables(self, pa):
+        assert read(pa, encode_donation([], PYTHON)).num_rows == 0
+
+    def test_command(self):
+        data = encode_frame(pd.DataFrame({"x": [1]}), PYTHON)
+        command = CommandSystemDonate("key", data=data)
+        assert command.toDict() == {"__type__": "CommandSystemDonate", "key": "key", "format": "arrow", "data": data}
+        assert base64.b64decode(json.loads(to_json(command))["data"]) == data
+        assert "json_string" in CommandSystemDonate("key", "{}").toDict()
+        with pytest.raises(ValueError):
+            CommandSystemDonate("key")
@@ -0,0 +1,97 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from port.api.column_store import ColumnStore, decode_column, encode_column
+
+
+def make_records(count, seed=0):
+    rng = random.Random(seed)
+    channels = [f"channel {index}" for index in range(50)]
+    for index in range(count):
+        yield {
+            "time": pd.Timestamp("2024-01-01") + pd.Timedelta(minutes=index),
+            "channel": rng.choice(channels),
+            "title": f"video {rng.randint(0, 2000)} of {rng.choice(channels)}",
+            "views": rng.randint(0, 10**6),
+            "share": rng.random(),
+        }
+
+
+class TestEncoding:
+    """Tests for compressing single columns"""
+
+    @pytest.mark.parametrize(
+        "values",
+        [
+            [1, 2, 3],
+            [1.5, float("nan"), 3.0],
+            [True, False, True],
+            ["a", None, "b", "a", "é\x00"],
+            pd.Series(["x", None, "y"], dtype="str"),
+            [{"nested": 1}, None, [1, 2]],
+            [],
+        ],
+    )
+    def test_round_trip(self, values):
+        decoded = pd.Series(decode_column(encode_column(values)))
+        expected = values if isinstance(values, pd.Series) else pd.Series(values, dtype=None if values else object)
+        pd.testing.assert_series_equal(decoded, expected, check_dtype=False)
+
+    def test_strings_are_dictionary_encoded(self):
+        column = encode_column(["same value"] * 10000)
+        assert column.encoding == "dictionary"
+        assert column.nbytes() < 200
+
+
+class TestColumnStore:
+    """Tests for accumulating records in compressed chunks"""
+
+    def test_rows_in_chunks(self):
+        store = ColumnStore(["a", "b"], chunk_size=3)
+        store.append({"a": 1, "b": "x"})
+        store.append((2, "y"))
+        store.extend([{"a": 3}, {"a": 4, "b": "z"}])
+        assert len(store) == 4
+        assert [len(frame) for frame in store.scan()] == [3, 1]
+        frame = store.to_frame()
+        assert frame["a"].tolist() == [1, 2, 3, 4]
+        assert frame["b"].tolist()[:2] == ["x", "y"]
+        assert pd.isna(frame["b"][2])
+
+    def test_scan_columns(self):
+        store = ColumnStore(["a", "b"], chunk_size=2)
+        store.extend([(1, "x"), (2, "y"), (3, "z")])
+        assert [frame.columns.tolist() for frame in store.scan(["b"])] == [["b"], ["b"]]
+        assert store.to_frame(["b"])["b"].tolist() == ["x", "y", "z"]
+
+    def test_wrong_number_of_values(self):
+        with pytest.raises(ValueError):
+            ColumnStore(["a", "b"]).append((1,))
+
+    def test_empty_store(self):
+        assert ColumnStore(["a"]).to_frame().columns.tolist() == ["a"]
+
+    def test_same_frame_as_pandas(self):
+        records = list(make_records(5000))
+        store = ColumnStore(list(records[0]), chunk_size=1000)
+        store.extend(records)
+        pd.testing.assert_frame_equal(store.to_frame(), pd.DataFrame(records), check_dtype=False)
+
+    def test_append_frame(self):
+        frame = pd.DataFrame(list(make_records(2500)))
+        store = ColumnStore(frame.columns, chunk_size=1000)
+        store.append_frame(frame)
+        assert [len(chunk) for chunk in store.scan()] == [1000, 1000, 500]
+        pd.testing.assert_frame_equal(store.to_frame(), frame)
+
+    def test_compression(self):
+        store = ColumnStore(["time", "channel", "title", "views", "share"])
+        store.extend(make_records(100000))
+        store.seal()
+        frame = store.to_frame()
+        in_memory = frame.memory_usage(index=False, deep=True).sum()
+        assert store.raw_nbytes == pytest.approx(in_memory, rel=0.1)
+        assert store.nbytes() * 3 < in_memory
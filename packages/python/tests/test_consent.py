@@ -0,0 +1,152 @@
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from port.api import search
+from port.api.consent import apply_deletions, donation_data, stream_table
+from port.api.props import PropsUIPromptConsentFormTable, Translatable
+
+
+def make_table(id, data_frame, **kwargs):
+    text = Translatable({"en": id, "nl": id})
+    return PropsUIPromptConsentFormTable(id, 1, text, text, data_frame, **kwargs)
+
+
+class FakeClock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+class TestApplyDeletions:
+    """Tests for applying the deletions sent by the consent table"""
+
+    def test_ranges(self):
+        df = pd.DataFrame({"value": range(10)})
+        result = apply_deletions(df, [[1, 4], [9, 10]])
+        assert result["value"].tolist() == [0, 4, 5, 6, 7, 8]
+
+    def test_ids(self):
+        df = pd.DataFrame({"value": [1, 2, 3]}, index=["a", "b", "c"])
+        assert apply_deletions(df, ["1"])["value"].tolist() == [1, 3]
+
+    def test_nothing_deleted(self):
+        df = pd.DataFrame({"value": [1, 2]})
+        assert apply_deletions(df, []) is df
+
+
+class TestDonationData:
+    """Tests for building the donation from the tables the script holds"""
+
+    def test_deleted_rows_are_not_donated(self):
+        tables = [
+            make_table("files", pd.DataFrame({"name": ["a", "b", "c"], "size": [1, 2, 3]})),
+            make_table("other", pd.DataFrame({"x": [1]})),
+        ]
+        payload = json.dumps(
+            {
+                "files": {"deleted": [[1, 2]], "metadata": {"deletedRowCount": 1}},
+                "other": {"deleted": [], "metadata": {"deletedRowCount": 0}},
+            }
+        )
+        result = json.loads(donation_data(tables, payload))
+        assert result == {
+            "files": {"data": [{"name": "a", "size": 1}, {"name": "c", "size": 3}], "metadata": {"deletedRowCount": 1}},
+            "other": {"data": [{"x": 1}], "metadata": {"deletedRowCount": 0}},
+        }
+
+    @pytest.mark.parametrize(
+        "index",
+        [pd.date_range("2024-01-05", periods=3), pd.Index([0.5, 1.5, 2.5]), pd.Index([10, 20, 30])],
+    )
+    def test_row_ids_of_any_index(self, index):
+        table = make_table("files", pd.DataFrame({"name": ["a", "b", "c"]}, index=index))
+        # The ids the consent table gets for the rows
+        ids = list(json.loads(table.toDict()["data_frame"])["name"])
+        assert ids == ["0", "1", "2"]
+        payload = json.dumps({"files": {"deleted": [[1, 2], "2"], "metadata": {"deletedRowCount": 2}}})
+        assert json.loads(donation_data([table], payload))["files"]["data"] == [{"name": "a"}]
+
+    def test_rows_sent_by_older_consent_pages(self):
+        tables = [make_table("files", pd.DataFrame({"name": ["a", "b"]}))]
+        payload = json.dumps({"files": {"data": [{"name": "a"}], "metadata": {"deletedRowCount": 1}}})
+        assert json.loads(donation_data(tables, payload))["files"]["data"] == [{"name": "a"}]
+
+
+class TestStreamTable:
+    """Tests for consent tables that are appended to while the page is shown"""
+
+    def chunks(self, count, clock=None, seconds=0.0):
+        for number in range(count):
+            if clock is not None:
+                clock.time += seconds
+            yield pd.DataFrame({"name": [f"file {number}"], "size": [number]})
+
+    def test_append_numbers_rows(self):
+        table = make_table("files", pd.DataFrame({"name": ["a"], "size": [0]}), streaming=True)
+        command = table.append(pd.DataFrame({"name": ["b", "c"], "size": [1, 2]}, index=[7, 8])).toDict()
+        assert command["__type__"] == "CommandUIAppend"
+        assert json.loads(command["data_frame"]) == {"name": {"1": "b", "2": "c"}, "size": {"1": 1, "2": 2}}
+        assert table.data_frame.index.tolist() == [0, 1, 2]
+        assert table.toDict()["streaming"] is True
+
+        done = table.append(done=True).toDict()
+        assert done["done"] and json.loads(done["data_frame"]) == {"name": {}, "size": {}}
+        assert "streaming" not in table.toDict()
+
+    def test_append_stops_at_max_size(self):
+        table = make_table("files", pd.DataFrame({"name": ["a"]}), streaming=True, data_frame_max_size=3)
+        table.append(pd.DataFrame({"name": ["b", "c", "d"]}))
+        command = table.append(pd.DataFrame({"name": ["e"]}), done=True).toDict()
+        assert table.data_frame["name"].tolist() == ["a", "b", "c"]
+        assert json.loads(command["data_frame"]) == {"name": {}}
+
+    def test_appended_rows_are_searchable(self):
+        table = make_table("files", pd.DataFrame({"name": ["apple"]}), streaming=True)
+        search.index_page(SimpleNamespace(body=table), {"body": [table.toDict()]})
+        table.append(pd.DataFrame({"name": ["pineapple", "pear"]}))
+        assert search.search("files", ["apple"]) == ["0", "1"]
+        search.clear()
+
+    def test_stream(self):
+        clock = FakeClock()
+        table = make_table("files", pd.DataFrame(columns=["name", "size"]), streaming=True)
+        flow = stream_table(lambda: "page", table, self.chunks(10, clock, 0.0625), budget=0.125, clock=clock)
+
+        # The page is shown after the first chunk
+        assert next(flow) == "page"
+        commands = []
+        try:
+            command = flow.send(None)
+            while True:
+                commands.append(command.toDict())
+                command = flow.send("consent" if command.done else None)
+        except StopIteration as stop:
+            assert stop.value == "consent"
+
+        # An append every other chunk, the last chunk is sent with done
+        assert [len(json.loads(command["data_frame"])["name"]) for command in commands] == [2, 2, 2, 2, 1]
+        assert [command["done"] for command in commands] == [False] * 4 + [True]
+        assert len(table.data_frame) == 10
+        assert table.data_frame["name"].tolist() == [f"file {number}" for number in range(10)]
+
+    def test_stream_without_rows(self):
+        table = make_table("files", pd.DataFrame(columns=["name", "size"]), streaming=True)
+        flow = stream_table(lambda: "page", table, iter([]))
+        assert next(flow) == "page"
+        assert flow.send(None).done
+
+    def test_deletions_of_appended_rows(self):
+        table = make_table("files", pd.DataFrame(columns=["name", "size"]), streaming=True)
+        flow = stream_table(lambda: "page", table, self.chunks(3))
+        next(flow)
+        command = flow.send(None)
+        while not command.done:
+            command = flow.send(None)
+        payload = json.dumps({"files": {"deleted": [[1, 2]], "metadata": {"deletedRowCount": 1}}})
+        result = json.loads(donation_data([table], payload))
+        assert [row["name"] for row in result["files"]["data"]] == ["file 0", "file 2"]
@@ -0,0 +1,128 @@
+import io
+import random
+import zipfile
+import zlib
+
+import pytest
+
+from port.api.archives import NestedArchiveReader
+from port.api.deflate_index import DeflateIndex, IndexedDeflateReader
+from port.api.memory import MemoryGovernor, get_governor, set_governor
+
+
+def make_data(size, seed=0):
+    rng = random.Random(seed)
+    words = [b"watch", b"like", b"share", b"comment", b"follow", b"2024-01-01T12:00:00Z"]
+    parts, length = [], 0
+    while length < size:
+        part = rng.choice(words) + str(rng.randint(0, 999)).encode() + b" "
+        parts.append(part)
+        length += len(part)
+    return b"".join(parts)[:size]
+
+
+def make_reader(data, span, **kwargs):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    compressed = b"header" + compressor.compress(data) + compressor.flush()
+    fp = io.BytesIO(compressed)
+    index = DeflateIndex(span)
+    reader = IndexedDeflateReader(fp, 6, len(compressed) - 6, len(data), index=index, crc=zlib.crc32(data), **kwargs)
+    return reader, index
+
+
+@pytest.fixture
+def critical_memory():
+    governor = get_governor()
+    set_governor(MemoryGovernor(budget=100, sampler=lambda: 95))
+    yield
+    set_governor(governor)
+
+
+class TestIndexedDeflateReader:
+    """Tests for random access into compressed data"""
+
+    def test_read_whole_member(self):
+        data = make_data(300_000)
+        reader, index = make_reader(data, span=64 * 1024)
+        assert io.BufferedReader(reader).read() == data
+        assert len(index) == 300_000 // (64 * 1024)
+        assert index.covered == len(data)
+
+    def test_random_seeks(self):
+        data = make_data(500_000, seed=1)
+        reader, index = make_reader(data, span=32 * 1024)
+        reader.readall()
+        rng = random.Random(2)
+        for _ in range(50):
+            offset = rng.randrange(len(data))
+            size = rng.randrange(1, 5000)
+            reader.seek(offset)
+            assert reader.read(size) == data[offset : offset + size]
+
+    def test_seek_restarts_from_nearest_checkpoint(self):
+        data = make_data(400_000, seed=3)
+        reader, index = make_reader(data, span=32 * 1024)
+        reader.readall()
+        reader.seek(300_000)
+        reader.read(10)
+        checkpoint = index.nearest(300_000)
+        assert checkpoint.output_offset > 250_000
+        # Only the compressed data after the checkpoint was read again
+        assert reader._input_pos - checkpoint.input_offset < 64 * 1024
+
+    def test_index_is_shared_by_readers(self):
+        data = make_data(200_000, seed=4)
+        reader, index = make_reader(data, span=16 * 1024)
+        reader.readall()
+        other = IndexedDeflateReader(reader.fp, 6, reader.compress_size, len(data), index=index)
+        other.seek(150_000)
+        assert other.read(100) == data[150_000:150_100]
+        assert len(index) == 200_000 // (16 * 1024)
+
+    def test_bad_crc_raises(self):
+        data = make_data(50_000)
+        reader, _ = make_reader(data, span=16 * 1024)
+        reader.crc ^= 1
+        with pytest.raises(zlib.error):
+            io.BufferedReader(reader).read()
+
+    def test_no_checkpoints_when_memory_is_critical(self, critical_memory):
+        data = make_data(200_000)
+        reader, index = make_reader(data, span=16 * 1024)
+        assert io.BufferedReader(reader).read() == data
+        assert len(index) == 0
+
+
+class TestIndexedMembers:
+    """Tests for indexed members of a NestedArchiveReader"""
+
+    def make_upload(self, data):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("small.txt", b"small")
+            zf.writestr("Takeout/watch-history.json", data)
+        buffer.seek(0)
+        return buffer
+
+    def test_large_members_are_indexed(self):
+        data = make_data(300_000)
+        reader = NestedArchiveReader(self.make_upload(data), index_min_size=100_000)
+        file = reader.open("Takeout/watch-history.json")
+        assert file.read() == data
+        file.seek(200_000)
+        assert file.read(10) == data[200_000:200_010]
+        node, _ = reader._locations["Takeout/watch-history.json"]
+        assert set(node.indexes) == {"Takeout/watch-history.json"}
+        assert reader.open("small.txt").read() == b"small"
+
+    def test_reopen_keeps_index(self):
+        data = make_data(300_000)
+        reader = NestedArchiveReader(self.make_upload(data), index_min_size=100_000)
+        reader.open("Takeout/watch-history.json").read()
+        node, _ = reader._locations["Takeout/watch-history.json"]
+        index = node.indexes["Takeout/watch-history.json"]
+        assert index.covered == len(data)
+        file = reader.open("Takeout/watch-history.json")
+        file.seek(250_000)
+        assert file.read() == data[250_000:]
+        assert node.indexes["Takeout/watch-history.json"] is index
@@ -0,0 +1,116 @@
+import warnings
+from datetime import datetime
+
+import pandas as pd
+
+from port.api.dtypes import optimize_dtypes
+from port.api.props import PropsUIPromptConsentFormTable, Translatable
+
+
+def make_translatable(text: str) -> Translatable:
+    return Translatable({"en": text, "nl": text})
+
+
+def make_dataframe(num_rows: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "count": range(num_rows),
+            "ratio": [i / 2 for i in range(num_rows)],
+            "platform": [["youtube", "tiktok"][i % 2] for i in range(num_rows)],
+            "title": [f"title_{i}" for i in range(num_rows)],
+            "timestamp": pd.date_range("2025-01-01", periods=num_rows, freq="h"),
+        }
+    )
+
+
+def to_json(data_frame: pd.DataFrame) -> str:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return data_frame.to_json()
+
+
+class TestOptimizeDtypes:
+    """Tests for the memory-compact dtype optimizer"""
+
+    def test_numeric_columns_downcast(self):
+        """Integers and lossless floats should be downcast"""
+        optimized, _ = optimize_dtypes(make_dataframe(100))
+        assert optimized["count"].dtype == "uint8"
+        assert optimized["ratio"].dtype == "float32"
+
+    def test_lossy_float_not_downcast(self):
+        """Floats that lose precision as float32 should stay float64"""
+        optimized, _ = optimize_dtypes(pd.DataFrame({"value": [0.1, 0.2, 0.3]}))
+        assert optimized["value"].dtype == "float64"
+
+    def test_low_cardinality_strings_become_categorical(self):
+        """Strings with few unique values should become categoricals, unique strings should not"""
+        optimized, _ = optimize_dtypes(make_dataframe(100))
+        assert isinstance(optimized["platform"].dtype, pd.CategoricalDtype)
+        assert not isinstance(optimized["title"].dtype, pd.CategoricalDtype)
+
+    def test_datetime64_timestamps_kept(self):
+        """datetime64 columns take no more memory than int64, so they should be kept"""
+        df = make_dataframe(10)
+        optimized, report = optimize_dtypes(df)
+        assert optimized["timestamp"].dtype == df["timestamp"].dtype
+        assert "timestamp" not in report.conversions
+
+    def test_object_timestamps_stored_as_int64(self):
+        """Timestamps held as Python objects should be stored as int64 milliseconds"""
+        df = pd.DataFrame({"timestamp": pd.Series([datetime(2025, 1, 1), datetime(2025, 1, 2)], dtype=object)})
+        optimized, report = optimize_dtypes(df)
+        assert optimized["timestamp"].dtype == "int64"
+        assert optimized["timestamp"][0] == 1735689600000
+        assert report.saved > 0
+        assert to_json(optimized) == to_json(df)
+
+    def test_missing_timestamps_preserved(self):
+        """Missing timestamps should remain missing"""
+        df = pd.DataFrame({"timestamp": pd.Series([datetime(2025, 1, 1), None], dtype=object)})
+        optimized, _ = optimize_dtypes(df)
+        assert optimized["timestamp"].isna().tolist() == [False, True]
+
+    def test_json_output_unchanged(self):
+        """The optimized frame should serialize to the same JSON"""
+        df = make_dataframe(100)
+        optimized, _ = optimize_dtypes(df)
+        assert to_json(optimized) == to_json(df)
+
+    def test_report_memory(self):
+        """The report should show the memory before and after"""
+        df = make_dataframe(1000)
+        optimized, report = optimize_dtypes(df)
+        assert report.memory_before == df.memory_usage(deep=True).sum()
+        assert report.memory_after == optimized.memory_usage(deep=True).sum()
+        assert report.saved > 0
+        assert "count" in report.conversions
+
+    def test_input_not_modified(self):
+        """The input frame should not be modified"""
+        df = make_dataframe(10)
+        optimize_dtypes(df)
+        assert df["count"].dtype == "int64"
+
+    def test_consent_table_optimizes_by_default(self):
+        """Attaching a frame to a consent table should optimize it"""
+        table = PropsUIPromptConsentFormTable(
+            id="test",
+            number=1,
+            title=make_translatable("Test"),
+            description=make_translatable("Description"),
+            data_frame=make_dataframe(100),
+        )
+        assert table.data_frame["count"].dtype == "uint8"
+
+    def test_consent_table_opt_out(self):
+        """compact_dtypes=False should leave the frame untouched"""
+        table = PropsUIPromptConsentFormTable(
+            id="test",
+            number=1,
+            title=make_translatable("Test"),
+            description=make_translatable("Description"),
+            data_frame=make_dataframe(100),
+            compact_dtypes=False,
+        )
+        assert table.data_frame["count"].dtype == "int64"
@@ -0,0 +1,167 @@
+import io
+import tracemalloc
+import zipfile
+
+from port.api.archives import NestedArchiveReader
+from port.api.file_utils import AsyncFileAdapter, proxy_stats
+
+
+class Buffer:
+    """Stands in for the ArrayBuffer JsProxy returned by the reader"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def to_py(self):
+        return memoryview(self.data)
+
+
+class FakeReader:
+    """Stands in for the file reader of py_worker.js and counts the calls into JavaScript"""
+
+    def __init__(self, data, name="export.zip"):
+        self.data = data
+        self.size = len(data)
+        self.name = name
+        self.calls = []
+
+    def readSlice(self, start, end):
+        self.calls.append(("readSlice", start, end))
+        return Buffer(self.data[start:end])
+
+
+class FakeBatchReader(FakeReader):
+    """Reader with the readSlices batch call"""
+
+    def readSlices(self, ranges):
+        self.calls.append(("readSlices", len(ranges) // 2))
+        return Buffer(b"".join(self.data[ranges[i] : ranges[i + 1]] for i in range(0, len(ranges), 2)))
+
+
+class TestPrefetch:
+    """Tests for fetching scattered ranges in a single call"""
+
+    def test_reads_inside_prefetched_ranges(self):
+        reader = FakeBatchReader(bytes(range(256)) * 4)
+        file = AsyncFileAdapter(reader)
+        assert file.prefetch([(10, 20), (100, 110), (15, 30)]) == 30
+        assert reader.calls == [("readSlices", 2)]
+
+        file.seek(12)
+        assert file.read(5) == bytes(range(12, 17))
+        file.seek(100)
+        assert file.read(10) == bytes(range(100, 110))
+        assert len(reader.calls) == 1
+
+        # Reads that are not inside a single prefetched range go to the reader
+        file.seek(25)
+        assert file.read(10) == bytes(range(25, 35))
+        assert reader.calls[-1] == ("readSlice", 25, 35)
+
+    def test_prefetch_replaces_earlier_ranges(self):
+        reader = FakeBatchReader(b"x" * 100)
+        file = AsyncFileAdapter(reader)
+        file.prefetch([(0, 10)])
+        file.prefetch([(50, 60)])
+        file.read(5)
+        assert reader.calls[-1] == ("readSlice", 0, 5)
+
+    def test_ranges_are_clamped(self):
+        file = AsyncFileAdapter(FakeBatchReader(b"abc"))
+        assert file.prefetch([(-5, 2), (2, 100), (5, 10)]) == 3
+        assert file.read() == b"abc"
+
+    def test_without_read_slices(self):
+        reader = FakeReader(b"abcdef")
+        file = AsyncFileAdapter(reader)
+        file.prefetch([(0, 2), (4, 6)])
+        assert [call[0] for call in reader.calls] == ["readSlice", "readSlice"]
+
+
+def test_zip_member_headers_are_prefetched():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+        for index in range(20):
+            zf.writestr(f"file_{index}.txt", f"content {index}".encode() * 100)
+    reader = FakeBatchReader(buffer.getvalue())
+
+    archive = NestedArchiveReader(AsyncFileAdapter(reader))
+    reader.calls.clear()
+    contents = [file.read() for _, file in archive.iter_members()]
+
+    assert contents == [f"content {index}".encode() * 100 for index in range(20)]
+    assert reader.calls[0] == ("readSlices", 20)
+    # Only the data of the members is read after the headers were prefetched
+    assert len(reader.calls) == 21
+
+
+class JsBuffer:
+    """Stands in for an ArrayBuffer JsProxy, which has to be destroyed"""
+
+    live = 0
+
+    def __init__(self, data):
+        self.data = data
+        self.byteLength = len(data)
+        JsBuffer.live += 1
+
+    def to_bytes(self):
+        return bytes(self.data)
+
+    def destroy(self):
+        JsBuffer.live -= 1
+
+
+class SoakReader:
+    """Reader of a file of the given size, every slice is a new buffer"""
+
+    name = "export.zip"
+
+    def __init__(self, size, block_size):
+        self.size = size
+        self.block = memoryview(bytes(block_size))
+        self.destroyed = False
+
+    def readSlice(self, start, end):
+        return JsBuffer(self.block[: end - start])
+
+    def destroy(self):
+        self.destroyed = True
+
+
+class TestProxyLifetime:
+    """Tests for destroying the buffers received from the file reader"""
+
+    def test_buffers_are_destroyed(self):
+        proxy_stats.reset()
+        reader = SoakReader(1000, 100)
+        with AsyncFileAdapter(reader) as file:
+            while file.read(100):
+                pass
+        assert JsBuffer.live == 0
+        # The ten buffers and the reader
+        assert (proxy_stats.created, proxy_stats.destroyed, proxy_stats.live) == (11, 11, 0)
+        assert (proxy_stats.bytes_held, proxy_stats.peak_bytes_held) == (0, 100)
+        assert reader.destroyed
+
+    def test_flat_memory_over_sequential_read(self):
+        block_size = 16 * 1024 * 1024
+        proxy_stats.reset()
+        file = AsyncFileAdapter(SoakReader(10 * 1024**3, block_size))
+        tracemalloc.start()
+        try:
+            total = 0
+            while data := file.read(block_size):
+                total += len(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert total == 10 * 1024**3
+        # The reader and the buffer that is copied
+        assert proxy_stats.peak_live == 2
+        assert proxy_stats.live == 1
+        assert proxy_stats.peak_bytes_held == block_size
+        file.close()
+        assert proxy_stats.live == 0
+        # Only the block that is read and the previous block are in memory at a time
+        assert peak < 3 * block_size
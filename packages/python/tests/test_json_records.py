@@ -0,0 +1,112 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from port.api.json_records import Projection, iter_frames, iter_records, parse_path, read_columns, read_frame
+
+RECORDS = [
+    {"time": "2024-01-01", "title": "first", "subtitles": [{"name": "channel a", "url": "x"}], "details": {"views": 3}},
+    {"time": "2024-01-02", "title": "séconde", "details": {"views": 1.5, "extra": [1, 2, 3]}},
+    {"time": "2024-01-03", "title": "third", "subtitles": [], "header": "YouTube"},
+]
+FIELDS = {"time": "time", "title": "title", "channel": "subtitles.0.name", "views": "details.views"}
+EXPECTED = {
+    "time": ["2024-01-01", "2024-01-02", "2024-01-03"],
+    "title": ["first", "séconde", "third"],
+    "channel": ["channel a", None, None],
+    "views": [3, 1.5, None],
+}
+
+
+def as_file(text):
+    return io.BytesIO(text.encode("utf-8"))
+
+
+class TestProjection:
+    """Tests for selecting fields of records"""
+
+    def test_parse_path(self):
+        assert parse_path("a.0.b") == ("a", 0, "b")
+        assert parse_path("a.-1") == ("a", -1)
+        assert parse_path(["a.b", 1]) == ("a.b", 1)
+
+    def test_extract(self):
+        projection = Projection(["title", "details.views", "details.extra.-1", "title.0"])
+        assert projection.columns == ["title", "details.views", "details.extra.-1", "title.0"]
+        assert projection.extract(RECORDS[1]) == ["séconde", 1.5, 3, None]
+
+    def test_digit_keys(self):
+        assert Projection({"value": "years.2024"}).extract({"years": {"2024": 7}}) == [7]
+
+    def test_no_fields(self):
+        with pytest.raises(ValueError):
+            Projection({})
+
+
+class TestReadColumns:
+    """Tests for reading projected columns from JSON files"""
+
+    @pytest.mark.parametrize("block_size", [1, 7, 1024 * 1024])
+    def test_array(self, block_size):
+        data = json.dumps(RECORDS, indent=2)
+        assert read_columns(as_file(data), FIELDS, block_size=block_size) == EXPECTED
+
+    @pytest.mark.parametrize("block_size", [3, 1024])
+    def test_json_lines(self, block_size):
+        data = "\n".join(json.dumps(record) for record in RECORDS) + "\n"
+        assert read_columns(as_file(data), FIELDS, block_size=block_size) == EXPECTED
+
+    def test_single_object(self):
+        assert read_columns(as_file(json.dumps(RECORDS[0])), ["title"]) == {"title": ["first"]}
+
+    @pytest.mark.parametrize("block_size", [5, 1024])
+    def test_records_path(self, block_size):
+        data = json.dumps({"version": 2, "meta": {"skip": [1, {"a": "]"}]}, "data": {"items": RECORDS}, "after": 1})
+        assert read_columns(as_file(data), FIELDS, records_path="data.items", block_size=block_size) == EXPECTED
+
+    def test_missing_records_path(self):
+        with pytest.raises(KeyError):
+            read_columns(as_file('{"data": []}'), FIELDS, records_path="items")
+
+    def test_text_file_and_bom(self):
+        assert read_columns(io.StringIO(json.dumps(RECORDS)), FIELDS) == EXPECTED
+        data = b"\xef\xbb\xbf" + json.dumps(RECORDS, ensure_ascii=False).encode("utf-8")
+        assert read_columns(io.BytesIO(data), FIELDS, block_size=2) == EXPECTED
+
+    def test_numbers_across_blocks(self):
+        data = "\n".join(str(10**12 + number) for number in range(3)) + "\n" + json.dumps({"n": 123456789})
+        assert list(iter_records(as_file(data), block_size=4)) == [10**12, 10**12 + 1, 10**12 + 2, {"n": 123456789}]
+
+    def test_skips_values_that_are_not_records(self):
+        assert read_columns(as_file('[1, {"title": "a"}, "x", null]'), ["title"]) == {"title": ["a"]}
+
+    def test_empty(self):
+        assert read_columns(as_file("[]"), ["title"]) == {"title": []}
+        assert read_columns(as_file(""), ["title"]) == {"title": []}
+
+    def test_invalid(self):
+        with pytest.raises(json.JSONDecodeError):
+            read_columns(as_file('[{"title": "a"} {"title": "b"}]'), ["title"])
+        with pytest.raises(json.JSONDecodeError):
+            read_columns(as_file('[{"title": "a"'), ["title"], block_size=4)
+
+    def test_limit(self):
+        assert read_columns(as_file(json.dumps(RECORDS)), ["title"], limit=2) == {"title": ["first", "séconde"]}
+
+
+class TestFrames:
+    """Tests for reading projected records as DataFrames"""
+
+    def test_same_as_json_normalize(self):
+        data = json.dumps(RECORDS)
+        expected = pd.json_normalize(json.loads(data))[["time", "title", "details.views"]]
+        result = read_frame(as_file(data), ["time", "title", "details.views"])
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_iter_frames(self):
+        data = json.dumps(RECORDS * 5)
+        frames = list(iter_frames(as_file(data), FIELDS, chunk_size=4))
+        assert [len(frame) for frame in frames] == [4, 4, 4, 3]
+        assert pd.concat(frames)["title"].tolist() == EXPECTED["title"] * 5
@@ -0,0 +1,223 @@
+import io
+import random
+import struct
+import wave
+import zipfile
+import zlib
+from datetime import datetime
+
+import pytest
+
+from port.api.archives import NestedArchiveReader
+from port.api.media import AUDIO, IMAGE, VIDEO, MediaFilter, media_format, media_kind, read_media_info
+from tests.test_sniff import make_tar
+
+
+def make_exif(taken):
+    # Big endian TIFF with DateTime in IFD0 and DateTimeOriginal in the EXIF IFD
+    text = taken.encode() + b"\x00"
+    ifd0 = struct.pack(">H", 2) + struct.pack(">HHI", 0x0132, 2, 20) + struct.pack(">I", 38)
+    ifd0 += struct.pack(">HHI", 0x8769, 4, 1) + struct.pack(">I", 58) + b"\x00" * 4
+    exif_ifd = struct.pack(">H", 1) + struct.pack(">HHI", 0x9003, 2, 20) + struct.pack(">I", 76) + b"\x00" * 4
+    tiff = b"MM\x00\x2a" + struct.pack(">I", 8) + ifd0 + b"2000:01:01 00:00:00\x00" + exif_ifd + text
+    return b"Exif\x00\x00" + tiff
+
+
+def make_jpeg(width, height, taken=None, payload=100_000):
+    data = b"\xff\xd8"
+    data += b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    if taken:
+        exif = make_exif(taken)
+        data += b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif
+    data += b"\xff\xdb" + struct.pack(">H", 67) + b"\x00" * 65
+    data += b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    data += b"\xff\xda" + struct.pack(">H", 8) + b"\x01\x01\x00\x00\x3f\x00"
+    return data + b"\x55" * payload + b"\xff\xd9"
+
+
+def make_png(width, height):
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return b"\x89PNG\r\n\x1a\n" + chunk + b"\x00" * 1000
+
+
+def box(box_type, data):
+    return struct.pack(">I4s", 8 + len(data), box_type) + data
+
+
+def make_mp4(width, height, seconds, created, payload=1_000_000, movie_first=False):
+    mvhd = box(b"mvhd", struct.pack(">B3xIIII", 0, created, created, 1000, int(seconds * 1000)) + b"\x00" * 80)
+    tkhd_video = struct.pack(">B3xIIIII8x4x4x36x", 0, created, created, 1, 0, 0) + struct.pack(">II", width << 16, height << 16)
+    tkhd_audio = struct.pack(">B3xIIIII8x4x4x36x", 0, created, created, 2, 0, 0) + struct.pack(">II", 0, 0)
+    moov = box(b"moov", mvhd + box(b"trak", box(b"tkhd", tkhd_audio)) + box(b"trak", box(b"tkhd", tkhd_video)))
+    ftyp = box(b"ftyp", b"isom\x00\x00\x02\x00isomiso2mp41")
+    mdat = box(b"mdat", random.Random(0).randbytes(payload))
+    # The movie header is at the end, after the media data, unless the file is made for streaming
+    return ftyp + moov + mdat if movie_first else ftyp + mdat + moov
+
+
+def make_wav(seconds, rate=8000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def make_avi(width, height, frames, frame_time):
+    avih = struct.pack("<10I", frame_time, 0, 0, 0, frames, 0, 1, 0, width, height) + b"\x00" * 16
+    hdrl = b"LIST" + struct.pack("<I", 4 + 8 + len(avih)) + b"hdrl" + b"avih" + struct.pack("<I", len(avih)) + avih
+    return b"RIFF" + struct.pack("<I", 4 + len(hdrl)) + b"AVI " + hdrl
+
+
+def make_flac(seconds, rate=44100):
+    bits = (rate << 44) | (1 << 41) | (15 << 36) | int(seconds * rate)
+    streaminfo = struct.pack(">HH3s3s", 4096, 4096, b"\x00" * 3, b"\x00" * 3) + struct.pack(">Q", bits) + b"\x00" * 16
+    return b"fLaC" + bytes([0x80]) + len(streaminfo).to_bytes(3, "big") + streaminfo
+
+
+class CountingFile(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class TestMediaInfo:
+    """Tests for the metadata read from media headers"""
+
+    def test_jpeg_with_exif(self):
+        file = CountingFile(make_jpeg(4032, 3024, taken="2023:07:14 18:30:05"))
+        info = read_media_info(file)
+        assert (info.kind, info.format, info.width, info.height) == (IMAGE, "jpeg", 4032, 3024)
+        assert info.taken == datetime(2023, 7, 14, 18, 30, 5)
+        assert file.bytes_read < 1000
+
+    def test_jpeg_without_exif(self):
+        info = read_media_info(io.BytesIO(make_jpeg(640, 480)))
+        assert (info.width, info.height, info.taken) == (640, 480, None)
+
+    def test_png(self):
+        info = read_media_info(io.BytesIO(make_png(1080, 1920)))
+        assert (info.kind, info.format, info.width, info.height) == (IMAGE, "png", 1080, 1920)
+
+    def test_gif(self):
+        info = read_media_info(io.BytesIO(b"GIF89a" + struct.pack("<HH", 320, 240) + b"\x00" * 100))
+        assert (info.format, info.width, info.height) == ("gif", 320, 240)
+
+    def test_webp(self):
+        vp8x = b"VP8X" + struct.pack("<I", 10) + b"\x00" * 4 + (1919).to_bytes(3, "little") + (1079).to_bytes(3, "little")
+        info = read_media_info(io.BytesIO(b"RIFF" + struct.pack("<I", 100) + b"WEBP" + vp8x + b"\x00" * 100))
+        assert (info.format, info.width, info.height) == ("webp", 1920, 1080)
+
+    def test_mp4_with_movie_at_end(self):
+        created = int((datetime(2022, 5, 1, 12, 0, 0) - datetime(1904, 1, 1)).total_seconds())
+        file = CountingFile(make_mp4(1920, 1080, 12.5, created))
+        info = read_media_info(file)
+        assert (info.kind, info.format, info.width, info.height) == (VIDEO, "mp4", 1920, 1080)
+        assert info.duration == 12.5
+        assert info.taken == datetime(2022, 5, 1, 12, 0, 0)
+        assert file.bytes_read < 1000
+
+    def test_wav(self):
+        info = read_media_info(io.BytesIO(make_wav(2.5)))
+        assert (info.kind, info.format, info.duration) == (AUDIO, "wav", 2.5)
+
+    def test_avi(self):
+        info = read_media_info(io.BytesIO(make_avi(640, 480, 250, 40000)))
+        assert (info.kind, info.width, info.height, info.duration) == (VIDEO, 640, 480, 10.0)
+
+    def test_flac(self):
+        info = read_media_info(io.BytesIO(make_flac(3)))
+        assert (info.kind, info.format, info.duration) == (AUDIO, "flac", 3.0)
+
+    def test_truncated_headers(self):
+        info = read_media_info(io.BytesIO(make_jpeg(640, 480, taken="2023:07:14 18:30:05")[:60]))
+        assert (info.format, info.width) == ("jpeg", None)
+
+    def test_not_media(self):
+        assert read_media_info(io.BytesIO(b'{"a": 1}')) is None
+        assert read_media_info(io.BytesIO(b"unknown"), name="clip.mkv").kind == VIDEO
+
+    def test_kind_and_format(self):
+        assert media_kind("Photos/IMG_0001.JPG") == IMAGE
+        assert media_kind("watch-history.json") is None
+        assert media_format(make_mp4(1, 1, 1, 0, payload=0)[:32]) == "mp4"
+        assert media_format(b"ID3\x04") == "mp3"
+
+
+class TestMediaFilter:
+    """Tests for skipping media members of archives"""
+
+    FILES = {
+        "Takeout/photos/IMG_0001.jpg": make_jpeg(4032, 3024, payload=300_000),
+        "Takeout/videos/clip.mp4": make_mp4(1920, 1080, 3, 0, payload=500_000),
+        "memories/5f1e9a8c": make_jpeg(1080, 1920, payload=300_000),
+        "Takeout/watch-history.json": b'[{"title": "Video"}]',
+        "notes": b"no extension, not media",
+    }
+
+    def make_zip(self, compression):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", compression) as zf:
+            for name, data in self.FILES.items():
+                zf.writestr(name, data)
+        return buffer.getvalue()
+
+    @pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+    def test_media_are_skipped(self, compression):
+        file = CountingFile(self.make_zip(compression))
+        reader = NestedArchiveReader(file, skip=MediaFilter())
+        contents = {member.path: data.read() for member, data in reader.iter_members()}
+        assert contents == {"Takeout/watch-history.json": b'[{"title": "Video"}]', "notes": b"no extension, not media"}
+        assert [member.path for member in reader.skipped] == ["Takeout/photos/IMG_0001.jpg", "Takeout/videos/clip.mp4", "memories/5f1e9a8c"]
+        # The central directory, a few headers and the other members are read, not the media
+        assert file.bytes_read < 100_000
+
+    def test_skip_only_some_kinds(self):
+        reader = NestedArchiveReader(io.BytesIO(self.make_zip(zipfile.ZIP_STORED)), skip=MediaFilter(kinds=[VIDEO], peek_unknown=False))
+        names = [member.path for member, _ in reader.iter_members()]
+        assert "Takeout/photos/IMG_0001.jpg" in names and "memories/5f1e9a8c" in names
+        assert "Takeout/videos/clip.mp4" not in names
+
+    def test_media_in_tarball_are_skipped(self):
+        reader = NestedArchiveReader(io.BytesIO(make_tar(self.FILES, "w:gz")), skip=MediaFilter())
+        assert [member.path for member, _ in reader.iter_members()] == ["Takeout/watch-history.json", "notes"]
+
+    def test_media_info_of_members(self):
+        file = CountingFile(self.make_zip(zipfile.ZIP_STORED))
+        reader = NestedArchiveReader(file)
+        reader.members()
+        file.bytes_read = 0
+        info = reader.media_info("Takeout/videos/clip.mp4")
+        assert (info.width, info.height, info.duration) == (1920, 1080, 3.0)
+        assert reader.media_info("memories/5f1e9a8c").width == 1080
+        assert reader.media_info("Takeout/watch-history.json") is None
+        assert file.bytes_read < 10_000
+
+    @pytest.mark.parametrize("movie_first", [False, True])
+    def test_media_info_of_compressed_members(self, movie_first, monkeypatch):
+        data = make_mp4(1920, 1080, 3, 0, payload=2_000_000, movie_first=movie_first)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("clip.mp4", data)
+        file = CountingFile(buffer.getvalue())
+        reader = NestedArchiveReader(file)
+        reader.members()
+        opened = []
+        open_member = reader.open
+        monkeypatch.setattr(reader, "open", lambda member: opened.append(open_member(member)) or opened[-1])
+        file.bytes_read = 0
+
+        info = reader.media_info("clip.mp4")
+        assert info.format == "mp4"
+        # The headers after the media data are not read, which would decompress the whole member
+        assert info.width == (1920 if movie_first else None)
+        assert file.bytes_read < 100_000
+        assert opened[0].closed
@@ -0,0 +1,73 @@
+import port.api.props as props
+from port.api.memo import StaticProps, static
+from port.api.memory import MemoryGovernor, get_governor, set_governor
+from port.script import prompt_file, render_data_submission_page, retry_confirmation
+
+
+class TestStatic:
+    """Tests for memoizing static props"""
+
+    def test_same_props_per_arguments(self):
+        calls = []
+
+        @static
+        def prompt(extensions):
+            calls.append(extensions)
+            return props.PropsUIPromptFileInput(props.Translatable({"en": "Select", "nl": "Kies"}), extensions)
+
+        first = prompt(".zip")
+        assert prompt(".zip") is first
+        assert prompt(".json") is not first
+        assert calls == [".zip", ".json"]
+        assert isinstance(first, StaticProps)
+        assert first.extensions == ".zip"
+
+    def test_to_dict_is_computed_once(self):
+        serialized = []
+
+        class Props:
+            def toDict(self):
+                serialized.append(1)
+                return {"__type__": "Props"}
+
+        static_props = StaticProps(Props())
+        assert static_props.toDict() is static_props.toDict()
+        assert len(serialized) == 1
+
+    def test_least_recently_used_entries_are_dropped(self):
+        calls = []
+
+        @static(max_entries=2)
+        def text(value):
+            calls.append(value)
+            return props.Translatable({"en": value, "nl": value})
+
+        text("a"), text("b"), text("a"), text("c"), text("a"), text("b")
+        assert calls == ["a", "b", "c", "b"]
+
+    def test_no_cache_when_memory_is_critical(self):
+        calls = []
+
+        @static
+        def text():
+            calls.append(1)
+            return props.Translatable({"en": "a", "nl": "a"})
+
+        governor = get_governor()
+        set_governor(MemoryGovernor(budget=100, sampler=lambda: 95))
+        try:
+            text(), text()
+        finally:
+            set_governor(governor)
+        assert len(calls) == 2
+
+
+def test_script_pages_are_memoized():
+    assert retry_confirmation() is retry_confirmation()
+    assert prompt_file(".zip") is prompt_file(".zip")
+    first = render_data_submission_page([prompt_file(".zip")]).toDict()["page"]
+    second = render_data_submission_page([prompt_file(".zip")]).toDict()["page"]
+    assert first == second
+    assert first["header"] is second["header"]
+    assert first["body"][0] is second["body"][0]
+    assert first["body"][0]["__type__"] == "PropsUIPromptFileInput"
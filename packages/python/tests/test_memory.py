@@ -0,0 +1,151 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from port.api import memory
+from port.api.commands import CommandUIAppend, CommandUIRender
+from port.api.memory import CRITICAL, OK, WARNING, MemoryGovernor
+from port.api.props import PropsUIPromptConsentFormTable, Translatable
+from port.main import ScriptWrapper
+
+
+class FakeHeap:
+    def __init__(self, used=0):
+        self.used = used
+
+    def __call__(self):
+        return self.used
+
+
+@pytest.fixture
+def heap():
+    heap = FakeHeap()
+    previous = memory._governor
+    memory.set_governor(MemoryGovernor(budget=1000, sampler=heap))
+    yield heap
+    memory.set_governor(previous)
+
+
+def payload(type):
+    return SimpleNamespace(__type__=type, value=None)
+
+
+def page(name):
+    return CommandUIRender(SimpleNamespace(toDict=lambda: {"__type__": name}))
+
+
+def script():
+    yield page("First")
+    yield page("Second")
+
+
+class TestMemoryGovernor:
+    """Tests for the memory budget"""
+
+    def test_no_budget_never_samples(self):
+        def sampler():
+            raise AssertionError("sampled")
+
+        governor = MemoryGovernor(sampler=sampler)
+        assert governor.state() == OK
+        assert governor.available() is None
+        assert governor.block_size(8 * 1024 * 1024) == 8 * 1024 * 1024
+
+    def test_states(self, heap):
+        governor = memory.get_governor()
+        assert governor.state() == OK
+        heap.used = 700
+        assert governor.state() == WARNING
+        heap.used = 950
+        assert governor.state() == CRITICAL
+        assert governor.peak == 950
+
+    def test_limits_adapt(self, heap):
+        governor = memory.get_governor()
+        assert governor.max_rows(10000) == 10000
+        heap.used = 800
+        assert governor.block_size(8 * 1024 * 1024) == 4 * 1024 * 1024
+        assert governor.max_rows(10000) == 5000
+        assert governor.cache_size(100) == 50
+        heap.used = 950
+        assert governor.block_size(8 * 1024 * 1024) == 2 * 1024 * 1024
+        assert governor.max_rows(10000) == 2500
+        assert governor.cache_size(100) == 0
+        assert not governor.can_allocate(100)
+
+    def test_table_keeps_fewer_rows_under_pressure(self, heap):
+        heap.used = 800
+        table = PropsUIPromptConsentFormTable(
+            id="test",
+            number=1,
+            title=Translatable({"en": "Test", "nl": "Test"}),
+            description=Translatable({"en": "Test", "nl": "Test"}),
+            data_frame=pd.DataFrame({"col": range(1000)}),
+            data_frame_max_size=1000,
+        )
+        assert len(table.data_frame) == 500
+
+
+class TestScriptWrapperMemory:
+    """Tests for the memory warnings of the script wrapper"""
+
+    def test_no_warning_when_memory_is_ok(self, heap):
+        wrapper = ScriptWrapper(script())
+        assert wrapper.send(None)["page"]["__type__"] == "First"
+
+    def test_warning_before_command(self, heap):
+        heap.used = 800
+        wrapper = ScriptWrapper(script())
+        warning = wrapper.send(None)
+        assert warning["__type__"] == "CommandUIRender"
+        assert warning["page"]["body"][0]["__type__"] == "PropsUIPromptConfirm"
+        assert wrapper.send(payload("PayloadTrue"))["page"]["__type__"] == "First"
+        # the warning is shown once
+        assert wrapper.send(payload("PayloadVoid"))["page"]["__type__"] == "Second"
+
+    def test_warning_waits_for_next_page(self, heap):
+        def streaming_script():
+            yield page("Consent")
+            heap.used = 800
+            yield CommandUIAppend("table", "{}", done=True)
+            yield page("End")
+
+        wrapper = ScriptWrapper(streaming_script())
+        assert wrapper.send(None)["page"]["__type__"] == "Consent"
+        assert wrapper.send(payload("PayloadVoid"))["__type__"] == "CommandUIAppend"
+        assert wrapper.send(payload("PayloadJSON"))["page"]["platform"] == "Memory"
+        assert wrapper.send(payload("PayloadTrue"))["page"]["__type__"] == "End"
+
+    def test_answer_after_forwarded_warning_reaches_script(self, heap):
+        answers = []
+
+        def page_script():
+            answers.append((yield page("Page")))
+
+        heap.used = 800
+        wrapper = ScriptWrapper(page_script())
+        wrapper.add_log_handler("port.main")
+        try:
+            assert wrapper.send(None)["__type__"] == "CommandUIRender"
+            assert wrapper.send(payload("PayloadTrue"))["__type__"] == "CommandSystemLog"
+            assert wrapper.send(payload("PayloadVoid"))["page"]["__type__"] == "Page"
+            wrapper.send(payload("PayloadJSON"))
+        finally:
+            wrapper.remove_log_handlers()
+        assert [answer.__type__ for answer in answers] == ["PayloadJSON"]
+
+    def test_stop_after_warning(self, heap):
+        heap.used = 800
+        wrapper = ScriptWrapper(script())
+        wrapper.send(None)
+        assert wrapper.send(payload("PayloadFalse"))["__type__"] == "CommandSystemExit"
+
+    def test_memory_error_renders_page_and_exits(self, heap):
+        def failing_script():
+            raise MemoryError
+            yield
+
+        wrapper = ScriptWrapper(failing_script())
+        assert wrapper.send(None)["__type__"] == "CommandUIRender"
+        assert wrapper.send(payload("PayloadTrue"))["__type__"] == "CommandSystemExit"
@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+from port.api.redaction import Redactor, pseudonymize, pseudonymize_frame
+
+
+class TestRedactor:
+    """Tests for redacting personal information"""
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("mail jan.jansen+chat@mail.example.nl today", "mail [email] today"),
+            ("see https://example.com/a?b=1, or www.example.org", "see [url] or [url]"),
+            ("call +31 6 12345678 or (020) 123 4567 or 06-12345678", "call [phone] or [phone] or [phone]"),
+            ("on 2025-01-01 at 10:00, order 1234567890 costs 0.5", "on 2025-01-01 at 10:00, order 1234567890 costs 0.5"),
+            (
+                "call 555-123-4567, (555) 123-4567, 555.123.4567 or 1-555-123-4567",
+                "call [phone], [phone], [phone] or [phone]",
+            ),
+        ],
+    )
+    def test_default_patterns(self, text, expected):
+        assert Redactor().redact_text(text) == expected
+
+    @pytest.mark.parametrize(
+        "text", ["01-02-2023", "01.02.2023", "born 05-11-98", "id 0123456789", "id 5551234567", "on 2023-01-02 10:00:00"]
+    )
+    def test_dates_and_ids_are_not_phone_numbers(self, text):
+        assert Redactor().redact_text(text) == text
+
+    def test_names_are_whole_words_in_any_case(self):
+        redactor = Redactor(names=["Anna", "Jan de Vries"])
+        assert redactor.redact_text("ANNA met jan de vries, not Annabel") == "[name] met [name], not Annabel"
+
+    def test_redact_series_keeps_missing_values_and_dtype(self):
+        values = pd.Series(["a@b.com", None, "hello", "a@b.com"], name="text")
+        result = Redactor().redact(values)
+        assert result.tolist()[::2] == ["[email]", "hello"]
+        assert pd.isna(result[1])
+        assert result[3] == "[email]"
+        assert result.dtype == values.dtype
+        assert result.name == "text"
+
+    def test_redact_frame_only_touches_text(self):
+        frame = pd.DataFrame({"text": ["x@y.com", "ok"], "count": [1, 2]})
+        result = Redactor(replacement="***").redact_frame(frame)
+        assert result["text"].tolist() == ["***", "ok"]
+        assert result["count"].tolist() == [1, 2]
+        assert frame["text"][0] == "x@y.com"
+
+    def test_count(self):
+        assert Redactor(names=["Anna"]).count(["anna: x@y.com www.a.nl", None]) == {
+            "email": 1,
+            "url": 1,
+            "phone": 0,
+            "name": 1,
+        }
+
+
+class TestPseudonymize:
+    """Tests for salted pseudonyms"""
+
+    def test_equal_values_get_equal_pseudonyms(self):
+        result = pseudonymize(pd.Series(["alice", "bob", None, "alice"]), "salt")
+        assert result[0] == result[3]
+        assert result[0] != result[1]
+        assert len(result[0]) == 16
+        assert pd.isna(result[2])
+
+    def test_salt_changes_pseudonyms(self):
+        assert pseudonymize(["alice"], "a")[0] != pseudonymize(["alice"], "b")[0]
+
+    def test_salt_is_required(self):
+        with pytest.raises(ValueError):
+            pseudonymize(["alice"], "")
+
+    def test_frame(self):
+        frame = pd.DataFrame({"user": ["alice", "bob"], "text": ["hi", "yo"]})
+        result = pseudonymize_frame(frame, ["user"], b"salt", digest_size=4)
+        assert [len(value) for value in result["user"]] == [8, 8]
+        assert result["text"].tolist() == ["hi", "yo"]
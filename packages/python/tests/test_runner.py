@@ -0,0 +1,109 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+import port.script
+from port.api import memory
+from port.api.file_utils import MmapFileAdapter
+from port.api.memory import MemoryGovernor
+from port.runner import main, run
+from port.script import process
+from port.script_custom_ui import process as process_custom_ui
+
+
+@pytest.fixture
+def export(tmp_path):
+    path = tmp_path / "export.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("a.json", '{"key": "value"}')
+        zf.writestr("b.txt", "b" * 1000)
+    return str(path)
+
+
+class TestMmapFileAdapter:
+    """Tests for reading local files through a memory map"""
+
+    def test_same_interface_as_file(self, tmp_path):
+        path = tmp_path / "data.bin"
+        path.write_bytes(b"0123456789")
+        with MmapFileAdapter(str(path)) as file:
+            assert (file.name, file.size) == ("data.bin", 10)
+            assert file.read(3) == b"012"
+            file.seek(-2, io.SEEK_END)
+            assert file.read() == b"89"
+            assert file.read() == b""
+        with pytest.raises(ValueError):
+            file.read()
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "empty"
+        path.write_bytes(b"")
+        assert MmapFileAdapter(str(path)).read() == b""
+
+
+class TestRunner:
+    """Tests for running port.script headless"""
+
+    def test_donates_file_list(self, export):
+        result = run(process, [export])
+        assert result.exit_code == 0
+        donation = json.loads(result.donations["headless-zip-contents-example"])
+        filenames = [row["filename"] for row in donation["zip_content"]["data"]]
+        assert filenames == ["a.json", "b.txt"]
+        assert any(step.command == "CommandUIAppend" for step in result.steps)
+        assert result.logs
+
+    def test_proxy_stats_are_logged_before_exit(self, export):
+        result = run(process, [export])
+        assert result.logs[-1][0] == "debug"
+        assert result.logs[-1][1].startswith("End of script, proxies:")
+        assert result.steps[-1].command == "CommandSystemExit"
+
+    def test_custom_ui_donates_file_list(self, export):
+        result = run(process_custom_ui, [export])
+        assert result.exit_code == 0
+        donation = json.loads(result.donations["headless-zip-contents-example"])
+        filenames = [row["filename"] for row in donation["zip_content"]["data"]]
+        assert filenames == ["a.json", "b.txt"]
+
+    def test_memory_warning_while_streaming(self, export, monkeypatch):
+        heap = [0]
+        extract_file = port.script.extract_file
+
+        def filling_extract_file(zipfile_ref, filename):
+            # Memory runs low after the consent page is shown with the first file
+            if filename != "a.json":
+                heap[0] = 95
+            return extract_file(zipfile_ref, filename)
+
+        monkeypatch.setattr(port.script, "extract_file", filling_extract_file)
+        previous = memory._governor
+        memory.set_governor(MemoryGovernor(budget=100, sampler=lambda: heap[0]))
+        try:
+            result = run(process, [export])
+        finally:
+            memory.set_governor(previous)
+        assert result.exit_code == 0
+        donation = json.loads(result.donations["headless-zip-contents-example"])
+        assert [row["filename"] for row in donation["zip_content"]["data"]] == ["a.json", "b.txt"]
+
+    def test_decline(self, export):
+        result = run(process, [export], ["decline"])
+        assert json.loads(result.donations["headless-zip-contents-example"]) == '{"status" : "data_submission declined"}'
+
+    def test_stops_without_file(self):
+        result = run(process)
+        assert result.exit_code is None
+        assert result.exit_info == "No file left to select"
+
+    def test_invalid_response(self, export):
+        with pytest.raises(ValueError):
+            run(process, [export], ["maybe"])
+
+    def test_cli(self, export, tmp_path, capsys):
+        output = tmp_path / "donations"
+        assert main([export, "--output", str(output)]) == 0
+        assert (output / "headless-zip-contents-example.json").exists()
+        assert "exit: 0" in capsys.readouterr().out
@@ -0,0 +1,78 @@
+from port.api.scheduler import Scheduler
+
+
+class Clock:
+    """Clock that advances by the seconds of work done"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(generator, payload="ok"):
+    """Drive a generator like the ScriptWrapper, return the yielded commands and the return value."""
+    yielded = []
+    try:
+        command = next(generator)
+        while True:
+            yielded.append(command)
+            command = generator.send(payload)
+    except StopIteration as stop:
+        return yielded, stop.value
+
+
+class TestScheduler:
+    """Tests for yielding progress pages once per time budget"""
+
+    def make_scheduler(self, clock, budget=0.25):
+        return Scheduler(lambda done, total, unit: ("progress", done, total, unit), budget, clock)
+
+    def test_map_yields_per_time_budget(self):
+        clock = Clock()
+        scheduler = self.make_scheduler(clock)
+
+        def work(unit):
+            clock.now += 0.0625
+            return unit * 2
+
+        yielded, results = run(scheduler.map(work, list(range(20))))
+        assert results == [unit * 2 for unit in range(20)]
+        # The first unit and then every fourth unit, when 0.25 seconds of work are done
+        assert yielded == [("progress", done, 20, done) for done in range(0, 20, 4)]
+        assert scheduler.yields == 5
+
+    def test_slow_units_yield_every_time(self):
+        clock = Clock()
+        scheduler = self.make_scheduler(clock)
+
+        def work(unit):
+            clock.now += 1
+
+        yielded, _ = run(scheduler.map(work, iter(range(3))))
+        assert yielded == [("progress", 0, None, 0), ("progress", 1, None, 1), ("progress", 2, None, 2)]
+
+    def test_checkpoint_in_a_process_generator(self):
+        clock = Clock()
+        scheduler = self.make_scheduler(clock)
+
+        def process():
+            payloads = []
+            for index in range(10):
+                payloads.append((yield from scheduler.checkpoint(index, 10)))
+                clock.now += 0.125
+            yield "done"
+            return payloads
+
+        yielded, payloads = run(process())
+        assert yielded == [("progress", 2, 10, None), ("progress", 4, 10, None), ("progress", 6, 10, None), ("progress", 8, 10, None), "done"]
+        assert payloads == [None, None, "ok", None, "ok", None, "ok", None, "ok", None]
+
+    def test_reset_starts_a_new_slice(self):
+        clock = Clock()
+        scheduler = self.make_scheduler(clock)
+        clock.now = 1.0
+        assert scheduler.due()
+        scheduler.reset()
+        assert not scheduler.due()
@@ -0,0 +1,135 @@
+import pandas as pd
+import pytest
+
+from types import SimpleNamespace
+
+from port.api import search
+from port.api.commands import CommandSystemDonate, CommandUIRender
+from port.api.memory import MemoryGovernor, get_governor, set_governor
+from port.api.props import (
+    PropsUIHeader,
+    PropsUIPageDataSubmission,
+    PropsUIPromptConsentForm,
+    PropsUIPromptConsentFormTable,
+    PropsUIPromptText,
+    Translatable,
+)
+from port.api.search import SearchIndex
+from port.main import ScriptWrapper
+
+
+def make_index(data_frame):
+    return SearchIndex.from_json(data_frame.to_json())
+
+
+@pytest.fixture(autouse=True)
+def clear_indexes():
+    yield
+    search.clear()
+
+
+class TestSearchIndex:
+    """Tests for answering the search bar of consent tables in the worker"""
+
+    def test_all_words_must_match(self):
+        df = pd.DataFrame({"title": ["Cat videos", "Dog videos", "Cat pictures"], "channel": ["pets", "pets", "photos"]})
+        index = make_index(df)
+        assert index.search(["cat"]) == ["0", "2"]
+        assert index.search(["VIDEOS", "cat"]) == ["0"]
+        assert index.search(["bird"]) == []
+
+    def test_substrings_and_columns(self):
+        df = pd.DataFrame({"title": ["Cat videos", "Dog videos"], "channel": ["pets", "photos"]})
+        index = make_index(df)
+        assert index.search(["vid", "phot"]) == ["1"]
+        assert index.search("videos pets") == ["0"]
+
+    def test_words_do_not_match_across_rows(self):
+        index = make_index(pd.DataFrame({"text": ["ab", "cd"]}))
+        assert index.search(["b\nc"]) == []
+        assert index.search(["bc"]) == []
+
+    def test_line_breaks_in_cells(self):
+        index = make_index(pd.DataFrame({"text": ["first\nline\nend", "İstanbul\nline"], "more": ["line", "x"]}))
+        assert index.search(["line"]) == ["0", "1"]
+        assert index.search(["x"]) == ["1"]
+
+    def test_empty_query_matches_all_rows(self):
+        index = make_index(pd.DataFrame({"text": ["a", "b"]}, index=[5, 9]))
+        assert index.search([""]) == ["5", "9"]
+        assert index.search([]) == ["5", "9"]
+
+    def test_cells_as_shown_in_the_browser(self):
+        df = pd.DataFrame({"count": [1.0, 2.5, None], "flag": [True, False, True]})
+        index = make_index(df)
+        assert index.search(["1", "true"]) == ["0"]
+        assert index.search(["2.5"]) == ["1"]
+        assert index.search(["null"]) == ["2"]
+
+    def test_large_table(self):
+        df = pd.DataFrame({"text": [f"row {i} text" for i in range(100000)]})
+        index = make_index(df)
+        assert index.search(["row", "99999"]) == ["99999"]
+        assert len(index.search(["9999"])) == 19
+
+
+class TestTableIndex:
+    """Tests for the indexes of the consent tables sent to the browser"""
+
+    text = Translatable({"en": "t", "nl": "t"})
+
+    def make_table(self, **kwargs):
+        df = pd.DataFrame({"text": ["alpha", "beta"]})
+        return PropsUIPromptConsentFormTable("table", 1, self.text, self.text, df, **kwargs)
+
+    def make_page(self, body):
+        return PropsUIPageDataSubmission("test", PropsUIHeader(self.text), body)
+
+    def render(self, body):
+        page = self.make_page(body)
+        search.index_page(page, page.toDict())
+
+    def test_table_is_indexed_when_rendered(self):
+        table = self.make_table()
+        table.toDict()
+        assert search.search("table", ["beta"]) is None
+        self.render([PropsUIPromptText(self.text), PropsUIPromptConsentForm([table])])
+        assert search.search("table", ["beta"]) == ["1"]
+
+    def test_table_by_itself(self):
+        self.render(self.make_table())
+        assert search.search("table", ["beta"]) == ["1"]
+
+    def test_table_not_searchable(self):
+        self.render(PropsUIPromptConsentForm([self.make_table(searchable=False)]))
+        assert search.search("table", ["beta"]) is None
+
+    def test_wrapper_drops_indexes_of_pages_no_longer_shown(self):
+        def script():
+            yield CommandUIRender(self.make_page(PropsUIPromptConsentForm([self.make_table()])))
+            yield CommandUIRender(self.make_page(PropsUIPromptConsentForm([self.make_table()])))
+            yield CommandUIRender(self.make_page(PropsUIPromptText(self.text)))
+            yield CommandUIRender(self.make_page(PropsUIPromptConsentForm([self.make_table()])))
+            yield CommandSystemDonate("key", "{}")
+
+        wrapper = ScriptWrapper(script())
+        answer = SimpleNamespace(__type__="PayloadVoid", value=None)
+        wrapper.send(None)
+        assert search.search("table", ["beta"]) == ["1"]
+        wrapper.send(answer)
+        assert len(search._indexes) == 1
+        wrapper.send(answer)
+        assert search.search("table", ["beta"]) is None
+        wrapper.send(answer)
+        assert search.search("table", ["beta"]) == ["1"]
+        wrapper.send(answer)
+        assert search.search("table", ["beta"]) is None
+
+    def test_no_index_when_memory_is_critical(self):
+        governor = get_governor()
+        set_governor(MemoryGovernor(budget=100, sampler=lambda: 95))
+        try:
+            self.render(PropsUIPromptConsentForm([self.make_table()]))
+        finally:
+            set_governor(governor)
+        assert search.search("table", ["beta"]) is None
@@ -0,0 +1,53 @@
+import json
+
+import pandas as pd
+
+import port.api.props as props
+from port.api.commands import CommandSystemExit, CommandUIRender
+from port.api.serialization import RawJSON, to_json
+from port.main import ScriptWrapper
+
+
+def consent_page():
+    text = props.Translatable({"en": "Tëxt \"quoted\"", "nl": "Tekst"})
+    df = pd.DataFrame({"name": ["a", "b\n", None], "size": [1.5, 2.0, float("nan")]})
+    table = props.PropsUIPromptConsentFormTable("table", 1, text, text, df, searchable=False)
+    page = props.PropsUIPageDataSubmission("platform", props.PropsUIHeader(text), [table])
+    return CommandUIRender(page)
+
+
+class TestToJson:
+    """Tests for serializing commands to a single JSON string"""
+
+    def test_same_command_as_to_dict(self):
+        command = consent_page()
+        expected = command.toDict()
+        table = expected["page"]["body"][0]
+        table["data_frame"] = json.loads(table["data_frame"])
+        assert json.loads(to_json(command)) == expected
+
+    def test_raw_values_are_embedded(self):
+        value = {"a": RawJSON('{"x": [1, 2]}'), "b": ["c", RawJSON("null")]}
+        assert to_json(value) == '{"a":{"x": [1, 2]},"b":["c",null]}'
+
+    def test_without_raw_values(self):
+        assert json.loads(to_json(CommandSystemExit(0, "End of script"))) == {
+            "__type__": "CommandSystemExit",
+            "code": 0,
+            "info": "End of script",
+        }
+
+    def test_raw_json_is_a_string_in_dicts(self):
+        table = consent_page().toDict()["page"]["body"][0]
+        assert isinstance(table["data_frame"], str)
+        assert json.loads(table["data_frame"])["name"] == {"0": "a", "1": "b\n", "2": None}
+
+
+def test_script_wrapper_send_json():
+    def script():
+        yield consent_page()
+
+    wrapper = ScriptWrapper(script())
+    command = json.loads(wrapper.send_json(None))
+    assert command["page"]["body"][0]["data_frame"]["size"] == {"0": 1.5, "1": 2.0, "2": None}
+    assert json.loads(wrapper.send_json(None))["__type__"] == "CommandSystemExit"
@@ -0,0 +1,37 @@
+import zipfile
+
+from port.simulator import percentiles, simulate, simulate_session
+
+
+def make_corpus(tmp_path):
+    for count in (2, 5):
+        with zipfile.ZipFile(tmp_path / f"export_{count}.zip", "w") as zf:
+            for i in range(count):
+                zf.writestr(f"file_{i}.json", "{}")
+    return [str(tmp_path)]
+
+
+class TestSimulator:
+    """Tests for replaying sessions over a corpus"""
+
+    def test_percentiles(self):
+        assert percentiles(range(1, 101)) == {50: 50, 90: 90, 99: 99}
+        assert percentiles([3]) == {50: 3, 90: 3, 99: 3}
+        assert percentiles([]) == {50: None, 90: None, 99: None}
+
+    def test_session(self, tmp_path):
+        path = make_corpus(tmp_path)[0] + "/export_2.zip"
+        session = simulate_session("session-0", path)
+        assert session.error is None
+        assert session.exit_code == 0
+        assert session.peak_memory > 0
+        # The consent page is shown after the first file, the second file takes less than
+        # the time budget of an append and is sent with the last one
+        assert sum(1 for name, _ in session.steps if name == "CommandUIAppend") == 1
+
+    def test_simulate(self, tmp_path):
+        report = simulate(make_corpus(tmp_path), sessions=4, workers=2, trace_memory=False)
+        assert len(report.sessions) == 4
+        assert not report.errors()
+        assert [count for _, _, count, _ in report.by_export()] == [2, 5]
+        assert "throughput" in report.format()
@@ -0,0 +1,108 @@
+import bz2
+import gzip
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from port.api.archives import ArchiveError, NestedArchiveReader
+from port.api.file_utils import AsyncFileAdapter
+from port.api.sniff import CORRUPTED, CSV, GZIP, HTML, JSON, TAR, UNKNOWN, ZIP, sniff
+from tests.test_file_utils import FakeReader
+
+
+def make_zip(files, comment=b""):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+        zf.comment = comment
+    return buffer.getvalue()
+
+
+def make_tar(files, mode="w"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+RECORDS = json.dumps([{"time": "2024-01-01", "title": f"Video {i}"} for i in range(2000)]).encode()
+
+
+class TestSniff:
+    """Tests for the classification of uploaded files"""
+
+    @pytest.mark.parametrize(
+        "data, kind",
+        [
+            (make_zip({"a.json": RECORDS}), ZIP),
+            (make_zip({}), ZIP),
+            (make_zip({"a.json": RECORDS}, comment=b"x" * 1000), ZIP),
+            (b"MZ stub" + make_zip({"a.json": b"[]"}), ZIP),
+            (make_tar({"a.json": RECORDS}), TAR),
+            (make_tar({"a.json": RECORDS}, "w:gz"), TAR),
+            (bz2.compress(make_tar({"a.json": b"[]"})), TAR),
+            (gzip.compress(RECORDS), GZIP),
+            (RECORDS, JSON),
+            (b"\xef\xbb\xbf  " + RECORDS + b"\n", JSON),
+            (b'{"a": 1}\n{"a": 2}\n', JSON),
+            (b"<!DOCTYPE html><html><body>Download your data</body></html>", HTML),
+            (b"\n<html lang='en'><head></head></html>", HTML),
+            (b"time,title\n2024-01-01,Video\n2024-01-02,Other video\n", CSV),
+            (b"time;title\n2024-01-01;Video\n", CSV),
+            (b"just some notes\nwithout any structure\n", UNKNOWN),
+            (b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR", UNKNOWN),
+        ],
+    )
+    def test_kind(self, data, kind):
+        assert sniff(io.BytesIO(data)).kind == kind
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"",
+            make_zip({"a.json": RECORDS})[:-100],
+            make_tar({"a.json": RECORDS})[:3000],
+            RECORDS[:-5000],
+            b"\x1f\x8b\x09" + b"\x00" * 20,
+        ],
+    )
+    def test_corrupted(self, data):
+        assert sniff(io.BytesIO(data)).kind == CORRUPTED
+
+    def test_utf8_character_at_end_of_head(self):
+        # Lines of 5 bytes, the head ends after the first byte of an é
+        data = "é,x\n".encode() * 2000
+        assert sniff(io.BytesIO(data), head_size=4096).kind == CSV
+
+    def test_two_reads(self):
+        data = make_zip({f"{i}.json": RECORDS for i in range(20)})
+        reader = FakeReader(data)
+        file = AsyncFileAdapter(reader)
+        assert sniff(file).kind == ZIP
+        assert len(reader.calls) == 2
+        assert file.tell() == 0
+
+
+class TestSniffedArchives:
+    """Tests for the rejection of files that are not archives"""
+
+    @pytest.mark.parametrize("data", [RECORDS, make_zip({"a.json": RECORDS})[:-100]])
+    def test_rejected_before_parsing(self, data):
+        with pytest.raises(ArchiveError, match="not a zip, tar or gzip file"):
+            NestedArchiveReader(io.BytesIO(data))
+
+    def test_sniffed_file_is_not_read_again(self):
+        reader = FakeReader(make_zip({"a.json": b"[]"}))
+        file = AsyncFileAdapter(reader)
+        sniffed = sniff(file)
+        reader.calls.clear()
+        archive = NestedArchiveReader(file, sniffed=sniffed)
+        assert archive.namelist() == ["a.json"]
+        assert all(call[1] > 0 for call in reader.calls)
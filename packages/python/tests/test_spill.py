@@ -0,0 +1,161 @@
+import json
+
+import pandas as pd
+import pytest
+
+from port.api import spill
+from port.api.column_store import ColumnStore
+from port.api.consent import stream_table
+from port.api.memory import MemoryGovernor, get_governor, set_governor
+from port.api.props import PropsUIPromptConsentFormTable, Translatable
+from port.api.spill import FileSpillStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = FileSpillStorage(tmp_path / "spill.bin")
+    spill.set_storage(storage)
+    yield storage
+    spill.set_storage(None)
+    storage.close()
+
+
+@pytest.fixture
+def critical_memory():
+    governor = get_governor()
+    set_governor(MemoryGovernor(budget=100, sampler=lambda: 95))
+    yield
+    set_governor(governor)
+
+
+def make_frame(rows, start=0):
+    return pd.DataFrame(
+        {
+            "index": range(start, start + rows),
+            "channel": [f"channel {index % 7}" for index in range(start, start + rows)],
+            "title": [f"video {index}" for index in range(start, start + rows)],
+        }
+    )
+
+
+def test_file_storage_appends(tmp_path):
+    storage = FileSpillStorage(tmp_path / "spill.bin")
+    assert storage.append(b"abc") == 0
+    assert storage.append(b"defgh") == 3
+    assert storage.read(3, 5) == b"defgh"
+    assert storage.read(0, 3) == b"abc"
+    assert storage.size == 8
+    storage.close()
+
+
+def test_file_storage_shrinks_when_released(tmp_path):
+    storage = FileSpillStorage(tmp_path / "spill.bin")
+    storage.append(b"abc")
+    storage.append(b"defgh")
+    storage.release(0, 3)
+    assert storage.size == 8
+    storage.release(3, 5)
+    assert storage.size == 0
+    assert (tmp_path / "spill.bin").stat().st_size == 0
+    assert storage.append(b"ij") == 0
+    storage.close()
+
+
+def test_closed_and_discarded_stores_release_storage(storage):
+    first = ColumnStore(["index", "channel", "title"], chunk_size=100, spill=True)
+    first.append_frame(make_frame(300))
+    second = ColumnStore(["index", "channel", "title"], chunk_size=100, spill=True)
+    second.append_frame(make_frame(300))
+    assert storage.size == first.spilled_nbytes() + second.spilled_nbytes()
+
+    second.close()
+    assert storage.size == first.spilled_nbytes()
+    assert len(second) == 0
+    pd.testing.assert_frame_equal(first.to_frame(), make_frame(300), check_dtype=False)
+
+    del first
+    assert storage.size == 0
+
+
+def test_store_appended_after_close_releases_storage(storage):
+    store = ColumnStore(["index", "channel", "title"], chunk_size=100, spill=True)
+    store.append_frame(make_frame(100))
+    store.close()
+    store.append_frame(make_frame(100))
+    assert storage.size == store.spilled_nbytes() > 0
+
+    store.close()
+    assert storage.size == 0
+
+
+def test_stream_spilled_chunks_into_consent_table(storage):
+    text = Translatable({"en": "Videos"})
+    with ColumnStore(["index", "channel", "title"], chunk_size=100, spill=True) as store:
+        store.append_frame(make_frame(250))
+        table = PropsUIPromptConsentFormTable("videos", 1, text, text, pd.DataFrame(columns=store.columns), streaming=True)
+
+        flow = stream_table(lambda: "page", table, store.scan())
+        assert next(flow) == "page"
+        command = flow.send(None)
+        while not command.done:
+            command = flow.send(None)
+        with pytest.raises(StopIteration):
+            flow.send("{}")
+    assert table.data_frame.to_dict("list") == make_frame(250).to_dict("list")
+
+
+def test_spill_on_critical_memory(storage, critical_memory):
+    store = ColumnStore(["index", "channel", "title"], chunk_size=100)
+    store.append_frame(make_frame(1000))
+
+    assert store.nbytes() == 0
+    assert store.spilled_nbytes() == storage.size > 0
+    pd.testing.assert_frame_equal(store.to_frame(), make_frame(1000), check_dtype=False)
+
+
+def test_no_spill_with_enough_memory(storage):
+    store = ColumnStore(["index", "channel", "title"], chunk_size=100, spill=None)
+    set_governor(MemoryGovernor(budget=100, sampler=lambda: 10))
+    try:
+        store.append_frame(make_frame(1000))
+    finally:
+        set_governor(None)
+
+    assert store.spilled_nbytes() == 0
+    assert storage.size == 0
+
+
+def test_spill_mixed_with_memory_chunks(storage):
+    store = ColumnStore(["index", "channel", "title"], chunk_size=100, spill=False)
+    store.append_frame(make_frame(300))
+    store.spill = True
+    store.append_frame(make_frame(300, start=300))
+    store.extend(make_frame(50, start=600).to_dict("records"))
+
+    assert store.nbytes() > 0 and store.spilled_nbytes() > 0
+    frames = list(store.scan(["index"]))
+    assert [len(frame) for frame in frames] == [100] * 6 + [50]
+    assert pd.concat(frames)["index"].tolist() == list(range(650))
+
+
+def test_head_reads_only_needed_chunks(storage):
+    reads = []
+    read = storage.read
+    storage.read = lambda offset, length: reads.append(offset) or read(offset, length)
+
+    store = ColumnStore(["index", "channel", "title"], chunk_size=100, spill=True)
+    store.append_frame(make_frame(1000))
+    head = store.head(150)
+
+    assert head["index"].tolist() == list(range(150))
+    assert len(reads) == 2
+
+
+def test_records_json(storage):
+    store = ColumnStore(["index", "channel", "title"], chunk_size=100, spill=True)
+    store.append_frame(make_frame(250))
+    store.append({"index": 250, "channel": "open", "title": "chunk"})
+
+    expected = pd.concat([make_frame(250), make_frame(1, start=250).assign(channel="open", title="chunk")])
+    assert json.loads(store.records_json()) == json.loads(expected.to_json(orient="records"))
+    assert ColumnStore(["index"]).records_json() == "[]"
@@ -0,0 +1,114 @@
+import pandas as pd
+import pytest
+
+from port.api.timeline import (
+    count_per_hour_of_week,
+    count_per_period,
+    infer_format,
+    parse_datetimes,
+    to_timezone,
+)
+
+
+class TestParseDatetimes:
+    """Tests for vectorized timestamp parsing"""
+
+    def test_mixed_formats(self):
+        values = [
+            "2025-01-01T10:00:00Z",
+            "2025-01-02T23:30:00+02:00",
+            None,
+            "Jun 1, 2025, 10:12:00 AM CEST",
+            "01 Jun 2025, 10:12:00 UTC",
+            "garbage",
+            "2025-01-05 10:00:00",
+        ]
+        result = parse_datetimes(pd.Series(values), assume_tz="Europe/Amsterdam")
+        assert str(result.dt.tz) == "UTC"
+        expected = [
+            "2025-01-01 10:00",
+            "2025-01-02 21:30",
+            None,
+            "2025-06-01 08:12",
+            "2025-06-01 10:12",
+            None,
+            "2025-01-05 09:00",
+        ]
+        assert [None if pd.isna(value) else value.strftime("%Y-%m-%d %H:%M") for value in result] == expected
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "Jan 5, 2024, 3:04:05 PM",
+            "Jan 5, 2024, 3:04:05\u202fPM",
+            "1/5/24, 3:04 PM",
+            "1/5/24, 3:04\u202fPM",
+            "Jan 5, 2024, 3:04:05 PM UTC",
+        ],
+    )
+    def test_12_hour_times(self, value):
+        result = parse_datetimes(pd.Series([value]))
+        assert result[0].strftime("%Y-%m-%d %H:%M") == "2024-01-05 15:04"
+        assert infer_format(value).tz_name == value.endswith("UTC")
+
+    def test_format_is_cached_by_shape(self):
+        assert infer_format("12/03/2024 10:00") is infer_format("01/01/2021 23:59")
+
+    def test_explicit_format(self):
+        result = parse_datetimes(["03/12/2024 10:00"], format="%m/%d/%Y %H:%M")
+        assert result[0] == pd.Timestamp("2024-03-12 10:00", tz="UTC")
+
+    @pytest.mark.parametrize("scale", [1, 1000, 1000_000])
+    def test_epochs(self, scale):
+        result = parse_datetimes(pd.Series([1700000000 * scale]))
+        assert result[0] == pd.Timestamp("2023-11-14 22:13:20", tz="UTC")
+
+    def test_result_timezone(self):
+        result = parse_datetimes(["2025-01-01T23:30:00Z"], tz="Europe/Amsterdam")
+        assert result[0].strftime("%Y-%m-%d %H:%M") == "2025-01-02 00:30"
+
+
+class TestAggregation:
+    """Tests for timeline histograms"""
+
+    timestamps = parse_datetimes(
+        ["2025-01-01T10:00:00Z", "2025-01-01T11:00:00Z", "2025-01-03T10:00:00Z", "2025-02-10T10:00:00Z"]
+    )
+
+    def test_per_day(self):
+        result = count_per_period(self.timestamps, "day")
+        assert result.to_dict("list") == {
+            "period": ["2025-01-01", "2025-01-03", "2025-02-10"],
+            "count": [2, 1, 1],
+        }
+
+    def test_per_day_filled(self):
+        result = count_per_period(self.timestamps[:3], "day", fill=True)
+        assert result["count"].tolist() == [2, 0, 1]
+
+    def test_per_week_starts_on_monday(self):
+        result = count_per_period(self.timestamps, "week", fill=True)
+        assert result["period"].tolist()[:2] == ["2024-12-30", "2025-01-06"]
+        assert result["count"].sum() == 4
+
+    def test_per_period_by_category(self):
+        by = pd.Series(["a", "b", "a", "a"], name="kind")
+        result = count_per_period(self.timestamps, "month", by=by)
+        assert result.to_dict("list") == {
+            "period": ["2025-01", "2025-01", "2025-02"],
+            "kind": ["a", "b", "a"],
+            "count": [2, 1, 1],
+        }
+
+    def test_hour_of_week_in_local_time(self):
+        result = count_per_hour_of_week(to_timezone(self.timestamps, "Europe/Amsterdam"))
+        assert len(result) == 168
+        # 2025-01-01 is a Wednesday
+        counts = result.set_index(["weekday", "hour"])["count"]
+        assert counts[("Wednesday", 11)] == 1
+        assert counts[("Wednesday", 12)] == 1
+        assert counts.sum() == 4
+
+    def test_unknown_period(self):
+        with pytest.raises(ValueError):
+            count_per_period(self.timestamps, "fortnight")
@@ -0,0 +1,123 @@
+import pandas as pd
+
+from port.api.props import PropsUIPromptConsentFormTable, Translatable
+from port.api.truncation import Head, NewestFirst, ReservoirSample, TimeStratifiedSample
+
+
+def make_translatable(text: str) -> Translatable:
+    return Translatable({"en": text, "nl": text})
+
+
+def make_dataframe(num_rows: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "time": pd.date_range("2025-01-01", periods=num_rows, freq="min"),
+            "value": range(num_rows),
+        }
+    )
+
+
+class TestTruncate:
+    """Tests for truncating existing frames"""
+
+    def test_head_keeps_first_rows(self):
+        result = Head().truncate(make_dataframe(100), 10)
+        assert list(result["value"]) == list(range(10))
+
+    def test_newest_first_by_position(self):
+        result = NewestFirst().truncate(make_dataframe(100), 3)
+        assert list(result["value"]) == [99, 98, 97]
+        assert list(result.index) == [0, 1, 2]
+
+    def test_newest_first_by_time_column(self):
+        df = make_dataframe(100).sample(frac=1, random_state=1)
+        result = NewestFirst("time").truncate(df, 3)
+        assert list(result["value"]) == [99, 98, 97]
+
+    def test_reservoir_keeps_order_and_is_reproducible(self):
+        df = make_dataframe(1000)
+        first = ReservoirSample(seed=7).truncate(df, 50)
+        second = ReservoirSample(seed=7).truncate(df, 50)
+        assert len(first) == 50
+        assert list(first["value"]) == sorted(first["value"])
+        assert list(first["value"]) == list(second["value"])
+
+    def test_time_stratified_covers_every_bucket(self):
+        df = make_dataframe(600)
+        result = TimeStratifiedSample("time", freq="h", seed=1).truncate(df, 60)
+        assert len(result) == 60
+        assert result["time"].dt.floor("h").value_counts().tolist() == [6] * 10
+
+
+class TestCollector:
+    """Tests for selecting rows while they are produced"""
+
+    def test_head_collector(self):
+        collector = Head().collector(3, columns=["value"])
+        collector.extend((i,) for i in range(10))
+        assert collector.seen == 10
+        assert list(collector.to_data_frame()["value"]) == [0, 1, 2]
+
+    def test_newest_collector_without_time_column(self):
+        collector = NewestFirst().collector(3)
+        collector.extend(range(10))
+        assert collector.rows() == [9, 8, 7]
+
+    def test_newest_collector_with_time_column(self):
+        collector = NewestFirst("time").collector(2, columns=["time", "value"])
+        collector.extend([(3, "c"), (1, "a"), (4, "d"), (2, "b")])
+        assert collector.rows() == [(4, "d"), (3, "c")]
+
+    def test_reservoir_collector_is_uniform(self):
+        counts = [0] * 20
+        for seed in range(2000):
+            collector = ReservoirSample(seed=seed).collector(5)
+            collector.extend(range(20))
+            rows = collector.rows()
+            assert len(rows) == 5
+            assert rows == sorted(rows)
+            for row in rows:
+                counts[row] += 1
+        # every row is expected 500 times
+        assert min(counts) > 400
+        assert max(counts) < 600
+
+    def test_stratified_collector_bounds_memory(self):
+        df = make_dataframe(6000)
+        collector = TimeStratifiedSample("time", freq="h", seed=1).collector(60, columns=["time", "value"])
+        collector.extend(df.itertuples(index=False))
+        result = collector.to_data_frame()
+        assert len(result) == 60
+        # 100 hourly buckets share 60 rows, so no bucket gets more than one
+        assert result["time"].dt.floor("h").nunique() == 60
+        assert collector._held <= 2 * 60
+
+    def test_stratified_collector_merges_sparse_buckets(self):
+        # One row a day for 30 years, far more daily buckets than rows to show
+        df = pd.DataFrame({"time": pd.date_range("1990-01-01", periods=11000, freq="D"), "value": range(11000)})
+        collector = TimeStratifiedSample("time", seed=1).collector(20, columns=["time", "value"])
+        for row in df.itertuples(index=False):
+            collector.add(row)
+            assert collector._held <= 2 * 20
+        assert len(collector._buckets) <= 2 * 20
+        result = collector.to_data_frame()
+        assert len(result) == 20
+        assert result["value"].is_monotonic_increasing
+        # The sample still covers the whole timeline
+        assert result["time"].dt.year.nunique() >= 15
+
+
+class TestConsentTableTruncation:
+    """Tests for truncation strategies on PropsUIPromptConsentFormTable"""
+
+    def test_table_uses_strategy(self):
+        table = PropsUIPromptConsentFormTable(
+            id="test",
+            number=1,
+            title=make_translatable("Test"),
+            description=make_translatable("Description"),
+            data_frame=make_dataframe(100),
+            data_frame_max_size=5,
+            truncation=NewestFirst(),
+        )
+        assert list(table.data_frame["value"]) == [99, 98, 97, 96, 95]
@@ -12,15 +12,28 @@ Features:
 - Fast generation (streaming content directly to ZIP)
 - Configurable size and number of files
 
+With --realistic the script synthesizes a platform export instead, to
+benchmark the cost of parsing rather than of reading bytes: nested JSON
+watch and search histories, HTML activity pages, CSVs, many tiny settings
+files, a few huge files and media blobs. Text is DEFLATE compressed and
+media is STORED, like real exports. The export is deterministic for a
+given seed and size, so it can serve as a benchmark corpus.
+
 Usage:
     python generate_test_zip.py --size 1GB --files 10 --output test.zip
     python generate_test_zip.py -s 500MB -f 5 -o test_500mb.zip --force
+    python generate_test_zip.py --realistic -s 100MB --seed 1 -o export_100mb.zip
 """
 
 import argparse
+import itertools
 import os
+import random
+import struct
 import zipfile
+import zlib
 import io
+from datetime import datetime, timedelta, timezone
 
 
 def parse_size(size_str):
@@ -190,12 +203,18 @@ def generate_zip(output_path, target_size_bytes, num_files):
 
             print(" ✓")
 
+    print_statistics(output_path)
+
+
+def print_statistics(output_path):
+    """Print the compressed and uncompressed size of a ZIP file."""
     # Get final sizes
     zip_size = os.path.getsize(output_path)
 
     # Calculate actual uncompressed size
     with zipfile.ZipFile(output_path, 'r') as zf:
         uncompressed_size = sum(info.file_size for info in zf.infolist())
+        num_files = len(zf.infolist())
 
     compression_ratio = (1 - zip_size / uncompressed_size) * 100 if uncompressed_size > 0 else 0
 
@@ -208,6 +227,218 @@ def generate_zip(output_path, target_size_bytes, num_files):
     print(f"  Output location:   {os.path.abspath(output_path)}")
 
 
+# Share of the total size per kind of content in a realistic export
+REALISTIC_SHARES = {
+    'watch_history': 0.25,
+    'search_history': 0.10,
+    'activity_html': 0.15,
+    'csv': 0.05,
+    'tiny': 0.05,
+    'media': 0.40,
+}
+
+WORDS = (
+    'music video live official trailer review how to make best new top easy recipe '
+    'game play part episode full album news today football highlights tutorial guide '
+    'vlog travel city night short funny cats dogs science history world cup final '
+    'cover song remix lyrics interview podcast update reaction challenge daily home'
+).split()
+
+CHANNELS = [f"{a} {b}".title() for a in WORDS[:12] for b in ('channel', 'tv', 'official', 'studio', 'daily')]
+
+
+def member_rng(seed, name):
+    """Return a random generator for a member, independent of the other members."""
+    return random.Random(seed * 1_000_003 + zlib.crc32(name.encode()))
+
+
+def sentence(rng, min_words=2, max_words=8):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def timestamps(rng, start=datetime(2025, 6, 1, tzinfo=timezone.utc)):
+    """Yield timestamps going back in time, newest first like platform histories."""
+    current = start
+    while True:
+        current -= timedelta(seconds=rng.randint(1, 7200))
+        yield current
+
+
+def sized_chunks(records, size, prefix=b'', separator=b'', suffix=b'', batch=1000):
+    """
+    Join records until size bytes are written.
+
+    Records are encoded in batches to avoid growing a single huge string.
+
+    Yields:
+        bytes: Chunks of content, including prefix and suffix
+    """
+    written = len(prefix) + len(suffix)
+    yield prefix
+    first = True
+    while written < size:
+        parts = []
+        for _ in range(batch):
+            record = next(records).encode()
+            if not first:
+                record = separator + record
+            first = False
+            parts.append(record)
+            written += len(record)
+            if written >= size:
+                break
+        yield b''.join(parts)
+    yield suffix
+
+
+def watch_records(rng):
+    for time in timestamps(rng):
+        video = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_') for _ in range(11))
+        channel = rng.choice(CHANNELS)
+        yield (
+            '{"header": "YouTube", "title": "Watched %s", "titleUrl": "https://www.youtube.com/watch?v=%s", '
+            '"subtitles": [{"name": "%s", "url": "https://www.youtube.com/channel/UC%s"}], '
+            '"time": "%s", "products": ["YouTube"], "activityControls": ["YouTube watch history"]}'
+            % (sentence(rng), video, channel, video[::-1], time.isoformat(timespec='milliseconds').replace('+00:00', 'Z'))
+        )
+
+
+def search_records(rng):
+    for time in timestamps(rng):
+        query = sentence(rng, 1, 5)
+        yield (
+            '{"header": "YouTube", "title": "Searched for %s", '
+            '"titleUrl": "https://www.youtube.com/results?search_query=%s", '
+            '"time": "%s", "products": ["YouTube"], "activityControls": ["YouTube search history"]}'
+            % (query, query.replace(' ', '+'), time.isoformat(timespec='milliseconds').replace('+00:00', 'Z'))
+        )
+
+
+def activity_records(rng):
+    for time in timestamps(rng):
+        yield (
+            '<div class="outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp"><div class="mdl-grid">'
+            '<div class="header-cell mdl-cell mdl-cell--12-col"><p class="mdl-typography--title">Search<br></p></div>'
+            '<div class="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1">Searched for&nbsp;'
+            '<a href="https://www.google.com/search?q=%s">%s</a><br>%s</div></div></div>'
+            % (sentence(rng, 1, 4).replace(' ', '+'), sentence(rng, 1, 4), time.strftime('%d %b %Y, %H:%M:%S UTC'))
+        )
+
+
+def csv_records(rng):
+    for time in timestamps(rng):
+        channel = f"UC{rng.randrange(16**12):012x}"
+        yield f"{channel},http://www.youtube.com/channel/{channel},{rng.choice(CHANNELS)},{time.date().isoformat()}"
+
+
+JPEG_HEADER = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+
+
+def mp4_header(size):
+    """Return an ftyp box and the header of an mdat box that holds the rest of an MP4 file of size bytes."""
+    ftyp = struct.pack('>I4s4sI', 28, b'ftyp', b'isom', 0x200) + b'isomiso2mp41'
+    data_size = size - len(ftyp)
+    if data_size < 2**32:
+        return ftyp + struct.pack('>I4s', data_size, b'mdat')
+    return ftyp + struct.pack('>I4sQ', 1, b'mdat', data_size)
+
+
+def media_chunks(rng, size, chunk_size=8*1024*1024, header=JPEG_HEADER):
+    """Yield incompressible content behind a header, a JPEG header by default."""
+    yield header[:size]
+    remaining = size - len(header)
+    while remaining > 0:
+        chunk = min(chunk_size, remaining)
+        yield rng.randbytes(chunk)
+        remaining -= chunk
+
+
+def realistic_members(target_size_bytes, seed, tiny_files):
+    """
+    Plan the members of a realistic export.
+
+    Returns:
+        list: (name, size, compress_type, chunks) tuples, chunks is a function of a random generator
+    """
+    budget = {kind: int(target_size_bytes * share) for kind, share in REALISTIC_SHARES.items()}
+    deflated, stored = zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED
+    youtube = 'Takeout/YouTube and YouTube Music'
+    members = [
+        (f'{youtube}/history/watch-history.json', budget['watch_history'], deflated,
+         lambda rng, size: sized_chunks(watch_records(rng), size, b'[', b',\n', b']')),
+        (f'{youtube}/history/search-history.json', budget['search_history'], deflated,
+         lambda rng, size: sized_chunks(search_records(rng), size, b'[', b',\n', b']')),
+        ('Takeout/My Activity/Search/MyActivity.html', budget['activity_html'], deflated,
+         lambda rng, size: sized_chunks(
+             activity_records(rng), size,
+             b'<html><head><meta charset="UTF-8"><title>My Activity</title></head><body>'
+             b'<div class="mdl-grid">', b'\n', b'</div></body></html>')),
+        (f'{youtube}/subscriptions/subscriptions.csv', budget['csv'], deflated,
+         lambda rng, size: sized_chunks(csv_records(rng), size, b'Channel Id,Channel Url,Channel Title,Subscribed At\n', b'\n', b'\n')),
+    ]
+
+    # Many tiny settings files
+    tiny_size = max(64, budget['tiny'] // max(1, tiny_files))
+    for i in range(tiny_files):
+        members.append((
+            f'Takeout/Profile/settings/setting_{i:05d}.json', tiny_size, deflated,
+            lambda rng, size: sized_chunks(
+                (f'"{rng.choice(WORDS)}_{n}": "{sentence(rng, 1, 3)}"' for n in itertools.count()), size, b'{', b', ', b'}', batch=10),
+        ))
+
+    # A few huge videos and many photos, already compressed so they are STORED
+    media_budget = budget['media']
+    rng = member_rng(seed, 'media')
+    videos = media_budget // 2
+    for i in range(3):
+        members.append((f'Takeout/Google Photos/Videos/VID_{i:04d}.mp4', videos // 3, stored,
+                        lambda rng, size: media_chunks(rng, size, header=mp4_header(size))))
+    photos = media_budget - videos
+    photo_size = min(4 * 1024 * 1024, max(1024, photos // 50))
+    for i in range(max(1, photos // photo_size)):
+        year = 2015 + i % 10
+        members.append((f'Takeout/Google Photos/Photos from {year}/IMG_{i:05d}.jpg', photo_size, stored, media_chunks))
+
+    # Interleave the members like exporters do
+    rng.shuffle(members)
+    return members
+
+
+def synthesize_export(output_path, target_size_bytes, seed=0, tiny_files=200):
+    """
+    Generate a realistic, deterministic platform export.
+
+    Args:
+        output_path: Path for output ZIP file
+        target_size_bytes: Target total uncompressed size
+        seed: Seed of the random content
+        tiny_files: Number of tiny files to include
+    """
+    members = realistic_members(target_size_bytes, seed, tiny_files)
+    print(f"\nSynthesizing export:")
+    print(f"  Target size: {format_size(target_size_bytes)}")
+    print(f"  Number of files: {len(members)}")
+    print(f"  Seed: {seed}")
+    print(f"  Output: {output_path}")
+    print()
+
+    date_time = (2025, 6, 1, 12, 0, 0)
+    with zipfile.ZipFile(output_path, 'w') as zf:
+        for name, size, compress_type, chunks in members:
+            if size >= 64 * 1024 * 1024:
+                print(f"  Writing {name} ({format_size(size)})...", end='', flush=True)
+            zinfo = zipfile.ZipInfo(filename=name, date_time=date_time)
+            zinfo.compress_type = compress_type
+            # zipfile needs to know up front that a member of unknown size may need zip64
+            with zf.open(zinfo, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT // 2) as dest:
+                for chunk in chunks(member_rng(seed, name), size):
+                    dest.write(chunk)
+            if size >= 64 * 1024 * 1024:
+                print(" ✓")
+
+    print_statistics(output_path)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Generate a test ZIP file with specified size and number of files.',
@@ -218,10 +449,12 @@ Examples:
   %(prog)s -s 500MB -f 5 -o test_500mb.zip
   %(prog)s --size 100MB --files 100 --output many_files.zip --force
   %(prog)s --size 2GB --files 20 --output test_2gb.zip
+  %(prog)s --realistic --size 10MB --seed 1 --output export_10mb.zip
 
 Note:
   Files are created with ZIP_STORED (no compression) to ensure the
-  actual file size matches the specified size.
+  actual file size matches the specified size. Realistic exports mix
+  DEFLATE and STORED members, the size is their uncompressed size.
         """
     )
 
@@ -234,8 +467,20 @@ Note:
     parser.add_argument(
         '-f', '--files',
         type=int,
-        required=True,
-        help='Number of files to include in the ZIP'
+        help='Number of files to include in the ZIP (tiny files with --realistic, default 200)'
+    )
+
+    parser.add_argument(
+        '--realistic',
+        action='store_true',
+        help='Synthesize a realistic platform export instead of filler files'
+    )
+
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed of the realistic export (default: 0)'
     )
 
     parser.add_argument(
@@ -253,7 +498,9 @@ Note:
     args = parser.parse_args()
 
     # Validate arguments
-    if args.files <= 0:
+    if args.files is None and not args.realistic:
+        parser.error("Number of files is required")
+    if args.files is not None and args.files <= 0:
         parser.error("Number of files must be positive")
 
     try:
@@ -277,7 +524,10 @@ Note:
 
     # Generate the ZIP file
     try:
-        generate_zip(args.output, target_size, args.files)
+        if args.realistic:
+            synthesize_export(args.output, target_size, args.seed, args.files or 200)
+        else:
+            generate_zip(args.output, target_size, args.files)
     except KeyboardInterrupt:
         print("\n\n❌ Cancelled by user")
         if os.path.exists(args.output):